@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from bot.models import TgUser
+from bot.models import OutboxMessage, TgFSMState, TgUser
 
 
 @admin.register(TgUser)
@@ -8,3 +8,17 @@ class TgUserAdmin(admin.ModelAdmin):
     list_display = ['chat_id']
     readonly_fields = ['verification_code']
     search_fields = ['chat_id']
+
+
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    list_display = ['id', 'chat_id', 'kind', 'created', 'attempts', 'sent_at', 'failed_at']
+    list_filter = ['kind']
+    readonly_fields = ['created', 'attempts', 'last_error', 'sent_at', 'failed_at']
+    search_fields = ['chat_id']
+
+
+@admin.register(TgFSMState)
+class TgFSMStateAdmin(admin.ModelAdmin):
+    list_display = ['chat_id', 'name', 'updated']
+    search_fields = ['chat_id']
@@ -0,0 +1,34 @@
+import time
+
+from bot.dispatcher import ChatDispatcher
+from bot.management.commands.runbot import Command
+from bot.models import TgProcessedUpdate
+from bot.tg.client import TgClient
+from bot.tg.fake import FakeTelegram
+from goals.benchmarks import scenario
+
+
+@scenario
+def runbot(out, updates: int = 400, chats: int = 50, latency: float = 0.02, **kwargs) -> None:
+    """Updates per second of runbot by worker count, against a fake Telegram taking `latency` per sendMessage."""
+    prepared = [
+        {'update_id': i, 'message': {'chat': {'id': 1_000_000 + i % chats}, 'text': 'hello'}} for i in range(updates)
+    ]
+    out(f'{"workers":>8} {"updates":>8} {"seconds":>8} {"updates/s":>10}')
+    for workers in (1, 2, 4, 8, 16, 32):
+        # every round handles the same update ids
+        TgProcessedUpdate.objects.all().delete()
+        server = FakeTelegram(prepared, latency)
+        command = Command()
+        # the dispatcher is measured here, not Telegram's limits
+        command.tg_client = TgClient(token='bench', api_url=server.url, rate_limited=False)
+        dispatcher = ChatDispatcher(command.handle_update, workers=workers, queue_size=100)
+        dispatcher.start()
+
+        started = time.perf_counter()
+        while dispatcher.offset < updates:
+            command.poll(dispatcher, timeout=1)
+        seconds = time.perf_counter() - started
+        dispatcher.stop()
+        server.close()
+        out(f'{workers:>8} {updates:>8} {seconds:>8.2f} {updates / seconds:>10.0f}')
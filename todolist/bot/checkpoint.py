@@ -0,0 +1,38 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from bot.models import TgPollOffset, TgProcessedUpdate
+
+# runbot and pollbot consume the same getUpdates queue of the bot
+GET_UPDATES = 'getUpdates'
+
+
+def load_offset(name: str = GET_UPDATES) -> int:
+    return TgPollOffset.objects.filter(name=name).values_list('offset', flat=True).first() or 0
+
+
+def save_offset(offset: int, name: str = GET_UPDATES) -> None:
+    TgPollOffset.objects.update_or_create(name=name, defaults={'offset': offset})
+
+
+def claim(update_id: int) -> bool:
+    """
+    Records the update as processed, False if it already was. Call it inside the transaction of the
+    handler: if the handler fails the claim is rolled back with its writes and a redelivery runs again.
+    Side effects outside the database belong in on_commit callbacks.
+    """
+    try:
+        with transaction.atomic():
+            TgProcessedUpdate.objects.create(update_id=update_id)
+    except IntegrityError:
+        return False
+    return True
+
+
+def evict_processed() -> int:
+    expired_before = timezone.now() - timedelta(seconds=settings.BOT_PROCESSED_UPDATES_TTL_SECONDS)
+    deleted, _ = TgProcessedUpdate.objects.filter(processed_at__lt=expired_before).delete()
+    return deleted
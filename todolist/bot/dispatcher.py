@@ -0,0 +1,109 @@
+import logging
+import queue
+import threading
+from typing import Callable
+
+from django.db import close_old_connections, connection
+
+from bot.tg.schemas import UpdateObj
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def chat_key(update: UpdateObj) -> int:
+    return update.message.chat.id if update.message else 0
+
+
+class ChatDispatcher:
+    """
+    Handles updates of different chats in parallel on `workers` threads, strictly in order within a chat.
+
+    A chat always lands on the same worker. Worker queues are bounded, so dispatch() blocks while the
+    chat's worker is behind and polling slows down instead of piling updates up in memory. `offset`
+    moves past an update only once it and every update before it have been handled.
+    """
+
+    def __init__(self, handle: Callable[[UpdateObj], None], workers: int, queue_size: int, offset: int = 0):
+        self.handle = handle
+        self.queues = [queue.Queue(queue_size) for _ in range(workers)]
+        self.threads = [
+            threading.Thread(target=self.work, args=(worker_queue,), name=f'runbot-worker-{number}', daemon=True)
+            for number, worker_queue in enumerate(self.queues)
+        ]
+        self.progress = threading.Event()
+        self._lock = threading.Lock()
+        self._pending: set[int] = set()
+        # updates before a stored offset were handled by a previous run
+        self._last_seen: int | None = offset - 1 if offset else None
+
+    def start(self) -> None:
+        for thread in self.threads:
+            thread.start()
+
+    @property
+    def offset(self) -> int:
+        """The getUpdates offset: confirms the handled prefix, still-pending updates are delivered again."""
+        with self._lock:
+            if self._pending:
+                return min(self._pending)
+            return 0 if self._last_seen is None else self._last_seen + 1
+
+    @property
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def dispatch(self, update: UpdateObj) -> bool:
+        """Queues an update unless it was dispatched before; blocks while the chat's worker queue is full."""
+        with self._lock:
+            if self._last_seen is not None and update.update_id <= self._last_seen:
+                return False
+            self._pending.add(update.update_id)
+            self._last_seen = update.update_id
+        self.queues[chat_key(update) % len(self.queues)].put(update)
+        return True
+
+    def submit(self, update: UpdateObj) -> bool:
+        """
+        Queues an update unless it is still pending, whether or not a later one was dispatched already;
+        for sources other than getUpdates, where `offset` means nothing. Blocks like dispatch().
+        """
+        with self._lock:
+            if update.update_id in self._pending:
+                return False
+            self._pending.add(update.update_id)
+        self.queues[chat_key(update) % len(self.queues)].put(update)
+        return True
+
+    def pending_ids(self) -> set[int]:
+        with self._lock:
+            return set(self._pending)
+
+    def wait_for_progress(self, timeout: float) -> None:
+        """Waits until an update is handled; call progress.clear() before polling to not miss one."""
+        self.progress.wait(timeout)
+
+    def work(self, worker_queue: queue.Queue) -> None:
+        try:
+            while (update := worker_queue.get()) is not _STOP:
+                try:
+                    close_old_connections()
+                    self.handle(update)
+                except Exception:
+                    # a failing update must not hold the offset back forever
+                    logger.exception('Update %s failed', update.update_id)
+                finally:
+                    with self._lock:
+                        self._pending.discard(update.update_id)
+                    self.progress.set()
+        finally:
+            connection.close()
+
+    def stop(self) -> None:
+        """Lets the workers finish what is already queued, then joins them."""
+        for worker_queue in self.queues:
+            worker_queue.put(_STOP)
+        for thread in self.threads:
+            thread.join()
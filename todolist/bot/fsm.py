@@ -0,0 +1,149 @@
+import threading
+from abc import ABC, abstractmethod
+from datetime import timedelta
+from typing import Any
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from pydantic import BaseModel
+
+from bot.models import TgFSMState
+
+
+class StaleState(Exception):
+    """The chat's state was changed by another handler since it was read."""
+
+
+class ChatState(BaseModel):
+    """
+    Where a chat is in a multi-step command: a state name runbot maps to its handler, plus JSON data.
+    `version` grows with every write and guards it against concurrent ones.
+    """
+    chat_id: int
+    name: str
+    data: dict[str, Any] = {}
+    version: int = 1
+
+
+class FSMStore(ABC):
+    """
+    Chat states that expire BOT_FSM_TTL_SECONDS after their last change. Writes name the state they
+    replace (None for no state) and raise StaleState if it is not the current one anymore.
+    """
+
+    @abstractmethod
+    def get(self, chat_id: int) -> ChatState | None:
+        ...
+
+    @abstractmethod
+    def set(self, chat_id: int, name: str, data: dict[str, Any] | None = None,
+            current: ChatState | None = None) -> ChatState:
+        ...
+
+    @abstractmethod
+    def clear(self, current: ChatState) -> None:
+        ...
+
+    @abstractmethod
+    def evict_expired(self) -> int:
+        ...
+
+    @staticmethod
+    def expired_before() -> timezone.datetime:
+        return timezone.now() - timedelta(seconds=settings.BOT_FSM_TTL_SECONDS)
+
+
+class DatabaseFSMStore(FSMStore):
+    """States in the TgFSMState table, shared by every runbot process."""
+
+    def get(self, chat_id: int) -> ChatState | None:
+        row = TgFSMState.objects.filter(chat_id=chat_id).first()
+        if row is None:
+            return None
+        if row.updated < self.expired_before():
+            TgFSMState.objects.filter(chat_id=chat_id, version=row.version).delete()
+            return None
+        return ChatState(chat_id=chat_id, name=row.name, data=row.data, version=row.version)
+
+    def set(self, chat_id: int, name: str, data: dict[str, Any] | None = None,
+            current: ChatState | None = None) -> ChatState:
+        data = data or {}
+        if current is None:
+            try:
+                with transaction.atomic():
+                    TgFSMState.objects.create(chat_id=chat_id, name=name, data=data, version=1)
+            except IntegrityError:
+                raise StaleState(chat_id)
+            return ChatState(chat_id=chat_id, name=name, data=data, version=1)
+
+        version = current.version + 1
+        updated = TgFSMState.objects.filter(chat_id=chat_id, version=current.version).update(
+            name=name, data=data, version=version, updated=timezone.now(),
+        )
+        if not updated:
+            raise StaleState(chat_id)
+        return ChatState(chat_id=chat_id, name=name, data=data, version=version)
+
+    def clear(self, current: ChatState) -> None:
+        deleted, _ = TgFSMState.objects.filter(chat_id=current.chat_id, version=current.version).delete()
+        if not deleted:
+            raise StaleState(current.chat_id)
+
+    def evict_expired(self) -> int:
+        deleted, _ = TgFSMState.objects.filter(updated__lt=self.expired_before()).delete()
+        return deleted
+
+
+class MemoryFSMStore(FSMStore):
+    """States of this process only, for a single runbot and for tests."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._states: dict[int, tuple[ChatState, timezone.datetime]] = {}
+
+    def get(self, chat_id: int) -> ChatState | None:
+        with self._lock:
+            state, updated = self._states.get(chat_id, (None, None))
+            if state is not None and updated < self.expired_before():
+                del self._states[chat_id]
+                return None
+            return state
+
+    def set(self, chat_id: int, name: str, data: dict[str, Any] | None = None,
+            current: ChatState | None = None) -> ChatState:
+        with self._lock:
+            self._check(chat_id, current)
+            version = current.version + 1 if current else 1
+            state = ChatState(chat_id=chat_id, name=name, data=data or {}, version=version)
+            self._states[chat_id] = (state, timezone.now())
+            return state
+
+    def clear(self, current: ChatState) -> None:
+        with self._lock:
+            self._check(current.chat_id, current)
+            del self._states[current.chat_id]
+
+    def _check(self, chat_id: int, current: ChatState | None) -> None:
+        state, _ = self._states.get(chat_id, (None, None))
+        if (state and state.version) != (current and current.version):
+            raise StaleState(chat_id)
+
+    def evict_expired(self) -> int:
+        expired_before = self.expired_before()
+        with self._lock:
+            expired = [chat_id for chat_id, (_, updated) in self._states.items() if updated < expired_before]
+            for chat_id in expired:
+                del self._states[chat_id]
+        return len(expired)
+
+
+_stores: dict[str, FSMStore] = {}
+
+
+def get_fsm_store() -> FSMStore:
+    path = settings.BOT_FSM_STORE
+    if path not in _stores:
+        _stores[path] = import_string(path)()
+    return _stores[path]
@@ -0,0 +1,44 @@
+from django.conf import settings
+from django.db.models.functions import Abs, Mod
+
+from bot.dispatcher import chat_key
+from bot.models import TgUpdate
+from bot.tg.schemas import UpdateObj
+
+
+def parse_shard(value: str) -> tuple[int, int]:
+    """`i/n` of --shard: the chats with |chat_id| % n == i."""
+    index, _, count = value.partition('/')
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f'Expected a shard like 0/4, got {value!r}')
+    if not 0 <= index < count:
+        raise ValueError(f'Shard {index} is outside 0..{count - 1}')
+    return index, count
+
+
+def store(updates: list[UpdateObj]) -> None:
+    """Adds the message updates to the inbox; ones delivered twice are stored once."""
+    TgUpdate.objects.bulk_create(
+        [TgUpdate(update_id=item.update_id, chat_id=chat_key(item), payload=item.model_dump(mode='json'))
+         for item in updates if item.message is not None],
+        ignore_conflicts=True,
+    )
+
+
+def fetch(shard: tuple[int, int], exclude: set[int], limit: int | None = None) -> list[UpdateObj]:
+    """The oldest inbox updates of a shard, except `exclude`, those already being handled."""
+    index, count = shard
+    payloads = (
+        TgUpdate.objects.alias(shard=Mod(Abs('chat_id'), count))
+        .filter(shard=index)
+        .exclude(update_id__in=exclude)
+        .order_by('update_id')
+        .values_list('payload', flat=True)[:limit or settings.BOT_INBOX_BATCH_SIZE]
+    )
+    return [UpdateObj(**payload) for payload in payloads]
+
+
+def done(update: UpdateObj) -> None:
+    TgUpdate.objects.filter(update_id=update.update_id).delete()
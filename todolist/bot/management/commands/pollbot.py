@@ -0,0 +1,48 @@
+import signal
+import time
+
+from django.core.management import BaseCommand
+
+from bot import checkpoint, inbox
+from bot.tg.client import TgApiError, TgClient
+
+
+class Command(BaseCommand):
+    help = 'Polls Telegram into the update inbox handled by `runbot --shard i/n` processes, see bot.inbox'
+
+    def handle(self, *args, **options):
+        tg_client = TgClient()
+        signal.signal(signal.SIGTERM, self.terminate)
+        self.stdout.write(self.style.SUCCESS('Polling into the inbox'))
+        offset = checkpoint.load_offset()
+        failures = 0
+        try:
+            while True:
+                try:
+                    res = tg_client.get_updates(offset=offset, timeout=60)
+                except TgApiError as exc:
+                    # the client gave up retrying, wait out flood control or back off further
+                    failures += 1
+                    delay = exc.retry_after if exc.retry_after is not None else TgClient.backoff(failures)
+                    self.stderr.write(f'Polling failed: {exc}, retrying in {delay:.1f}s')
+                    time.sleep(delay)
+                    continue
+                failures = 0
+                # stored before the offset confirms them to Telegram
+                inbox.store(res.result)
+                if res.result:
+                    offset = res.result[-1].update_id + 1
+                    checkpoint.save_offset(offset)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            if offset:
+                try:
+                    tg_client.get_updates(offset=offset, timeout=0)
+                except TgApiError as exc:
+                    # the saved offset is confirmed on the next start instead
+                    self.stderr.write(f'Confirming the stored updates failed: {exc}')
+
+    @staticmethod
+    def terminate(signum, frame):
+        raise KeyboardInterrupt
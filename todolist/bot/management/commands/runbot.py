@@ -1,17 +1,28 @@
-from typing import Callable, Any
+import logging
+import signal
+import time
+from argparse import ArgumentTypeError
 
+from django.conf import settings
 from django.core.management import BaseCommand
-from pydantic import BaseModel
+from django.db import transaction
 
+from bot import checkpoint, inbox, outbox
+from bot.dispatcher import ChatDispatcher
+from bot.fsm import ChatState, StaleState, get_fsm_store
 from bot.models import TgUser
-from bot.tg.client import TgClient
-from bot.tg.schemas import Message
+from bot.tg.client import TgApiError, TgClient
+from bot.tg.schemas import Message, UpdateObj
 from goals.models import Goal, GoalCategory
 
+logger = logging.getLogger(__name__)
 
-class FSMData(BaseModel):
-    next_handler: Callable
-    data: dict[str, Any] = {}
+
+def shard_argument(value: str) -> tuple[int, int]:
+    try:
+        return inbox.parse_shard(value)
+    except ValueError as exc:
+        raise ArgumentTypeError(str(exc))
 
 
 class Command(BaseCommand):
@@ -19,47 +30,150 @@ class Command(BaseCommand):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.tg_client = TgClient()
-        self.clients: dict[int, FSMData] = {}
+        self.fsm = get_fsm_store()
+        # handlers of the messages that continue a command, by ChatState.name
+        self.states = {
+            'create.category': self._get_category,
+            'create.title': self._create_goal,
+        }
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=settings.BOT_WORKERS)
+        parser.add_argument('--queue-size', type=int, default=settings.BOT_WORKER_QUEUE_SIZE,
+                            help='Updates waiting per worker before polling blocks')
+        parser.add_argument('--shard', type=shard_argument,
+                            help='i/n: handle the chats of shard i of n from the inbox filled by pollbot, '
+                                 'instead of polling Telegram')
 
     def handle(self, *args, **options):
-        offset = 0
-
-        self.stdout.write(self.style.SUCCESS('Bot started'))
-        while True:
-            res = self.tg_client.get_updates(offset=offset)
-            for item in res.result:
-                offset = item.update_id + 1
+        shard = options['shard']
+        handle = self.handle_update if shard is None else self.handle_inbox_update
+        offset = checkpoint.load_offset() if shard is None else 0
+        dispatcher = ChatDispatcher(handle, workers=options['workers'], queue_size=options['queue_size'],
+                                    offset=offset)
+        dispatcher.start()
+        signal.signal(signal.SIGTERM, self.terminate)
+
+        started = 'Bot started' if shard is None else f'Bot started on shard {shard[0]}/{shard[1]}'
+        self.stdout.write(self.style.SUCCESS(started))
+        next_eviction, failures = time.monotonic(), 0
+        try:
+            while True:
+                try:
+                    if shard is None:
+                        self.poll(dispatcher)
+                        offset = self.checkpoint(dispatcher, offset)
+                    else:
+                        self.consume(dispatcher, shard)
+                except TgApiError as exc:
+                    # the client gave up retrying, wait out flood control or back off further
+                    failures += 1
+                    delay = exc.retry_after if exc.retry_after is not None else TgClient.backoff(failures)
+                    self.stderr.write(f'Polling failed: {exc}, retrying in {delay:.1f}s')
+                    time.sleep(delay)
+                else:
+                    failures = 0
+                if time.monotonic() >= next_eviction:
+                    self.fsm.evict_expired()
+                    checkpoint.evict_processed()
+                    next_eviction = time.monotonic() + settings.BOT_FSM_TTL_SECONDS / 10
+        except KeyboardInterrupt:
+            self.stdout.write(f'Stopping, {dispatcher.pending} updates left to handle')
+        finally:
+            dispatcher.stop()
+            self.stdout.write(f'Telegram API: {self.tg_client.stats()}')
+            if shard is None:
+                # a restart continues from the checkpoint even if Telegram does not get the confirmation
+                self.checkpoint(dispatcher, offset)
+                try:
+                    self.tg_client.get_updates(offset=dispatcher.offset, timeout=0)
+                except TgApiError as exc:
+                    self.stderr.write(f'Confirming the handled updates failed: {exc}')
+
+    @staticmethod
+    def terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    def poll(self, dispatcher: ChatDispatcher, timeout: int = 60) -> None:
+        dispatcher.progress.clear()
+        res = self.tg_client.get_updates(offset=dispatcher.offset, timeout=timeout)
+        dispatched = [dispatcher.dispatch(item) for item in res.result]
+        if res.result and not any(dispatched):
+            # only updates that are still being handled came back
+            dispatcher.wait_for_progress(timeout)
+
+    @staticmethod
+    def checkpoint(dispatcher: ChatDispatcher, saved: int) -> int:
+        """Stores the offset when it moved, a restart continues from it instead of replaying."""
+        if (offset := dispatcher.offset) != saved:
+            checkpoint.save_offset(offset)
+        return offset
+
+    def consume(self, dispatcher: ChatDispatcher, shard: tuple[int, int]) -> None:
+        dispatcher.progress.clear()
+        updates = inbox.fetch(shard, exclude=dispatcher.pending_ids())
+        if not updates:
+            dispatcher.wait_for_progress(settings.BOT_INBOX_POLL_SECONDS)
+        for item in updates:
+            dispatcher.submit(item)
+
+    def handle_inbox_update(self, item: UpdateObj):
+        try:
+            self.handle_update(item)
+        finally:
+            inbox.done(item)
+
+    def handle_update(self, item: UpdateObj):
+        if item.message is None:
+            return
+        # an update redelivered after a crash or a deploy finds its claim and changes nothing again;
+        # replies are queued with the claim and go out after the commit, see outbox.reply
+        with transaction.atomic():
+            if checkpoint.claim(item.update_id):
                 self.handle_message(item.message)
 
+    def reply(self, chat_id: int, text: str) -> None:
+        outbox.reply(self.tg_client, chat_id, text)
+
     def handle_message(self, msg: Message):
         tg_user, _ = TgUser.objects.get_or_create(chat_id=msg.chat.id)
 
         if tg_user.is_verified:
-            self.handle_authorized_user(tg_user, msg)
+            try:
+                self.handle_authorized_user(tg_user, msg)
+            except StaleState:
+                # another process moved the chat on in the meantime, its reply wins
+                logger.warning('Dropped message of chat %s on a stale state', msg.chat.id)
         else:
             chat_id = msg.chat.id
 
-            self.tg_client.send_message(chat_id=chat_id, text='Hello')
+            self.reply(chat_id=chat_id, text='Hello')
 
             tg_user.update_verification_cade()
-            self.tg_client.send_message(chat_id=chat_id, text=f'Your verification_code: {tg_user.verification_code}')
+            self.reply(chat_id=chat_id, text=f'Your verification_code: {tg_user.verification_code}')
 
     def handle_authorized_user(self, tg_user: TgUser, msg: Message):
-        if msg.text.startswith('/'):
+        state = self.fsm.get(tg_user.chat_id)
+        if not msg.text:
+            self.reply(chat_id=msg.chat.id, text="Excuse me, i don't understand")
+        elif msg.text.startswith('/'):
             if msg.text == '/goals':
                 self.handle_goals_command(tg_user, msg)
             elif msg.text == '/create':
-                self.handle_create_command(tg_user, msg)
+                self.handle_create_command(tg_user, msg, state)
             elif msg.text == '/cancel':
-                self.clients.pop(tg_user.chat_id, None)
-                self.tg_client.send_message(chat_id=msg.chat.id, text='Ok, bro')
+                if state is not None:
+                    self.fsm.clear(state)
+                self.reply(chat_id=msg.chat.id, text='Ok, bro')
             else:
-                self.tg_client.send_message(chat_id=msg.chat.id, text='Command not found')
-        elif tg_user.chat_id in self.clients:
-            client = self.clients.get(tg_user.chat_id)
-            client.next_handler(tg_user=tg_user, msg=msg, **client.data)
+                self.reply(chat_id=msg.chat.id, text='Command not found')
+        elif state is not None and state.name in self.states:
+            self.states[state.name](tg_user=tg_user, msg=msg, state=state)
         else:
-            self.tg_client.send_message(chat_id=msg.chat.id, text="Excuse me, i don't understand")
+            if state is not None:
+                # a state of a command that does not exist anymore
+                self.fsm.clear(state)
+            self.reply(chat_id=msg.chat.id, text="Excuse me, i don't understand")
             
     def handle_goals_command(self, tg_user: TgUser, msg: Message):
         goals = Goal.objects.filter(user=tg_user.user, status__in=[1, 2, 3])
@@ -69,9 +183,9 @@ class Command(BaseCommand):
         else:
             text = 'You have not goals'
 
-        self.tg_client.send_message(chat_id=msg.chat.id, text=text)
+        self.reply(chat_id=msg.chat.id, text=text)
 
-    def handle_create_command(self, tg_user: TgUser, msg: Message):
+    def handle_create_command(self, tg_user: TgUser, msg: Message, state: ChatState | None):
         categories = GoalCategory.objects.filter(board__participants__user=tg_user.user).exclude(is_deleted=True)
         #categories = GoalCategory.objects.filter(user=tg_user.user).exclude(is_deleted=True)
         if categories:
@@ -79,46 +193,21 @@ class Command(BaseCommand):
         else:
             text = f'You have not categories. {tg_user.user.username}'
 
-        self.tg_client.send_message(chat_id=msg.chat.id, text=text)
-        self.clients[tg_user.chat_id] = FSMData(next_handler=self._get_category)
+        self.fsm.set(tg_user.chat_id, 'create.category', current=state)
+        self.reply(chat_id=msg.chat.id, text=text)
 
-    def _get_category(self, tg_user: TgUser, msg: Message, **kwargs):
+    def _get_category(self, tg_user: TgUser, msg: Message, state: ChatState):
         try:
             category = GoalCategory.objects.get(pk=msg.text)
-        except GoalCategory.DoesNotExist:
-            self.tg_client.send_message(chat_id=msg.chat.id, text='Category not found')
+        except (GoalCategory.DoesNotExist, ValueError):
+            self.reply(chat_id=msg.chat.id, text='Category not found')
         else:
-            self.clients[tg_user.chat_id] = FSMData(next_handler=self._create_goal, data={'category': category})
-            self.tg_client.send_message(chat_id=msg.chat.id, text='Set goal title')
-
-    def _create_goal(self, tg_user: TgUser, msg: Message, **kwargs):
-        category = kwargs['category']
-        new_goal = Goal.objects.create(category=category, user=tg_user.user, title=msg.text)
-        self.tg_client.send_message(tg_user.chat_id, 'Goal created')
-        self.clients.pop(tg_user.chat_id, None)
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+            self.fsm.set(tg_user.chat_id, 'create.title', data={'category': category.id}, current=state)
+            self.reply(chat_id=msg.chat.id, text='Set goal title')
+
+    def _create_goal(self, tg_user: TgUser, msg: Message, state: ChatState):
+        # the goal is created only by the handler that also ends the command
+        with transaction.atomic():
+            self.fsm.clear(state)
+            new_goal = Goal.objects.create(category_id=state.data['category'], user=tg_user.user, title=msg.text)
+        self.reply(tg_user.chat_id, 'Goal created')
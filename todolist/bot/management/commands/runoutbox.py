@@ -0,0 +1,27 @@
+import time
+
+from django.conf import settings
+from django.core.management import BaseCommand
+
+from bot.outbox import drain
+from bot.tg.client import TgClient
+
+
+class Command(BaseCommand):
+    help = 'Sends queued Telegram messages, see bot.outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Send what is due and exit')
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        client = TgClient()
+        self.stdout.write(self.style.SUCCESS('Outbox worker started'))
+        while True:
+            result = drain(client, batch_size=options['batch_size'])
+            if any(result.values()):
+                self.stdout.write(', '.join(f'{count} {name}' for name, count in result.items()))
+            elif options['once']:
+                return
+            else:
+                time.sleep(settings.BOT_OUTBOX_POLL_SECONDS)
@@ -0,0 +1,26 @@
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+from bot.tg.client import TgClient
+
+
+class Command(BaseCommand):
+    help = 'Registers the URL of bot.views.WebhookView with Telegram, or removes it to go back to polling'
+
+    def add_arguments(self, parser):
+        parser.add_argument('url', nargs='?', help='Public https URL of /bot/webhook')
+        parser.add_argument('--delete', action='store_true', help='Remove the webhook')
+
+    def handle(self, *args, **options):
+        tg_client = TgClient()
+        if options['delete']:
+            tg_client.delete_webhook()
+            self.stdout.write(self.style.SUCCESS('Webhook removed'))
+            return
+
+        if not options['url']:
+            raise CommandError('Pass the webhook URL or --delete')
+        if not settings.BOT_WEBHOOK_SECRET:
+            raise CommandError('Set BOT_WEBHOOK_SECRET first, the endpoint is disabled without it')
+        tg_client.set_webhook(options['url'], settings.BOT_WEBHOOK_SECRET, settings.BOT_WEBHOOK_MAX_CONNECTIONS)
+        self.stdout.write(self.style.SUCCESS(f'Webhook set to {options["url"]}'))
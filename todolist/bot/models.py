@@ -1,5 +1,6 @@
 from django.contrib.auth import get_user_model
 from django.db import models
+from django.utils import timezone
 from django.utils.crypto import get_random_string
 
 USER = get_user_model()
@@ -24,3 +25,66 @@ class TgUser(models.Model):
     @staticmethod
     def _generated_verification_code() -> str:
         return get_random_string(20)
+
+
+class OutboxMessage(models.Model):
+    """A Telegram message written with the change that caused it and sent later by runoutbox, see bot.outbox."""
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=["available_at", "id"],
+                condition=models.Q(sent_at=None, failed_at=None),
+                name="bot_outbox_pending",
+            ),
+        ]
+
+    chat_id = models.BigIntegerField()
+    text = models.TextField()
+    # what the message is about, e.g. "verification"
+    kind = models.CharField(max_length=50, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    # not picked up before this moment: retries are pushed back, claimed messages are leased
+    available_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+    failed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.__class__.__name__} {self.id} to {self.chat_id}'
+
+
+class TgFSMState(models.Model):
+    """Where a chat is in a multi-step bot command, see bot.fsm."""
+    chat_id = models.BigIntegerField(primary_key=True)
+    name = models.CharField(max_length=50)
+    data = models.JSONField(default=dict)
+    version = models.PositiveIntegerField(default=1)
+    updated = models.DateTimeField(auto_now=True, db_index=True)
+
+    def __str__(self):
+        return f'{self.__class__.__name__} {self.chat_id}: {self.name}'
+
+
+class TgUpdate(models.Model):
+    """An update received from Telegram and not handled yet, see bot.inbox."""
+    update_id = models.BigIntegerField(primary_key=True)
+    chat_id = models.BigIntegerField()
+    payload = models.JSONField()
+    received = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'{self.__class__.__name__} {self.update_id} of {self.chat_id}'
+
+
+class TgProcessedUpdate(models.Model):
+    """An update whose handling has committed, kept for BOT_PROCESSED_UPDATES_TTL_SECONDS, see bot.checkpoint."""
+    update_id = models.BigIntegerField(primary_key=True)
+    processed_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+
+class TgPollOffset(models.Model):
+    """The getUpdates offset a poller continues from after a restart."""
+    name = models.CharField(max_length=50, primary_key=True)
+    offset = models.BigIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
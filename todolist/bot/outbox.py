@@ -0,0 +1,99 @@
+import logging
+from datetime import timedelta
+from typing import Iterable
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from bot.models import OutboxMessage, TgUser
+from bot.tg.client import TgApiError, TgClient
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(chat_id: int, text: str, kind: str = '') -> OutboxMessage:
+    """Queues a message in the current transaction: it is sent only if the transaction commits."""
+    return OutboxMessage.objects.create(chat_id=chat_id, text=text, kind=kind)
+
+
+def reply(client: TgClient, chat_id: int, text: str) -> OutboxMessage:
+    """
+    Queues a message in the current transaction and sends it as soon as the transaction commits.
+
+    The message is leased to the sender meanwhile; if Telegram fails or the process dies first,
+    runoutbox sends it once the lease or the backoff runs out.
+    """
+    message = OutboxMessage.objects.create(
+        chat_id=chat_id, text=text, kind='reply', attempts=1,
+        available_at=timezone.now() + timedelta(seconds=settings.BOT_OUTBOX_LEASE_SECONDS),
+    )
+    transaction.on_commit(lambda: send(client, [message]))
+    return message
+
+
+def notify_users(user_ids: Iterable[int], text: str, kind: str = '') -> list[OutboxMessage]:
+    """Queues the message for every user with a verified Telegram chat."""
+    chat_ids = TgUser.objects.filter(user_id__in=set(user_ids)).values_list('chat_id', flat=True)
+    return OutboxMessage.objects.bulk_create([
+        OutboxMessage(chat_id=chat_id, text=text, kind=kind) for chat_id in chat_ids
+    ])
+
+
+def backoff(attempts: int) -> timedelta:
+    seconds = settings.BOT_OUTBOX_BACKOFF_SECONDS * 2 ** (attempts - 1)
+    return timedelta(seconds=min(seconds, settings.BOT_OUTBOX_BACKOFF_MAX_SECONDS))
+
+
+def claim(batch_size: int) -> list[OutboxMessage]:
+    """
+    The next due messages, leased to this worker for BOT_OUTBOX_LEASE_SECONDS so concurrent workers
+    skip them; a worker that dies mid-batch leaves them to be retried after the lease.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        messages = list(
+            OutboxMessage.objects.select_for_update(skip_locked=True)
+            .filter(sent_at=None, failed_at=None, available_at__lte=now)
+            .order_by('available_at', 'id')[:batch_size]
+        )
+        for message in messages:
+            message.attempts += 1
+            message.available_at = now + timedelta(seconds=settings.BOT_OUTBOX_LEASE_SECONDS)
+        OutboxMessage.objects.bulk_update(messages, ['attempts', 'available_at'])
+    return messages
+
+
+def drain(client: TgClient | None = None, batch_size: int | None = None) -> dict[str, int]:
+    """Sends one batch of due messages, see send."""
+    return send(client or TgClient(), claim(batch_size or settings.BOT_OUTBOX_BATCH_SIZE))
+
+
+def send(client: TgClient, messages: list[OutboxMessage]) -> dict[str, int]:
+    """
+    Sends claimed messages; failures are retried with exponential backoff up to
+    BOT_OUTBOX_MAX_ATTEMPTS, except errors Telegram will repeat, like a chat that blocked the bot.
+    """
+    sent, retried, failed = [], [], []
+    for message in messages:
+        try:
+            client.send_message(message.chat_id, message.text)
+        except Exception as exc:
+            now = timezone.now()
+            message.last_error = f'{type(exc).__name__}: {exc}'[:1000]
+            permanent = isinstance(exc, TgApiError) and not exc.retryable
+            if permanent or message.attempts >= settings.BOT_OUTBOX_MAX_ATTEMPTS:
+                message.failed_at = now
+                failed.append(message)
+                logger.warning('Giving up on %s after %d attempts: %s', message, message.attempts, message.last_error)
+            else:
+                message.available_at = now + backoff(message.attempts)
+                retried.append(message)
+        else:
+            sent.append(message.id)
+
+    if sent:
+        OutboxMessage.objects.filter(id__in=sent).update(sent_at=timezone.now())
+    OutboxMessage.objects.bulk_update(retried, ['available_at', 'last_error'])
+    OutboxMessage.objects.bulk_update(failed, ['failed_at', 'last_error'])
+    return {'sent': len(sent), 'retried': len(retried), 'failed': len(failed)}
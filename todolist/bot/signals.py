@@ -0,0 +1,20 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils.text import Truncator
+
+from bot.outbox import notify_users
+from goals.models import Goal, GoalComment
+
+# of the comment quoted in a notification, well within Telegram's 4096 characters per message
+COMMENT_PREVIEW_CHARS = 200
+
+
+@receiver(post_save, sender=GoalComment)
+def comment_added(sender, instance: GoalComment, created: bool, **kwargs) -> None:
+    # queued in the comment's transaction, the owner's own comments are not news to them
+    if not created:
+        return
+    owner_id, title = Goal.objects.values_list('user_id', 'title').get(pk=instance.goal_id)
+    if instance.user_id != owner_id:
+        text = Truncator(instance.text).chars(COMMENT_PREVIEW_CHARS)
+        notify_users([owner_id], f'New comment on "{title}": {text}', kind='comment')
@@ -0,0 +1,601 @@
+import io
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.test import APITestCase
+
+from goals.models import Board, BoardParticipant, Goal, GoalCategory
+
+from bot import checkpoint, inbox
+from bot.dispatcher import ChatDispatcher
+from bot.fsm import DatabaseFSMStore, FSMStore, MemoryFSMStore, StaleState
+from bot.management.commands.runbot import Command
+from bot.models import OutboxMessage, TgFSMState, TgProcessedUpdate, TgUpdate, TgUser
+from bot.outbox import drain, enqueue, notify_users
+from bot.tg.client import TgApiError, TgClient
+from bot.tg.fake import FakeTelegram
+from bot.tg.ratelimit import RateLimiter
+from bot.tg.schemas import GetUpdateResponse, UpdateObj
+
+User = get_user_model()
+
+
+class FakeTgClient:
+    def __init__(self, failing: set[int] = frozenset(), blocked: set[int] = frozenset()):
+        self.failing, self.blocked = failing, blocked
+        self.sent = []
+
+    def send_message(self, chat_id: int, text: str) -> None:
+        if chat_id in self.failing:
+            raise ConnectionError('Telegram is down')
+        if chat_id in self.blocked:
+            raise TgApiError('sendMessage', 403, 'Forbidden: bot was blocked by the user')
+        self.sent.append((chat_id, text))
+
+
+class OutboxTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+    def test_verification_is_queued(self):
+        TgUser.objects.create(chat_id=42, verification_code='code')
+        response = self.client.patch(reverse('bot-verify'), data={'verification_code': 'code'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['tg_id'], 42)
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.chat_id, message.kind, message.sent_at), (42, 'verification', None))
+
+        client = FakeTgClient()
+        self.assertEqual(drain(client), {'sent': 1, 'retried': 0, 'failed': 0})
+        self.assertEqual(client.sent, [(42, 'Bot token verified')])
+        self.assertIsNotNone(OutboxMessage.objects.get().sent_at)
+        self.assertEqual(drain(client), {'sent': 0, 'retried': 0, 'failed': 0})
+
+    def test_notify_users_skips_users_without_chat(self):
+        TgUser.objects.create(chat_id=1, user=self.user)
+        other = User.objects.create_user(username='other')
+
+        notify_users([self.user.id, other.id], 'Comment added', kind='comment')
+        self.assertEqual(list(OutboxMessage.objects.values_list('chat_id', 'kind')), [(1, 'comment')])
+
+    def test_comments_notify_the_goal_owner(self):
+        TgUser.objects.create(chat_id=1, user=self.user)
+        board = Board.objects.create(title='Board')
+        BoardParticipant.objects.create(board=board, user=self.user, role=BoardParticipant.Role.owner)
+        commenter = User.objects.create_user(username='commenter')
+        BoardParticipant.objects.create(board=board, user=commenter, role=BoardParticipant.Role.writer)
+        category = GoalCategory.objects.create(title='Category', user=self.user, board=board)
+        goal = Goal.objects.create(title='Goal', category=category, user=self.user)
+
+        self.client.post(reverse('create_goal_comment'), data={'goal': goal.id, 'text': 'Mine'})
+        self.assertFalse(OutboxMessage.objects.exists())
+
+        self.client.force_authenticate(user=commenter)
+        response = self.client.post(reverse('create_goal_comment'), data={'goal': goal.id, 'text': 'Done yet?'})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.chat_id, message.kind), (1, 'comment'))
+        self.assertEqual(message.text, 'New comment on "Goal": Done yet?')
+
+        self.client.post(reverse('create_goal_comment'), data={'goal': goal.id, 'text': 'x' * 5000})
+        text = OutboxMessage.objects.latest('id').text
+        self.assertLess(len(text), 300)
+        self.assertTrue(text.endswith('…'))
+
+    @override_settings(BOT_OUTBOX_BACKOFF_SECONDS=10, BOT_OUTBOX_MAX_ATTEMPTS=2)
+    def test_failures_back_off_then_give_up(self):
+        enqueue(1, 'ok')
+        broken = enqueue(2, 'broken')
+        client = FakeTgClient(failing={2})
+
+        self.assertEqual(drain(client), {'sent': 1, 'retried': 1, 'failed': 0})
+        broken.refresh_from_db()
+        self.assertEqual(broken.attempts, 1)
+        self.assertIn('Telegram is down', broken.last_error)
+        self.assertGreater(broken.available_at, timezone.now() + timedelta(seconds=5))
+        self.assertEqual(drain(client), {'sent': 0, 'retried': 0, 'failed': 0})
+
+        OutboxMessage.objects.filter(id=broken.id).update(available_at=timezone.now())
+        with self.assertLogs('bot.outbox', 'WARNING'):
+            self.assertEqual(drain(client), {'sent': 0, 'retried': 0, 'failed': 1})
+        broken.refresh_from_db()
+        self.assertIsNotNone(broken.failed_at)
+        self.assertEqual(client.sent, [(1, 'ok')])
+
+    def test_permanent_errors_are_not_retried(self):
+        message = enqueue(7, 'text')
+
+        with self.assertLogs('bot.outbox', 'WARNING'):
+            self.assertEqual(drain(FakeTgClient(blocked={7})), {'sent': 0, 'retried': 0, 'failed': 1})
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, 1)
+        self.assertIn('blocked', message.last_error)
+
+    def test_batches_in_order(self):
+        for chat_id in range(5):
+            enqueue(chat_id, 'text')
+        client = FakeTgClient()
+
+        # claim (savepoint, select, update, release) and one update of the sent rows
+        with self.assertNumQueries(5):
+            self.assertEqual(drain(client, batch_size=3)['sent'], 3)
+        drain(client, batch_size=3)
+        self.assertEqual([chat_id for chat_id, _ in client.sent], [0, 1, 2, 3, 4])
+
+
+def make_update(update_id: int, chat_id: int, text: str = 'text') -> UpdateObj:
+    return UpdateObj(update_id=update_id, message={'chat': {'id': chat_id}, 'text': text})
+
+
+class ChatDispatcherTestCase(SimpleTestCase):
+    def run_updates(self, handle, updates: list[UpdateObj], workers: int = 4) -> ChatDispatcher:
+        dispatcher = ChatDispatcher(handle, workers=workers, queue_size=10)
+        dispatcher.start()
+        for update in updates:
+            dispatcher.dispatch(update)
+        dispatcher.stop()
+        return dispatcher
+
+    def test_chats_run_in_parallel_and_in_order(self):
+        handled, lock = [], threading.Lock()
+
+        def handle(update: UpdateObj) -> None:
+            time.sleep(0.05)
+            with lock:
+                handled.append((update.message.chat.id, update.update_id))
+
+        updates = [make_update(i, chat_id=i % 4) for i in range(12)]
+        started = time.perf_counter()
+        dispatcher = self.run_updates(handle, updates)
+
+        self.assertLess(time.perf_counter() - started, 12 * 0.05 / 2)
+        for chat_id in range(4):
+            self.assertEqual([i for chat, i in handled if chat == chat_id], list(range(chat_id, 12, 4)))
+        self.assertEqual(dispatcher.offset, 12)
+
+    def test_offset_waits_for_slowest_update(self):
+        release = threading.Event()
+
+        def handle(update: UpdateObj) -> None:
+            if update.update_id == 5:
+                release.wait(5)
+
+        # one worker per chat
+        dispatcher = ChatDispatcher(handle, workers=3, queue_size=10)
+        dispatcher.start()
+        for update_id in (5, 6, 7):
+            dispatcher.dispatch(make_update(update_id, chat_id=update_id))
+        self.assertFalse(dispatcher.dispatch(make_update(6, chat_id=6)))
+
+        while dispatcher.pending > 1:
+            dispatcher.wait_for_progress(1)
+        self.assertEqual(dispatcher.offset, 5)
+        release.set()
+        dispatcher.stop()
+        self.assertEqual(dispatcher.offset, 8)
+
+    def test_failing_update_is_not_retried_forever(self):
+        def handle(update: UpdateObj) -> None:
+            raise ValueError('broken')
+
+        with self.assertLogs('bot.dispatcher', 'ERROR'):
+            dispatcher = self.run_updates(handle, [make_update(1, chat_id=1)])
+        self.assertEqual(dispatcher.offset, 2)
+
+    def test_full_queue_blocks_dispatch(self):
+        release = threading.Event()
+        dispatcher = ChatDispatcher(lambda update: release.wait(5), workers=1, queue_size=1)
+        dispatcher.start()
+        dispatcher.dispatch(make_update(1, chat_id=1))
+        dispatcher.dispatch(make_update(2, chat_id=1))
+
+        blocked = threading.Thread(target=dispatcher.dispatch, args=(make_update(3, chat_id=1),))
+        blocked.start()
+        blocked.join(0.1)
+        self.assertTrue(blocked.is_alive())
+        release.set()
+        blocked.join(5)
+        dispatcher.stop()
+        self.assertEqual(dispatcher.offset, 4)
+
+
+class RateLimiterTestCase(SimpleTestCase):
+    def setUp(self):
+        self.now = 0.0
+        self.limiter = RateLimiter(rate=30, burst=30, chat_rate=1, chat_burst=3, group_rate=20 / 60,
+                                   clock=lambda: self.now, sleep=lambda seconds: None)
+
+    def test_chat_burst_then_one_per_second(self):
+        self.assertEqual([self.limiter.reserve(1) for _ in range(3)], [0, 0, 0])
+        self.assertEqual(self.limiter.reserve(1), 1)
+        self.assertEqual(self.limiter.reserve(1), 2)
+        self.assertEqual(self.limiter.reserve(2), 0)
+
+        self.now = 10.0
+        self.assertEqual(self.limiter.reserve(1), 0)
+
+    def test_groups_are_slower(self):
+        [self.limiter.reserve(-100) for _ in range(3)]
+        self.assertAlmostEqual(self.limiter.reserve(-100), 3)
+
+    def test_global_rate(self):
+        delays = [self.limiter.reserve(chat_id) for chat_id in range(60)]
+        self.assertEqual(delays[:30], [0] * 30)
+        self.assertAlmostEqual(delays[-1], 1)
+
+    def test_idle_chats_are_forgotten(self):
+        self.limiter.max_chats = 2
+        self.limiter.reserve(1)
+        self.limiter.reserve(2)
+        self.now = 5.0
+        self.limiter.reserve(3)
+        self.assertEqual(list(self.limiter._chats), [3])
+
+
+@override_settings(BOT_API_RETRIES=2, BOT_API_BACKOFF_SECONDS=0.01, BOT_API_READ_TIMEOUT=0.5)
+class TgClientTestCase(SimpleTestCase):
+    def setUp(self):
+        self.server = FakeTelegram()
+        self.addCleanup(self.server.close)
+        self.tg_client = TgClient(token='test', api_url=self.server.url, rate_limited=False)
+
+    def test_reuses_connections(self):
+        for i in range(5):
+            self.assertEqual(self.tg_client.send_message(1, f'text {i}').result.text, f'text {i}')
+        self.assertEqual(self.server.connections, 1)
+        self.assertEqual(self.tg_client.stats()['methods']['sendMessage']['calls'], 5)
+
+    def test_retries_server_errors(self):
+        self.server.fail(502, 'Bad Gateway', times=2)
+        self.tg_client.get_updates(timeout=0)
+
+        self.assertEqual(len(self.server.calls), 3)
+        self.assertEqual(self.tg_client.stats()['methods']['getUpdates']['errors'], 2)
+
+    def test_sends_that_may_have_arrived_are_not_repeated(self):
+        for failure in ({'status': 502, 'description': 'Bad Gateway'}, {'status': 200, 'delay': 1}):
+            self.server.calls.clear()
+            self.server.fail(**failure)
+            with self.assertRaises(TgApiError) as raised:
+                self.tg_client.send_message(1, 'text')
+
+            self.assertTrue(raised.exception.retryable)
+            self.assertEqual(len(self.server.calls), 1)
+
+    def test_retries_sends_that_were_not_made(self):
+        closed = FakeTelegram()
+        closed.close()
+        tg_client = TgClient(token='test', api_url=closed.url, rate_limited=False)
+        with self.assertRaises(TgApiError), mock.patch('time.sleep') as sleep:
+            tg_client.send_message(1, 'text')
+
+        self.assertEqual(sleep.call_count, 2)
+
+    def test_honors_retry_after(self):
+        self.server.fail(429, 'Too Many Requests: retry after 1', retry_after=1)
+        started = time.perf_counter()
+        self.tg_client.send_message(1, 'text')
+
+        self.assertGreaterEqual(time.perf_counter() - started, 1)
+        self.assertEqual(len(self.server.calls), 2)
+
+    def test_client_errors_are_not_retried(self):
+        self.server.fail(403, 'Forbidden: bot was blocked by the user')
+        with self.assertRaises(TgApiError) as raised:
+            self.tg_client.send_message(1, 'text')
+
+        self.assertEqual((raised.exception.status, raised.exception.retryable), (403, False))
+        self.assertEqual(len(self.server.calls), 1)
+
+    def test_read_timeout(self):
+        self.server.fail(200, delay=1, times=3)
+        with self.assertRaises(TgApiError) as raised:
+            self.tg_client.get_updates(timeout=0)
+
+        self.assertIsNone(raised.exception.status)
+        self.assertEqual(len(self.server.calls), 3)
+
+    def test_rate_limited_sends_wait(self):
+        tg_client = TgClient(token='test', api_url=self.server.url)
+        tg_client.limiter = RateLimiter(rate=100, burst=1, chat_rate=100, chat_burst=1, group_rate=1)
+        started = time.perf_counter()
+        for _ in range(3):
+            tg_client.send_message(1, 'text')
+
+        self.assertGreaterEqual(time.perf_counter() - started, 0.02)
+        self.assertEqual(tg_client.stats()['waiting'], 0)
+
+
+class FSMStoreTestCase(APITestCase):
+    stores = [DatabaseFSMStore, MemoryFSMStore]
+
+    def test_incomplete_store_fails_on_creation(self):
+        class ReadOnlyStore(FSMStore):
+            def get(self, chat_id: int) -> None:
+                return None
+
+        with self.assertRaises(TypeError):
+            ReadOnlyStore()
+
+    def test_transitions(self):
+        for store_class in self.stores:
+            with self.subTest(store_class.__name__):
+                store = store_class()
+                self.assertIsNone(store.get(1))
+                state = store.set(1, 'create.category')
+                state = store.set(1, 'create.title', {'category': 5}, current=state)
+
+                self.assertEqual(store.get(1), state)
+                self.assertEqual((state.name, state.data, state.version), ('create.title', {'category': 5}, 2))
+                store.clear(state)
+                self.assertIsNone(store.get(1))
+
+    def test_concurrent_writes(self):
+        for store_class in self.stores:
+            with self.subTest(store_class.__name__):
+                store = store_class()
+                state = store.set(2, 'create.category')
+                store.set(2, 'create.title', current=state)
+
+                with self.assertRaises(StaleState):
+                    store.set(2, 'create.title', current=state)
+                with self.assertRaises(StaleState):
+                    store.clear(state)
+                with self.assertRaises(StaleState):
+                    store.set(2, 'create.category')
+
+    @override_settings(BOT_FSM_TTL_SECONDS=60)
+    def test_expiry(self):
+        for store_class in self.stores:
+            with self.subTest(store_class.__name__):
+                store = store_class()
+                store.set(3, 'create.category')
+                store.set(4, 'create.category')
+                with override_settings(BOT_FSM_TTL_SECONDS=0):
+                    self.assertIsNone(store.get(3))
+                    self.assertEqual(store.evict_expired(), 1)
+                self.assertIsNone(store.get(4))
+                store.set(3, 'create.category')
+
+
+class RunbotTestCase(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        TgUser.objects.create(chat_id=10, user=self.user)
+        board = Board.objects.create(title='Board')
+        BoardParticipant.objects.create(board=board, user=self.user, role=BoardParticipant.Role.owner)
+        self.category = GoalCategory.objects.create(title='Category', user=self.user, board=board)
+        self.command = Command()
+        self.command.tg_client = FakeTgClient()
+
+    def handle(self, update: UpdateObj) -> None:
+        # replies are sent on commit of the handler's transaction
+        with self.captureOnCommitCallbacks(execute=True):
+            self.command.handle_update(update)
+
+    def say(self, text: str, chat_id: int = 10, update_id: int | None = None) -> str:
+        if update_id is None:
+            update_id = TgProcessedUpdate.objects.count() + 1
+        self.handle(make_update(update_id, chat_id, text))
+        return self.command.tg_client.sent[-1][1]
+
+    def test_create_goal(self):
+        self.assertIn(self.category.title, self.say('/create'))
+        self.assertEqual(TgFSMState.objects.get().name, 'create.category')
+        self.assertEqual(self.say('0'), 'Category not found')
+        self.assertEqual(self.say(str(self.category.id)), 'Set goal title')
+        self.assertEqual(TgFSMState.objects.get().data, {'category': self.category.id})
+
+        # state survives a restart
+        self.command = Command()
+        self.command.tg_client = FakeTgClient()
+        self.assertEqual(self.say('New goal'), 'Goal created')
+        self.assertEqual(Goal.objects.get().title, 'New goal')
+        self.assertFalse(TgFSMState.objects.exists())
+
+    def test_redelivered_updates_are_skipped(self):
+        self.say('/create', update_id=1)
+        self.say(str(self.category.id), update_id=2)
+        self.say('New goal', update_id=3)
+        sent = len(self.command.tg_client.sent)
+
+        # a restart before the offset was confirmed replays them all
+        self.command = Command()
+        self.command.tg_client = FakeTgClient()
+        for update_id, text in enumerate(['/create', str(self.category.id), 'New goal'], start=1):
+            self.handle(make_update(update_id, 10, text))
+
+        self.assertEqual(Goal.objects.count(), 1)
+        self.assertEqual(self.command.tg_client.sent, [])
+        self.assertEqual(sent, 3)
+
+    def test_failed_updates_run_again(self):
+        with mock.patch.object(Command, 'handle_goals_command', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                self.handle(make_update(1, 10, '/goals'))
+        self.assertFalse(TgProcessedUpdate.objects.exists())
+
+        self.handle(make_update(1, 10, '/goals'))
+        self.assertEqual(self.command.tg_client.sent, [(10, 'You have not goals')])
+
+    def test_offset_checkpoint(self):
+        self.assertEqual(checkpoint.load_offset(), 0)
+        dispatcher = ChatDispatcher(lambda update: None, workers=1, queue_size=10, offset=5)
+        self.assertEqual(dispatcher.offset, 5)
+        self.assertFalse(dispatcher.dispatch(make_update(4, 10)))
+
+        self.assertEqual(Command.checkpoint(dispatcher, saved=0), 5)
+        self.assertEqual(checkpoint.load_offset(), 5)
+        with self.assertNumQueries(0):
+            Command.checkpoint(dispatcher, saved=5)
+
+    def test_checkpoint_is_saved_when_confirming_fails(self):
+        def poll(dispatcher, timeout=60):
+            dispatcher.dispatch(make_update(5, 10))
+            raise KeyboardInterrupt
+
+        self.command.tg_client = mock.Mock()
+        self.command.tg_client.get_updates.side_effect = TgApiError('getUpdates', 502, 'Bad Gateway')
+        stderr = io.StringIO()
+        with mock.patch('signal.signal'), mock.patch.object(self.command, 'poll', poll), \
+                mock.patch.object(self.command, 'handle_update'):
+            call_command(self.command, workers=1, stdout=io.StringIO(), stderr=stderr)
+
+        self.assertEqual(checkpoint.load_offset(), 6)
+        self.assertIn('Bad Gateway', stderr.getvalue())
+
+    @override_settings(BOT_OUTBOX_BACKOFF_SECONDS=10)
+    def test_failed_replies_stay_in_the_outbox(self):
+        self.command.tg_client = FakeTgClient(failing={10})
+        self.handle(make_update(1, 10, '/goals'))
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.kind, message.attempts, message.sent_at), ('reply', 1, None))
+        self.assertGreater(message.available_at, timezone.now() + timedelta(seconds=5))
+
+        OutboxMessage.objects.update(available_at=timezone.now())
+        client = FakeTgClient()
+        self.assertEqual(drain(client)['sent'], 1)
+        self.assertEqual(client.sent, [(10, 'You have not goals')])
+
+    def test_processed_updates_expire(self):
+        checkpoint.claim(1)
+        TgProcessedUpdate.objects.filter(update_id=1).update(processed_at=timezone.now() - timedelta(days=3))
+        checkpoint.claim(2)
+
+        self.assertEqual(checkpoint.evict_processed(), 1)
+        self.assertEqual(list(TgProcessedUpdate.objects.values_list('update_id', flat=True)), [2])
+
+    def test_cancel(self):
+        self.say('/create')
+        self.assertEqual(self.say('/cancel'), 'Ok, bro')
+        self.assertFalse(TgFSMState.objects.exists())
+        self.assertEqual(self.say('hello'), "Excuse me, i don't understand")
+
+    def test_messages_without_text(self):
+        self.say('/create')
+        self.say(str(self.category.id))
+        self.handle(UpdateObj(update_id=10, message={'chat': {'id': 10}}))
+
+        self.assertEqual(self.command.tg_client.sent[-1][1], "Excuse me, i don't understand")
+        self.assertFalse(Goal.objects.exists())
+        self.handle(UpdateObj(update_id=11))
+
+    def test_stale_state_does_not_create(self):
+        self.say('/create')
+        self.say(str(self.category.id))
+        state = self.command.fsm.get(10)
+        self.command.fsm.set(10, 'create.category', current=state)
+
+        with self.assertRaises(StaleState):
+            self.command._create_goal(self.user.tguser, make_update(1, 10, 'Goal').message, state=state)
+        self.assertFalse(Goal.objects.exists())
+
+    def test_shards_consume_their_chats(self):
+        TgUser.objects.bulk_create([TgUser(chat_id=chat_id) for chat_id in (11, -13, 14)])
+        inbox.store([make_update(1, 11), make_update(2, -13), make_update(3, 14), make_update(3, 14)])
+        self.assertEqual(TgUpdate.objects.count(), 3)
+
+        handled = []
+        dispatcher = ChatDispatcher(handled.append, workers=2, queue_size=10)
+        dispatcher.start()
+        self.command.consume(dispatcher, inbox.parse_shard('1/2'))
+        dispatcher.stop()
+        self.assertEqual([update.update_id for update in handled], [1, 2])
+        self.assertEqual(inbox.fetch((1, 2), exclude={1}), [make_update(2, -13)])
+        self.assertEqual(inbox.fetch((0, 2), exclude=set()), [make_update(3, 14)])
+
+        with self.assertRaises(ValueError):
+            inbox.parse_shard('2/2')
+
+
+@override_settings(BOT_WEBHOOK_SECRET='secret')
+class WebhookTestCase(APITestCase):
+    url = reverse('bot-webhook')
+
+    def post(self, payload: dict, secret: str = 'secret'):
+        return self.client.post(self.url, data=payload, format='json', HTTP_X_TELEGRAM_BOT_API_SECRET_TOKEN=secret)
+
+    def test_updates_go_to_the_inbox(self):
+        payload = {'update_id': 5, 'message': {'message_id': 1, 'chat': {'id': 42, 'type': 'private'}, 'text': 'hi'}}
+        with self.assertNumQueries(1):
+            self.assertEqual(self.post(payload).status_code, status.HTTP_200_OK)
+        # Telegram delivers again when it missed the answer
+        self.assertEqual(self.post(payload).status_code, status.HTTP_200_OK)
+
+        self.assertEqual(inbox.fetch((0, 1), exclude=set()), [make_update(5, 42, 'hi')])
+
+    def test_other_updates_are_acknowledged(self):
+        response = self.post({'update_id': 6, 'edited_message': {'chat': {'id': 42}, 'text': 'hi'}})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(TgUpdate.objects.exists())
+
+    def test_secret(self):
+        self.assertEqual(self.post({'update_id': 7}, secret='wrong').status_code, status.HTTP_403_FORBIDDEN)
+        self.assertEqual(self.post({'update_id': 7}, secret='').status_code, status.HTTP_403_FORBIDDEN)
+        with override_settings(BOT_WEBHOOK_SECRET=''):
+            self.assertEqual(self.post({'update_id': 7}, secret='').status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_invalid_payload(self):
+        self.assertEqual(self.post({'message': {}}).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_messages_without_text(self):
+        res = GetUpdateResponse(ok=True, result=[{'update_id': 1, 'message': {'chat': {'id': 1}, 'sticker': {}}}])
+        self.assertIsNone(res.result[0].message.text)
+
+
+@override_settings(BOT_WEBHOOK_SECRET='secret', BOT_WEBHOOK_MAX_CONNECTIONS=10)
+class SetWebhookTestCase(SimpleTestCase):
+    def setUp(self):
+        self.server = FakeTelegram()
+        self.addCleanup(self.server.close)
+        override = override_settings(BOT_API_URL=self.server.url)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_set_and_delete(self):
+        call_command('setwebhook', 'https://example.com/bot/webhook', stdout=io.StringIO())
+        call_command('setwebhook', '--delete', stdout=io.StringIO())
+
+        (set_method, params), (delete_method, _) = self.server.calls
+        self.assertEqual((set_method, delete_method), ('setWebhook', 'deleteWebhook'))
+        self.assertEqual(params['url'], 'https://example.com/bot/webhook')
+        self.assertEqual((params['secret_token'], params['max_connections']), ('secret', '10'))
+
+    def test_requires_url(self):
+        with self.assertRaises(CommandError):
+            call_command('setwebhook')
+
+
+@override_settings(BOT_API_RETRIES=0, BOT_API_BACKOFF_SECONDS=1, BOT_API_BACKOFF_MAX_SECONDS=8)
+class PollbotTestCase(APITestCase):
+    def setUp(self):
+        self.server = FakeTelegram()
+        self.addCleanup(self.server.close)
+        override = override_settings(BOT_API_URL=self.server.url)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_backs_off_on_errors(self):
+        self.server.fail(429, 'Too Many Requests', retry_after=3)
+        self.server.fail(502, 'Bad Gateway', times=2)
+        stderr = io.StringIO()
+        # interrupted on the third wait
+        with mock.patch('signal.signal'), mock.patch('bot.management.commands.pollbot.time') as clock, \
+                mock.patch.object(TgClient, 'backoff', side_effect=lambda attempt: attempt * 10):
+            clock.sleep.side_effect = [None, None, KeyboardInterrupt]
+            call_command('pollbot', stdout=io.StringIO(), stderr=stderr)
+
+        self.assertEqual([call.args[0] for call in clock.sleep.call_args_list], [3, 20, 30])
+        self.assertEqual(stderr.getvalue().count('Polling failed'), 3)
@@ -1,40 +1,150 @@
+import json
+import logging
+import random
+import threading
+import time
+from collections import defaultdict
 from typing import Any
 
 import requests
+from django.conf import settings
 from pydantic import ValidationError
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 
-from bot.tg.schemas import GetUpdateResponse, SendMessageResponse
-from todolist import settings
+from bot.tg.ratelimit import RateLimiter
+from bot.tg.schemas import BoolResponse, GetUpdateResponse, SendMessageResponse
+
+logger = logging.getLogger(__name__)
+
+# the update kinds runbot handles, the others are not sent at all
+ALLOWED_UPDATES = json.dumps(['message'])
+
+
+class TgApiError(Exception):
+    def __init__(self, method: str, status: int | None, description: str, retry_after: float | None = None):
+        super().__init__(f'{method}: {status or "no response"} {description}')
+        self.method, self.status, self.description, self.retry_after = method, status, description, retry_after
+
+    @property
+    def retryable(self) -> bool:
+        """Network errors, flood control and server errors; anything else fails the same way again."""
+        return self.status is None or self.status == 429 or self.status >= 500
+
+
+class TgMetrics:
+    """Calls, errors and latency per API method."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._methods = defaultdict(lambda: {'calls': 0, 'errors': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+
+    def observe(self, method: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            stats = self._methods[method]
+            stats['calls'] += 1
+            stats['errors'] += not ok
+            stats['seconds'] += seconds
+            stats['max_seconds'] = max(stats['max_seconds'], seconds)
+
+    def snapshot(self) -> dict[str, dict]:
+        with self._lock:
+            return {
+                method: {
+                    'calls': stats['calls'],
+                    'errors': stats['errors'],
+                    'avg_ms': round(stats['seconds'] / stats['calls'] * 1000, 1),
+                    'max_ms': round(stats['max_seconds'] * 1000, 1),
+                }
+                for method, stats in self._methods.items()
+            }
 
 
 class TgClient:
-    def __init__(self, token: str | None = None) -> None:
+    """
+    Bot API client for use from many threads: one pooled keep-alive session, connect/read timeouts,
+    retries with jittered exponential backoff that honor `retry_after`, and sendMessage paced by a
+    RateLimiter. sendMessage is not idempotent, so it is retried only when Telegram cannot have
+    acted on it: the connection was never made, or flood control turned it away.
+    """
+
+    def __init__(self, token: str | None = None, api_url: str | None = None, rate_limited: bool = True) -> None:
         self.__token = token if token else settings.BOT_TOKEN
-        self.__base_url = f"https://api.telegram.org/bot{self.__token}"
+        self.__base_url = f"{api_url or settings.BOT_API_URL}/bot{self.__token}"
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.BOT_API_POOL_SIZE)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.limiter = RateLimiter.from_settings() if rate_limited else None
+        self.metrics = TgMetrics()
 
     def __get_url(self, method: str) -> str:
         return f"{self.__base_url}/{method}"
 
-    def _get(self, command: str, **params: Any) -> dict:
-        url = self.__get_url(command)
-        response = requests.get(url, params=params)
-        if not response.ok:
-            print(f'Requests error. Status: {response.status_code}. Command: {command}. Url: {url}')
-            return {'ok': False, 'result': []}
-        return response.json()
+    def _get(self, command: str, read_timeout: float | None = None, idempotent: bool = True, **params: Any) -> dict:
+        timeout = (settings.BOT_API_CONNECT_TIMEOUT, read_timeout or settings.BOT_API_READ_TIMEOUT)
+        for attempt in range(settings.BOT_API_RETRIES + 1):
+            started = time.perf_counter()
+            try:
+                response = self.session.get(self.__get_url(command), params=params, timeout=timeout)
+                data = response.json()
+            except requests.RequestException as exc:
+                error = TgApiError(command, getattr(exc.response, 'status_code', None), str(exc))
+                unsent = not_connected(exc)
+            else:
+                if response.ok and data.get('ok'):
+                    self.metrics.observe(command, time.perf_counter() - started, ok=True)
+                    return data
+                retry_after = (data.get('parameters') or {}).get('retry_after')
+                error = TgApiError(command, response.status_code, data.get('description', ''), retry_after)
+                unsent = response.status_code == 429
+            self.metrics.observe(command, time.perf_counter() - started, ok=False)
+
+            if not error.retryable or not (idempotent or unsent) or attempt == settings.BOT_API_RETRIES:
+                raise error
+            time.sleep(error.retry_after if error.retry_after is not None else self.backoff(attempt))
+
+    @staticmethod
+    def backoff(attempt: int) -> float:
+        ceiling = min(settings.BOT_API_BACKOFF_MAX_SECONDS, settings.BOT_API_BACKOFF_SECONDS * 2 ** attempt)
+        return random.uniform(0, ceiling)
+
+    def stats(self) -> dict:
+        """API latency per method and the number of sends waiting for the rate limiter."""
+        return {'methods': self.metrics.snapshot(), 'waiting': self.limiter.waiting if self.limiter else 0}
 
     def get_updates(self, offset: int = 0, timeout: int = 60) -> GetUpdateResponse:
-        data = self._get('getUpdates', offset=offset, timeout=timeout)
+        # the long poll itself must not count against the read timeout
+        data = self._get('getUpdates', read_timeout=timeout + settings.BOT_API_READ_TIMEOUT, offset=offset,
+                         timeout=timeout, allowed_updates=ALLOWED_UPDATES)
         return GetUpdateResponse(**data)
 
+    def set_webhook(self, url: str, secret_token: str, max_connections: int) -> BoolResponse:
+        data = self._get('setWebhook', url=url, secret_token=secret_token, max_connections=max_connections,
+                         allowed_updates=ALLOWED_UPDATES)
+        return BoolResponse(**data)
+
+    def delete_webhook(self) -> BoolResponse:
+        return BoolResponse(**self._get('deleteWebhook'))
+
     def send_message(self, chat_id: int, text: str) -> SendMessageResponse:
-        data = self._get('sendMessage', chat_id=chat_id, text=text)
+        if self.limiter is not None:
+            self.limiter.acquire(chat_id)
+        data = self._get('sendMessage', idempotent=False, chat_id=chat_id, text=text)
         return SendMessageResponse(**data)
 
 
+def not_connected(exc: requests.RequestException) -> bool:
+    """Whether the request failed before it could reach Telegram, unlike read timeouts and dropped connections."""
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = getattr(exc.args[0], 'reason', None) if exc.args else None
+    return isinstance(exc, requests.ConnectionError) and isinstance(reason, NewConnectionError)
+
+
 def _serialize_response(serializer_class, data):
     try:
         return serializer_class(**data)
     except ValidationError as ex:
-        print(f"Failed to serialized telegram  response due {ex}")
+        logger.warning('Failed to serialize a Telegram response: %s', ex)
         raise ValueError
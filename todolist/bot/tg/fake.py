@@ -0,0 +1,92 @@
+import json
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+
+class FakeTelegram(ThreadingHTTPServer):
+    """
+    A local stand-in for the Bot API, for tests and benchmarks: serves prepared updates, answers
+    sendMessage after `latency` seconds and replays queued failures first.
+    """
+    daemon_threads = True
+
+    def __init__(self, updates: list[dict] = (), latency: float = 0.0):
+        self.updates, self.latency = list(updates), latency
+        self.failures: deque[dict] = deque()
+        self.calls: list[tuple[str, dict]] = []
+        self.connections = 0
+        self.lock = threading.Lock()
+        super().__init__(('127.0.0.1', 0), FakeTelegramHandler)
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def url(self) -> str:
+        return f'http://127.0.0.1:{self.server_port}'
+
+    def fail(self, status: int, description: str = 'Error', retry_after: int | None = None, delay: float = 0.0,
+             times: int = 1) -> None:
+        """The next `times` calls answer `status` after `delay` seconds."""
+        for _ in range(times):
+            self.failures.append({'status': status, 'description': description, 'retry_after': retry_after,
+                                  'delay': delay})
+
+    def handle_error(self, request, client_address) -> None:
+        # clients that time out on a delayed answer hang up before it is written
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+    def close(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+class FakeTelegramHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # headers and body go out in separate writes, which Nagle would hold back on a kept-alive connection
+    disable_nagle_algorithm = True
+    server: FakeTelegram
+
+    def setup(self) -> None:
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def do_GET(self) -> None:
+        url = urlparse(self.path)
+        params = {key: values[0] for key, values in parse_qs(url.query).items()}
+        method = url.path.rsplit('/', 1)[-1]
+        with self.server.lock:
+            self.server.calls.append((method, params))
+            failure = self.server.failures.popleft() if self.server.failures else None
+
+        if failure is not None:
+            time.sleep(failure['delay'])
+            payload = {'ok': False, 'error_code': failure['status'], 'description': failure['description']}
+            if failure['retry_after'] is not None:
+                payload['parameters'] = {'retry_after': failure['retry_after']}
+            return self.respond(failure['status'], payload)
+
+        if method == 'getUpdates':
+            offset = int(params.get('offset', 0))
+            result = [update for update in self.server.updates if update['update_id'] >= offset][:100]
+        elif method == 'sendMessage':
+            time.sleep(self.server.latency)
+            result = {'chat': {'id': int(params['chat_id'])}, 'text': params['text']}
+        else:
+            result = True
+        self.respond(200, {'ok': True, 'result': result})
+
+    def respond(self, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args) -> None:
+        pass
@@ -0,0 +1,90 @@
+import threading
+import time
+from typing import Callable
+
+from django.conf import settings
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float, now: float):
+        self.rate, self.capacity = rate, capacity
+        self.tokens, self.updated = capacity, now
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, now: float) -> float:
+        """Takes a token, ahead of time if needed; returns the seconds until it is actually available."""
+        self.refill(now)
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class RateLimiter:
+    """
+    Global and per-chat token buckets in front of sendMessage, after Telegram's limits: about 30 messages
+    a second overall, one a second to a private chat and 20 a minute to a group (negative chat ids).
+
+    Callers reserve a token from both buckets and sleep until the later one is due, so concurrent
+    senders are spread out in the order they asked instead of all hitting 429 together.
+    """
+
+    def __init__(
+        self,
+        rate: float,
+        burst: float,
+        chat_rate: float,
+        chat_burst: float,
+        group_rate: float,
+        max_chats: int = 10_000,
+        clock: Callable[[], float] = time.monotonic,
+        sleep: Callable[[float], None] = time.sleep,
+    ):
+        self.chat_rate, self.chat_burst, self.group_rate, self.max_chats = chat_rate, chat_burst, group_rate, max_chats
+        self.clock, self.sleep = clock, sleep
+        self._lock = threading.Lock()
+        self._global = TokenBucket(rate, burst, clock())
+        self._chats: dict[int, TokenBucket] = {}
+        self.waiting = 0
+
+    @classmethod
+    def from_settings(cls) -> 'RateLimiter':
+        return cls(
+            rate=settings.BOT_SEND_RATE,
+            burst=settings.BOT_SEND_BURST,
+            chat_rate=settings.BOT_CHAT_SEND_RATE,
+            chat_burst=settings.BOT_CHAT_SEND_BURST,
+            group_rate=settings.BOT_GROUP_SEND_RATE,
+        )
+
+    def reserve(self, chat_id: int) -> float:
+        with self._lock:
+            now = self.clock()
+            bucket = self._chats.get(chat_id)
+            if bucket is None:
+                if len(self._chats) >= self.max_chats:
+                    self.forget_idle(now)
+                rate = self.group_rate if chat_id < 0 else self.chat_rate
+                bucket = self._chats[chat_id] = TokenBucket(rate, self.chat_burst, now)
+            return max(self._global.reserve(now), bucket.reserve(now))
+
+    def forget_idle(self, now: float) -> None:
+        """Drops the buckets that have refilled completely, they would be created the same way again."""
+        for chat_id, bucket in list(self._chats.items()):
+            bucket.refill(now)
+            if bucket.tokens >= bucket.capacity:
+                del self._chats[chat_id]
+
+    def acquire(self, chat_id: int) -> float:
+        """Blocks until a message to the chat may be sent; returns the time waited."""
+        delay = self.reserve(chat_id)
+        if delay > 0:
+            with self._lock:
+                self.waiting += 1
+            try:
+                self.sleep(delay)
+            finally:
+                with self._lock:
+                    self.waiting -= 1
+        return delay
@@ -7,12 +7,14 @@ class Chat(BaseModel):
 
 class Message(BaseModel):
     chat: Chat
-    text: str | None
+    # None for stickers, photos and other messages without text
+    text: str | None = None
 
 
 class UpdateObj(BaseModel):
     update_id: int
-    message: Message
+    # None for the kinds of update the bot does not handle, like edited messages
+    message: Message | None = None
 
 
 class SendMessageResponse(BaseModel):
@@ -23,3 +25,8 @@ class SendMessageResponse(BaseModel):
 class GetUpdateResponse(BaseModel):
     ok: bool
     result: list[UpdateObj]
+
+
+class BoolResponse(BaseModel):
+    ok: bool
+    result: bool
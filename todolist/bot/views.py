@@ -1,10 +1,18 @@
-from rest_framework import generics, permissions
+from django.conf import settings
+from django.db import transaction
+from django.utils.crypto import constant_time_compare
+from pydantic import ValidationError
+from rest_framework import generics, permissions, status
+from rest_framework.exceptions import NotFound, ParseError, PermissionDenied
 from rest_framework.request import Request
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from bot import inbox
 from bot.models import TgUser
+from bot.outbox import enqueue
 from bot.serializers import TgUserSerializer
-from bot.tg.client import TgClient
+from bot.tg.schemas import UpdateObj
 
 
 class VerificationView(generics.GenericAPIView):
@@ -14,8 +22,33 @@ class VerificationView(generics.GenericAPIView):
     def patch(self, request: Request, *args, **kwargs):
         serializer = TgUserSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        tg_user: TgUser = serializer.save(user=request.user)
-
-        TgClient().send_message(tg_user.chat_id, 'Bot token verified')
+        with transaction.atomic():
+            tg_user: TgUser = serializer.save(user=request.user)
+            enqueue(tg_user.chat_id, 'Bot token verified', kind='verification')
 
         return Response(serializer.data)
+
+
+class WebhookView(APIView):
+    """
+    Where Telegram posts updates once `manage.py setwebhook` has registered the URL. Requests must carry
+    BOT_WEBHOOK_SECRET in X-Telegram-Bot-Api-Secret-Token.
+
+    Updates are only stored in the inbox and acknowledged, `runbot --shard i/n` processes handle them.
+    """
+    authentication_classes = []
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request: Request, *args, **kwargs):
+        if not settings.BOT_WEBHOOK_SECRET:
+            raise NotFound
+        secret = request.headers.get('X-Telegram-Bot-Api-Secret-Token', '')
+        if not constant_time_compare(secret, settings.BOT_WEBHOOK_SECRET):
+            raise PermissionDenied
+
+        try:
+            update = UpdateObj.model_validate_json(request.body)
+        except ValidationError as exc:
+            raise ParseError(str(exc))
+        inbox.store([update])
+        return Response(status=status.HTTP_200_OK)
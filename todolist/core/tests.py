@@ -8,6 +8,7 @@ from rest_framework.serializers import ValidationError
 from rest_framework.test import APITestCase
 
 from core.serializers import RegistrationSerializer, LoginSerializer
+from todolist.testing import QueryBudgetMixin
 
 User = get_user_model()
 
@@ -150,6 +151,19 @@ class ProfileViewTestCase(APITestCase):
         self.assertTrue('csrftoken' in response.cookies)
 
 
+class ProfileQueryBudgetTestCase(QueryBudgetMixin, APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.client.force_authenticate(user=self.user)
+
+    def seed_users(self, count: int) -> None:
+        start = User.objects.count()
+        User.objects.bulk_create([User(username=f'user{i}') for i in range(start, start + count)])
+
+    def test_profile_view_query_budget(self):
+        self.assertQueryBudget(reverse('profile'), self.seed_users, max_queries=0)
+
+
 class UpdatePasswordViewTestCase(APITestCase):
     def setUp(self):
         self.user = User.objects.create_user(username='testuser', password='testpassword')
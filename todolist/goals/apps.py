@@ -1,6 +1,13 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class GoalsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'goals'
+
+    def ready(self):
+        from goals import signals  # noqa: F401
+        from goals.search import ensure_sqlite_fts
+
+        post_migrate.connect(ensure_sqlite_fts, sender=self)
@@ -0,0 +1,406 @@
+import asyncio
+import importlib
+import io
+import json
+import random
+import statistics
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Iterator
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.test import Client, override_settings
+from django.urls import clear_url_caches, reverse
+from rest_framework.test import APIClient
+
+from goals.events import get_broker
+from goals.importer import GoalImporter, read_rows
+from goals.models import Board, BoardParticipant, GoalCategory, Goal, GoalComment
+from rest_framework.renderers import JSONRenderer
+
+from goals.serializers import GoalSerializerWithUser
+from goals.streams import BoardEventRouter
+from todolist.pagination import KeysetPagination
+from todolist.renderers import ORJSONRenderer
+from todolist.values import ValuesPlan
+
+User = get_user_model()
+
+SCENARIOS: dict[str, Callable] = {}
+
+
+def scenario(func: Callable | None = None, name: str | None = None) -> Callable:
+    def register(func: Callable) -> Callable:
+        SCENARIOS[name or func.__name__] = func
+        return func
+    return register(func) if func else register
+
+
+def timed(func: Callable, repeat: int) -> float:
+    """Median wall time of `repeat` calls, in milliseconds."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+
+def get_bench_board(username: str = 'bench') -> tuple[User, Board, GoalCategory]:
+    user, _ = User.objects.get_or_create(username=username)
+    participant = BoardParticipant.objects.filter(user=user).select_related('board').first()
+    if participant:
+        board = participant.board
+    else:
+        board = Board.objects.create(title='Bench')
+        BoardParticipant.objects.create(user=user, board=board, role=BoardParticipant.Role.owner)
+    category, _ = GoalCategory.objects.get_or_create(board=board, user=user, title='Bench', is_deleted=False)
+    return user, board, category
+
+
+def grow_goals(category: GoalCategory, user: User, total: int, batch_size: int = 5000) -> None:
+    existing = Goal.objects.filter(category=category).count()
+    for start in range(existing, total, batch_size):
+        Goal.objects.bulk_create([
+            Goal(title=f'Goal {i:08}', description='bench', category=category, user=user)
+            for i in range(start, min(start + batch_size, total))
+        ])
+
+
+def sizes(maximum: int) -> Iterator[int]:
+    size = 1000
+    while size < maximum:
+        yield size
+        size *= 10
+    yield maximum
+
+
+@scenario
+def pagination(out, goals: int = 100_000, limit: int = 50, repeat: int = 5, **kwargs) -> None:
+    """Latency of the last page of goal/list: limit/offset vs keyset cursor."""
+    user, _, category = get_bench_board()
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse('list_goal')
+
+    out(f'{"goals":>8} {"offset, ms":>12} {"cursor, ms":>12}')
+    for size in sizes(goals):
+        grow_goals(category, user, size)
+        # the cursor of the row right before the last page, as the client would have received it
+        anchor = Goal.objects.filter(category=category).order_by('title', 'id')[size - limit - 1]
+        cursor = KeysetPagination().encode_cursor([anchor.title, anchor.id], reverse=False)
+
+        offset_ms = timed(lambda: client.get(url, data={'limit': limit, 'offset': size - limit}), repeat)
+        cursor_ms = timed(lambda: client.get(url, data={'limit': limit, 'cursor': cursor}), repeat)
+        out(f'{size:>8} {offset_ms:>12.1f} {cursor_ms:>12.1f}')
+
+
+WORDS = ['milk', 'bread', 'deploy', 'release', 'review', 'budget', 'design', 'meeting', 'invoice', 'backup',
+         'sprint', 'bug', 'report', 'travel', 'dentist', 'gym', 'book', 'garden', 'taxes', 'music']
+
+
+def grow_comments(goal: Goal, user: User, total: int, batch_size: int = 5000) -> None:
+    rng = random.Random(total)
+    existing = GoalComment.objects.filter(goal__category=goal.category).count()
+    for start in range(existing, total, batch_size):
+        GoalComment.objects.bulk_create([
+            GoalComment(goal=goal, user=user, text=' '.join(rng.choices(WORDS, k=12)))
+            for _ in range(start, min(start + batch_size, total))
+        ])
+
+
+@scenario
+def search(out, comments: int = 1_000_000, limit: int = 20, repeat: int = 5, **kwargs) -> None:
+    """Latency of goals/search as the number of comments on the user's boards grows."""
+    user, _, category = get_bench_board()
+    grow_goals(category, user, 1000)
+    goal = Goal.objects.filter(category=category).first()
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse('search')
+
+    out(f'{"comments":>10} {"one word, ms":>14} {"two words, ms":>14}')
+    for size in sizes(comments):
+        grow_comments(goal, user, size)
+        one = timed(lambda: client.get(url, data={'q': 'dentist', 'limit': limit}), repeat)
+        two = timed(lambda: client.get(url, data={'q': 'garden taxes', 'limit': limit}), repeat)
+        out(f'{size:>10} {one:>14.1f} {two:>14.1f}')
+
+
+@scenario
+def bulk(out, goals: int = 10_000, limit: int = 1000, repeat: int = 3, **kwargs) -> None:
+    """Goal mutations per second: one PATCH per goal vs goal/bulk batches of `limit` operations."""
+    user, _, category = get_bench_board()
+    grow_goals(category, user, goals)
+    client = APIClient()
+    client.force_authenticate(user=user)
+    ids = list(Goal.objects.filter(category=category).exclude(status=Goal.Status.archived)
+               .values_list('id', flat=True)[:goals])
+
+    single = ids[:min(200, len(ids))]
+    single_ms = timed(lambda: [
+        client.patch(reverse('detail_goal', args=[goal_id]), data={'priority': Goal.Priority.high})
+        for goal_id in single
+    ], 1)
+
+    batches = [ids[i:i + limit] for i in range(0, len(ids), limit)]
+    bulk_ms = timed(lambda: [
+        client.post(reverse('bulk_goal'), format='json', data={
+            'update': [{'id': goal_id, 'priority': Goal.Priority.low} for goal_id in batch],
+        }) for batch in batches
+    ], repeat)
+
+    out(f'{"mode":>8} {"mutations":>10} {"per second":>12}')
+    out(f'{"single":>8} {len(single):>10} {len(single) / single_ms * 1000:>12.0f}')
+    out(f'{"bulk":>8} {len(ids):>10} {len(ids) / bulk_ms * 1000:>12.0f}')
+
+
+@scenario
+def export(out, comments: int = 500_000, repeat: int = 1, **kwargs) -> None:
+    """Time and peak Python memory of streaming board/<pk>/export as the board grows."""
+    user, board, category = get_bench_board()
+    grow_goals(category, user, 1000)
+    goal = Goal.objects.filter(category=category).first()
+    client = APIClient()
+    client.force_authenticate(user=user)
+    url = reverse('board_export', args=[board.id])
+
+    def consume(fmt: str) -> None:
+        for _ in client.get(url, data={'format': fmt}).streaming_content:
+            pass
+
+    out(f'{"comments":>10} {"format":>8} {"ms":>10} {"peak, KiB":>10}')
+    for size in sizes(comments):
+        grow_comments(goal, user, size)
+        for fmt in ('ndjson', 'csv'):
+            tracemalloc.start()
+            ms = timed(lambda: consume(fmt), repeat)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            out(f'{size:>10} {fmt:>8} {ms:>10.1f} {peak / 1024:>10.0f}')
+
+
+@scenario(name='import')
+def import_(out, goals: int = 1_000_000, repeat: int = 1, **kwargs) -> None:
+    """Rows per second and peak Python memory of GoalImporter on an NDJSON file of `goals` goals."""
+    user, board, category = get_bench_board()
+    lines = (json.dumps({'category': category.id, 'title': f'Imported {i:08}'}) + '\n' for i in range(goals))
+    content = ''.join(lines).encode()
+
+    tracemalloc.start()
+    seconds = timed(lambda: GoalImporter(board, user=user).run(read_rows(io.BytesIO(content), 'ndjson')), repeat) / 1000
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    out(f'{"goals":>10} {"seconds":>10} {"rows/s":>10} {"peak, KiB":>10}')
+    out(f'{goals:>10} {seconds:>10.1f} {goals / seconds:>10.0f} {peak / 1024:>10.0f}')
+
+
+@scenario
+def board_scope(out, goals: int = 100_000, comments: int = 500_000, limit: int = 50, repeat: int = 5,
+                **kwargs) -> None:
+    """First page of the goal and comment lists scoped through categories vs through the stored board."""
+    user, _, category = get_bench_board()
+    scopes = {
+        'goals': (
+            Goal.objects.select_related('user').filter(category__is_deleted=False)
+            .exclude(status=Goal.Status.archived).order_by('title'),
+            {'category__board__participants__user': user},
+            {'board__participants__user': user},
+        ),
+        'comments': (
+            GoalComment.objects.order_by('-created'),
+            {'goal__category__board__participants__user': user},
+            {'board__participants__user': user},
+        ),
+    }
+
+    out(f'{"goals":>8} {"comments":>10} {"list":>10} {"joined, ms":>12} {"stored, ms":>12}')
+    for size in sizes(goals):
+        grow_goals(category, user, size)
+        grow_comments(Goal.objects.filter(category=category).first(), user, comments * size // goals)
+        for name, (queryset, joined, stored) in scopes.items():
+            joined_ms = timed(lambda: list(queryset.filter(**joined)[:limit]), repeat)
+            stored_ms = timed(lambda: list(queryset.filter(**stored)[:limit]), repeat)
+            out(f'{size:>8} {comments * size // goals:>10} {name:>10} {joined_ms:>12.1f} {stored_ms:>12.1f}')
+
+
+@scenario
+def serialize(out, limit: int = 1000, repeat: int = 5, **kwargs) -> None:
+    """Serialized goal rows per second: ModelSerializer vs ValuesPlan, then JSONRenderer vs ORJSONRenderer."""
+    user, _, category = get_bench_board()
+    grow_goals(category, user, limit)
+    queryset = Goal.objects.select_related('user').filter(category=category).order_by('id')
+    plan = ValuesPlan(GoalSerializerWithUser)
+
+    data = GoalSerializerWithUser(queryset[:limit], many=True).data
+    steps = {
+        'serializer': lambda: GoalSerializerWithUser(queryset[:limit], many=True).data,
+        'values plan': lambda: plan.to_representation(queryset.values(*plan.lookups)[:limit]),
+        'json render': lambda: JSONRenderer().render(data),
+        'orjson render': lambda: ORJSONRenderer().render(data),
+    }
+    out(f'{"step":>14} {"ms":>8} {"rows/s":>10}')
+    for name, step in steps.items():
+        ms = timed(step, repeat)
+        out(f'{name:>14} {ms:>8.1f} {limit / ms * 1000:>10.0f}')
+
+
+@contextmanager
+def list_views_mounted(async_views: bool) -> Iterator[None]:
+    """goals.urls re-imported with ASYNC_LIST_VIEWS switched, the configured mounting restored afterwards."""
+    import goals.urls
+
+    def remount() -> None:
+        importlib.reload(goals.urls)
+        clear_url_caches()
+
+    with override_settings(ASYNC_LIST_VIEWS=async_views):
+        remount()
+    try:
+        yield
+    finally:
+        remount()
+
+
+def wsgi_get(app: WSGIHandler, environ: dict) -> int:
+    status = []
+    body = app(dict(environ), lambda line, headers: status.append(int(line.split()[0])))
+    for _ in body:
+        pass
+    body.close()
+    return status[0]
+
+
+async def asgi_get(app: ASGIHandler, scope: dict) -> int:
+    status = []
+
+    async def receive() -> dict:
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message: dict) -> None:
+        if message['type'] == 'http.response.start':
+            status.append(message['status'])
+
+    await app(dict(scope), receive, send)
+    return status[0]
+
+
+@scenario
+def server(out, limit: int = 50, repeat: int = 5, **kwargs) -> None:
+    """
+    Requests per second of one process on goal/list at growing concurrency: WSGIHandler with a thread per
+    client vs ASGIHandler with a task per client, the latter with the sync and the async list views.
+    """
+    user, _, category = get_bench_board()
+    grow_goals(category, user, limit * 10)
+    client = Client()
+    client.force_login(user)
+    cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+    host = settings.ALLOWED_HOSTS[0].lstrip('.').replace('*', 'localhost')
+    path, query = reverse('list_goal'), f'limit={limit}'
+    requests = 50 * repeat
+
+    environ = {
+        'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': host, 'SERVER_PORT': '80', 'HTTP_HOST': host, 'HTTP_COOKIE': cookie,
+        'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(), 'wsgi.errors': io.StringIO(),
+    }
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', host.encode()), (b'cookie', cookie.encode())],
+        'server': (host, 80), 'client': ('127.0.0.1', 0),
+    }
+
+    def run_wsgi(concurrency: int) -> list[int]:
+        app = WSGIHandler()
+        with ThreadPoolExecutor(concurrency) as pool:
+            return list(pool.map(lambda _: wsgi_get(app, environ), range(requests)))
+
+    def run_asgi(concurrency: int) -> list[int]:
+        app = ASGIHandler()
+
+        async def run() -> list[int]:
+            semaphore = asyncio.Semaphore(concurrency)
+
+            async def one() -> int:
+                async with semaphore:
+                    return await asgi_get(app, scope)
+            return await asyncio.gather(*(one() for _ in range(requests)))
+        return asyncio.run(run())
+
+    paths = {
+        'wsgi sync': (run_wsgi, False),
+        'asgi sync': (run_asgi, False),
+        'asgi async': (run_asgi, True),
+    }
+    out(f'{"path":>12} {"clients":>8} {"requests":>9} {"seconds":>8} {"req/s":>8}')
+    for name, (run, async_views) in paths.items():
+        # every request builds its page, a warm list cache would hide the difference
+        with list_views_mounted(async_views), override_settings(LIST_RESPONSE_CACHE=None):
+            for concurrency in (1, 10, 50, 200):
+                started = time.perf_counter()
+                statuses = run(concurrency)
+                seconds = time.perf_counter() - started
+                if set(statuses) != {200}:
+                    raise RuntimeError(f'{name}: unexpected statuses {sorted(set(statuses))}')
+                out(f'{name:>12} {concurrency:>8} {requests:>9} {seconds:>8.2f} {requests / seconds:>8.0f}')
+
+
+@scenario
+def subscribers(out, subscribers: int = 10_000, **kwargs) -> None:
+    """Idle board event streams held by one process: memory per stream and fan-out time of one event."""
+    user, board, _ = get_bench_board()
+    client = Client()
+    client.force_login(user)
+    cookie = f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+    path = f'/goals/board/{board.id}/events'
+    scope = {
+        'type': 'http', 'method': 'GET', 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+        'root_path': '', 'scheme': 'http', 'headers': [(b'cookie', cookie.encode())], 'server': ('localhost', 80),
+    }
+    router = BoardEventRouter(None)
+
+    async def run(count: int) -> tuple[float, float, float]:
+        disconnect, ready, delivered = asyncio.Event(), asyncio.Semaphore(0), asyncio.Semaphore(0)
+
+        async def receive() -> dict:
+            await disconnect.wait()
+            return {'type': 'http.disconnect'}
+
+        async def send(message: dict) -> None:
+            data = message.get('body', b'')
+            if b'event: ready' in data:
+                ready.release()
+            elif b'event: goal.updated' in data:
+                delivered.release()
+
+        tracemalloc.start()
+        started = time.perf_counter()
+        tasks = [asyncio.ensure_future(router(dict(scope), receive, send)) for _ in range(count)]
+        for _ in range(count):
+            await ready.acquire()
+        subscribe_seconds = time.perf_counter() - started
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        started = time.perf_counter()
+        get_broker().publish([{'type': 'goal.updated', 'board': board.id, 'id': 0}])
+        for _ in range(count):
+            await delivered.acquire()
+        fanout_ms = (time.perf_counter() - started) * 1000
+
+        disconnect.set()
+        await asyncio.gather(*tasks)
+        return subscribe_seconds, memory / count, fanout_ms
+
+    out(f'{"streams":>8} {"subscribe, s":>13} {"KiB/stream":>11} {"fan-out, ms":>12}')
+    for size in sizes(subscribers):
+        subscribe_seconds, per_stream, fanout_ms = asyncio.run(run(size))
+        out(f'{size:>8} {subscribe_seconds:>13.1f} {per_stream / 1024:>11.1f} {fanout_ms:>12.1f}')
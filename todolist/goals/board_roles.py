@@ -0,0 +1,63 @@
+from typing import Iterable
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from django.db import transaction
+from rest_framework.request import Request
+
+from goals.models import BoardParticipant
+
+WRITE_ROLES = (BoardParticipant.Role.owner, BoardParticipant.Role.writer)
+
+
+def _shared_cache() -> BaseCache | None:
+    alias = getattr(settings, 'BOARD_ROLES_CACHE', None)
+    return caches[alias] if alias else None
+
+
+def _cache_key(user_id: int) -> str:
+    return f'board-roles:{user_id}'
+
+
+def load_board_roles(user_id: int) -> dict[int, int]:
+    """{board_id: role} of every board the user participates in."""
+    cache = _shared_cache()
+    if cache is not None and (roles := cache.get(_cache_key(user_id))) is not None:
+        return roles
+
+    roles = dict(BoardParticipant.objects.filter(user_id=user_id).values_list('board_id', 'role'))
+    if cache is not None:
+        cache.set(_cache_key(user_id), roles, settings.BOARD_ROLES_CACHE_TIMEOUT)
+    return roles
+
+
+def get_board_roles(request: Request) -> dict[int, int]:
+    """The requesting user's role map, loaded at most once per request."""
+    user_id = request.user.id
+    if user_id is None:
+        return {}
+
+    cached = getattr(request, '_board_roles', None)
+    if cached is None or cached[0] != user_id:
+        cached = (user_id, load_board_roles(user_id))
+        request._board_roles = cached
+    return cached[1]
+
+
+def has_board_role(request: Request, board_id: int, roles: Iterable[int] | None = None) -> bool:
+    role = get_board_roles(request).get(board_id)
+    if role is None:
+        return False
+    return roles is None or role in roles
+
+
+def invalidate_board_roles(*user_ids: int) -> None:
+    """Drops shared role maps once the participant change is committed."""
+    cache = _shared_cache()
+    if cache is None or not user_ids:
+        return
+
+    keys = [_cache_key(user_id) for user_id in set(user_ids)]
+    cache.delete_many(keys)
+    # a concurrent request may have cached the old rows before our commit
+    transaction.on_commit(lambda: cache.delete_many(keys))
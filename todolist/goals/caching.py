@@ -0,0 +1,47 @@
+import threading
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+
+
+class ListResponseCache:
+    """
+    Serialized list pages keyed by a fingerprint of user, board roles, board versions and query.
+
+    A write to a board changes its version and therefore every key built from it, so entries are
+    never invalidated explicitly: stale ones are simply not asked for again and age out of the backend.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    @property
+    def backend(self) -> BaseCache | None:
+        alias = settings.LIST_RESPONSE_CACHE
+        return caches[alias] if alias else None
+
+    @staticmethod
+    def _key(fingerprint: str) -> str:
+        return f'list-response:{fingerprint}'
+
+    def get(self, fingerprint: str):
+        backend = self.backend
+        data = backend.get(self._key(fingerprint)) if backend is not None else None
+        with self._lock:
+            if data is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return data
+
+    def set(self, fingerprint: str, data) -> None:
+        if (backend := self.backend) is not None:
+            backend.set(self._key(fingerprint), data)
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses}
+
+
+list_response_cache = ListResponseCache()
@@ -0,0 +1,64 @@
+import threading
+
+from django.conf import settings
+from django.db import transaction, close_old_connections
+from django.utils import timezone
+
+from goals.counters import count_goal_changes
+from goals.events import event, publish
+from goals.models import Board, GoalCategory, Goal, SoftDeleteCascade
+from goals.versioning import bump_board_version
+
+
+def start_cascade(board: Board, category: GoalCategory | None = None) -> SoftDeleteCascade:
+    """Records the cascade and runs it after the surrounding transaction commits."""
+    cascade = SoftDeleteCascade.objects.create(board=board, category=category)
+    transaction.on_commit(lambda: schedule_cascade(cascade.id))
+    return cascade
+
+
+def schedule_cascade(cascade_id: int) -> None:
+    if not settings.SOFT_DELETE_CASCADE_BACKGROUND:
+        run_cascade(cascade_id)
+        return
+
+    def target():
+        try:
+            run_cascade(cascade_id)
+        finally:
+            close_old_connections()
+
+    threading.Thread(target=target, name=f'cascade-{cascade_id}', daemon=True).start()
+
+
+def run_cascade(cascade_id: int, chunk_size: int | None = None) -> SoftDeleteCascade:
+    """Archives the remaining goals chunk by chunk; safe to call again after an interruption."""
+    chunk_size = chunk_size or settings.SOFT_DELETE_CASCADE_CHUNK_SIZE
+    while True:
+        with transaction.atomic():
+            cascade = SoftDeleteCascade.objects.select_for_update().get(id=cascade_id)
+            if cascade.finished:
+                return cascade
+
+            chunk = list(
+                cascade.goals()
+                .filter(id__gt=cascade.last_goal_id)
+                .order_by('id')
+                .values_list('id', flat=True)[:chunk_size]
+            )
+            if chunk:
+                goals = Goal.objects.filter(id__in=chunk).exclude(status=Goal.Status.archived)
+                before = list(goals.select_for_update().values_list('id', 'category_id', 'board_id', 'status'))
+                cascade.archived += goals.update(status=Goal.Status.archived, updated=timezone.now())
+                count_goal_changes([(state[1:], (*state[1:3], Goal.Status.archived)) for state in before])
+                publish(*(event('goal', 'archived', board_id, goal_id) for goal_id, _, board_id, _ in before))
+                cascade.last_goal_id = chunk[-1]
+            else:
+                cascade.finished = timezone.now()
+            cascade.save(update_fields=['archived', 'last_goal_id', 'finished', 'updated'])
+            bump_board_version(cascade.board_id)
+
+
+def resume_cascades() -> list[SoftDeleteCascade]:
+    return [run_cascade(cascade_id) for cascade_id in
+            SoftDeleteCascade.objects.filter(finished=None).order_by('id').values_list('id', flat=True)]
@@ -0,0 +1,121 @@
+from collections import Counter, defaultdict
+from typing import Iterable
+
+from django.db import transaction
+from django.db.models import Count, F, Value
+from django.db.models.functions import Greatest
+
+from goals.models import Board, GoalCategory, Goal, GoalComment
+
+STATUS_COUNTERS = {
+    Goal.Status.to_do: 'goals_to_do',
+    Goal.Status.in_progress: 'goals_in_progress',
+    Goal.Status.done: 'goals_done',
+    Goal.Status.archived: 'goals_archived',
+}
+
+GoalState = tuple[int, int, int]
+
+
+def _add(model, deltas: dict[int, Counter]) -> None:
+    """
+    One F() update per row; counters never go below zero, drift is left to reconcile_counters.
+
+    `updated` is left alone: counters are derived data, a sync client recounts from the rows it receives.
+    """
+    for pk, fields in deltas.items():
+        changes = {field: Greatest(F(field) + delta, Value(0)) for field, delta in fields.items() if delta}
+        if changes:
+            model.objects.filter(pk=pk).update(**changes)
+
+
+def count_goal_changes(changes: Iterable[tuple[GoalState | None, GoalState | None]]) -> None:
+    """Moves goals between (category_id, board_id, status) counters, given (before, after) pairs."""
+    by_category, by_board = defaultdict(Counter), defaultdict(Counter)
+    for before, after in changes:
+        if before == after:
+            continue
+        for state, delta in ((before, -1), (after, 1)):
+            if state is not None:
+                category_id, board_id, status = state
+                by_category[category_id][STATUS_COUNTERS[status]] += delta
+                by_board[board_id][STATUS_COUNTERS[status]] += delta
+    _add(GoalCategory, by_category)
+    _add(Board, by_board)
+
+
+def count_comments(deltas: Counter[int]) -> None:
+    """Adds {goal_id: delta} to Goal.comments_count."""
+    _add(Goal, {goal_id: Counter(comments_count=delta) for goal_id, delta in deltas.items()})
+
+
+def move_category_counters(category_id: int, old_board_id: int, new_board_id: int) -> None:
+    counts = GoalCategory.objects.filter(pk=category_id).values(*STATUS_COUNTERS.values()).get()
+    _add(Board, {
+        old_board_id: Counter({field: -count for field, count in counts.items()}),
+        new_board_id: Counter(counts),
+    })
+
+
+def _reconcile(model, group_by: str, queryset, dry_run: bool) -> int:
+    with transaction.atomic():
+        # lock first, so concurrent F() updates land either before the count or on top of it
+        rows = list(queryset.select_for_update().only('id', *STATUS_COUNTERS.values()))
+        actual = defaultdict(Counter)
+        for key, status, count in (
+            Goal.objects.filter(**{f'{group_by}__in': [row.id for row in rows]})
+            .values_list(group_by, 'status').annotate(count=Count('id')).order_by()
+        ):
+            actual[key][STATUS_COUNTERS[status]] = count
+
+        drifted = [
+            row for row in rows
+            if any(getattr(row, field) != actual[row.id][field] for field in STATUS_COUNTERS.values())
+        ]
+        if not dry_run:
+            for row in drifted:
+                for field in STATUS_COUNTERS.values():
+                    setattr(row, field, actual[row.id][field])
+            model.objects.bulk_update(drifted, list(STATUS_COUNTERS.values()), batch_size=1000)
+    return len(drifted)
+
+
+def reconcile_counters(board_ids: list[int] | None = None, chunk_size: int = 1000, dry_run: bool = False) -> dict:
+    """Recounts every counter from the rows themselves; returns the number of drifted rows per model."""
+    boards = Board.objects.order_by('id')
+    categories = GoalCategory.objects.order_by('id')
+    goals = Goal.objects.order_by('id')
+    if board_ids:
+        boards, categories, goals = (
+            queryset.filter(**{field: board_ids})
+            for queryset, field in ((boards, 'id__in'), (categories, 'board_id__in'), (goals, 'board_id__in'))
+        )
+
+    fixed = {'boards': 0, 'categories': 0, 'goals': 0}
+    for key, model, queryset, group_by in (
+        ('boards', Board, boards, 'board_id'),
+        ('categories', GoalCategory, categories, 'category_id'),
+    ):
+        ids = list(queryset.values_list('id', flat=True))
+        for start in range(0, len(ids), chunk_size):
+            fixed[key] += _reconcile(model, group_by, model.objects.filter(id__in=ids[start:start + chunk_size]),
+                                     dry_run)
+
+    last_id = 0
+    while True:
+        with transaction.atomic():
+            chunk = list(goals.filter(id__gt=last_id).select_for_update().only('id', 'comments_count')[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            actual = dict(
+                GoalComment.objects.filter(goal_id__in=[goal.id for goal in chunk])
+                .values_list('goal_id').annotate(count=Count('id')).order_by()
+            )
+            drifted = [goal for goal in chunk if goal.comments_count != actual.get(goal.id, 0)]
+            fixed['goals'] += len(drifted)
+            if not dry_run:
+                for goal in drifted:
+                    goal.comments_count = actual.get(goal.id, 0)
+                Goal.objects.bulk_update(drifted, ['comments_count'], batch_size=1000)
+    return fixed
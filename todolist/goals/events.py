@@ -0,0 +1,222 @@
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+from goals.models import Goal
+
+logger = logging.getLogger(__name__)
+
+
+def event(kind: str, action: str, board_id: int, object_id: int | None, **extra) -> dict:
+    """
+    `{kind}.{action}` of a board, participant, category, goal or comment: created, updated, archived
+    or deleted. `board.changed` stands for bulk writes; clients fetch the rows themselves through sync.
+    """
+    return {'type': f'{kind}.{action}', 'board': board_id, 'id': object_id, **extra}
+
+
+def goal_events(goal: Goal, before: tuple[int, int, int] | None, created: bool = False) -> list[dict]:
+    """Events of a saved goal, given the (category_id, board_id, status) it was loaded with."""
+    events = []
+    if before is not None and before[1] != goal.board_id:
+        events.append(event('goal', 'deleted', before[1], goal.id))
+    if created:
+        action = 'created'
+    elif goal.status == Goal.Status.archived and (before is None or before[2] != Goal.Status.archived):
+        action = 'archived'
+    else:
+        action = 'updated'
+    events.append(event('goal', action, goal.board_id, goal.id))
+    return events
+
+
+def publish(*events: dict) -> None:
+    """Hands the events to the broker once the current transaction commits, right away outside one."""
+    if events:
+        transaction.on_commit(lambda: _publish(list(events)))
+
+
+def _publish(events: list[dict]) -> None:
+    # a broker outage must not fail the write that has already been committed
+    try:
+        get_broker().publish(events)
+    except Exception:
+        logger.exception('Could not publish %d board events', len(events))
+
+
+class Subscription:
+    """One consumer's events of one board, read with `await get()` from the loop that subscribed."""
+
+    def __init__(self, broker: 'Broker', board_id: int, limit: int):
+        self.broker, self.board_id, self.limit = broker, board_id, limit
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue[dict] = asyncio.Queue()
+        self.overflowed = False
+
+    def put(self, events: list[dict]) -> None:
+        """Runs on the subscriber's loop; a consumer that falls behind gets a single `reset` instead."""
+        if self.overflowed:
+            return
+        if self.queue.qsize() + len(events) > self.limit:
+            self.overflowed = True
+            events = [{'type': 'reset', 'board': self.board_id}]
+        for item in events:
+            self.queue.put_nowait(item)
+
+    async def get(self) -> dict:
+        return await self.queue.get()
+
+    def close(self) -> None:
+        self.broker.unsubscribe(self)
+
+
+class Broker(ABC):
+    """
+    Where committed events go: publish() is called from sync code of any thread, subscribe()
+    and unsubscribe() from the event loop serving the stream.
+    """
+
+    @abstractmethod
+    def publish(self, events: list[dict]) -> None:
+        ...
+
+    @abstractmethod
+    def subscribe(self, board_id: int) -> Subscription:
+        ...
+
+    @abstractmethod
+    def unsubscribe(self, subscription: Subscription) -> None:
+        ...
+
+
+class InProcessBroker(Broker):
+    """Fan-out to the subscribers of this process only."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._subscriptions: dict[int, set[Subscription]] = defaultdict(set)
+
+    def publish(self, events: list[dict]) -> None:
+        self.deliver(events)
+
+    def subscribe(self, board_id: int) -> Subscription:
+        subscription = Subscription(self, board_id, settings.EVENT_STREAM_QUEUE_SIZE)
+        with self._lock:
+            self._subscriptions[board_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.board_id)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.board_id]
+
+    def subscriber_count(self) -> int:
+        with self._lock:
+            return sum(map(len, self._subscriptions.values()))
+
+    def deliver(self, events: list[dict]) -> None:
+        by_board = defaultdict(list)
+        for item in events:
+            by_board[item['board']].append(item)
+
+        # one wake-up per loop rather than per subscriber
+        batches = defaultdict(list)
+        with self._lock:
+            for board_id, board_events in by_board.items():
+                for subscription in self._subscriptions.get(board_id, ()):
+                    batches[subscription.loop].append((subscription, board_events))
+        for loop, batch in batches.items():
+            try:
+                loop.call_soon_threadsafe(self._put, batch)
+            except RuntimeError:
+                # the loop is closed, its streams are gone
+                pass
+
+    @staticmethod
+    def _put(batch: list[tuple[Subscription, list[dict]]]) -> None:
+        for subscription, events in batch:
+            subscription.put(events)
+
+
+class PostgresBroker(InProcessBroker):
+    """
+    Fan-out across processes and nodes through LISTEN/NOTIFY on the application database.
+
+    Every process listens on one dedicated connection, started with the first subscription, and
+    delivers what it hears to its own subscribers.
+    """
+    channel = 'goals_board_events'
+    # NOTIFY payloads are limited to 8000 bytes
+    max_payload = 7000
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._listener: threading.Thread | None = None
+
+    def publish(self, events: list[dict]) -> None:
+        with connection.cursor() as cursor:
+            for payload in self.payloads(events):
+                cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, payload])
+
+    def payloads(self, events: list[dict]) -> list[str]:
+        payloads, chunk = [], []
+        for item in events:
+            if chunk and len(json.dumps(chunk + [item])) > self.max_payload:
+                payloads.append(json.dumps(chunk))
+                chunk = []
+            chunk.append(item)
+        if chunk:
+            payloads.append(json.dumps(chunk))
+        return payloads
+
+    def subscribe(self, board_id: int) -> Subscription:
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self.listen, name='board-events', daemon=True)
+                self._listener.start()
+        return super().subscribe(board_id)
+
+    def listen(self) -> None:
+        import psycopg2
+
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(**connection.get_connection_params())
+                conn.autocommit = True
+                with conn.cursor() as cursor:
+                    cursor.execute(f'LISTEN {self.channel}')
+                while True:
+                    if select.select([conn], [], [], 5) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self.deliver(json.loads(conn.notifies.pop(0).payload))
+            except Exception:
+                logger.exception('Board event listener failed, reconnecting')
+                time.sleep(1)
+            finally:
+                if conn is not None:
+                    conn.close()
+
+
+_brokers: dict[str, Broker] = {}
+
+
+def get_broker() -> Broker:
+    path = settings.EVENT_BROKER
+    if path not in _brokers:
+        _brokers[path] = import_string(path)()
+    return _brokers[path]
@@ -0,0 +1,89 @@
+import csv
+import io
+import json
+from typing import Iterator
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from rest_framework.renderers import BaseRenderer
+
+from goals.models import GoalCategory, Goal, GoalComment
+
+CHUNK_SIZE = 2000
+
+COLUMNS = {
+    'category': ['id', 'title', 'created', 'updated'],
+    'goal': ['id', 'category', 'title', 'description', 'due_date', 'status', 'priority', 'user__username',
+             'created', 'updated'],
+    'comment': ['id', 'goal', 'text', 'user__username', 'created', 'updated'],
+}
+CSV_HEADER = ['type', 'id', 'category', 'goal', 'title', 'description', 'text', 'due_date', 'status', 'priority',
+              'user', 'created', 'updated']
+
+
+def iter_board_rows(board_id: int) -> Iterator[tuple[str, dict]]:
+    """Categories, goals and comments of a board from one consistent snapshot, read with server-side cursors."""
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ, READ ONLY')
+
+        querysets = {
+            'category': GoalCategory.objects.filter(board_id=board_id, is_deleted=False),
+            'goal': Goal.objects.filter(board_id=board_id, category__is_deleted=False).exclude(
+                status=Goal.Status.archived
+            ),
+            'comment': GoalComment.objects.filter(
+                board_id=board_id, goal__category__is_deleted=False
+            ).exclude(goal__status=Goal.Status.archived),
+        }
+        for kind, queryset in querysets.items():
+            for row in queryset.order_by('id').values(*COLUMNS[kind]).iterator(chunk_size=CHUNK_SIZE):
+                if 'user__username' in row:
+                    row['user'] = row.pop('user__username')
+                yield kind, row
+
+
+def to_ndjson(rows: Iterator[tuple[str, dict]]) -> Iterator[str]:
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for kind, row in rows:
+        yield encoder.encode({'type': kind, **row}) + '\n'
+
+
+def to_csv(rows: Iterator[tuple[str, dict]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_HEADER)
+    writer.writeheader()
+    for kind, row in rows:
+        writer.writerow({'type': kind, **{key: _csv_value(value) for key, value in row.items()}})
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def _csv_value(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else value
+
+
+class NDJSONRenderer(BaseRenderer):
+    media_type = 'application/x-ndjson'
+    format = 'ndjson'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        return (json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n').encode()
+
+
+class CSVRenderer(BaseRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None) -> bytes:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for key, value in (data or {}).items():
+            writer.writerow([key, value])
+        return buffer.getvalue().encode()
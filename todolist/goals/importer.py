@@ -0,0 +1,142 @@
+import codecs
+import csv
+import json
+from types import SimpleNamespace
+from typing import IO, Iterator
+
+from django.db import transaction
+
+from goals.board_roles import WRITE_ROLES, has_board_role
+from goals.events import event, publish
+from goals.models import Board, GoalCategory, Goal
+from goals.serializers import BulkGoalCategorySerializer, BulkGoalSerializer
+from goals.versioning import bump_board_version
+from rest_framework.exceptions import PermissionDenied
+
+FORMATS = ('ndjson', 'csv')
+
+
+def read_rows(file: IO[bytes], file_format: str) -> Iterator[tuple[int, dict | None]]:
+    """(line, row) pairs read incrementally; row is None when the line can not be parsed."""
+    lines = codecs.iterdecode(file, 'utf-8-sig')
+    if file_format == 'csv':
+        reader = csv.DictReader(lines)
+        for row in reader:
+            # empty cells mean "not set", so model defaults apply
+            yield reader.line_num, {key: value for key, value in row.items() if key and value not in ('', None)}
+        return
+
+    for line_num, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield line_num, row if isinstance(row, dict) else None
+
+
+def guess_format(name: str) -> str:
+    return 'csv' if name.lower().endswith('.csv') else 'ndjson'
+
+
+class GoalImporter:
+    """
+    Imports categories and goals into one board from rows in the board export format.
+
+    Rows are validated with the category and goal serializer rules in batches and inserted with
+    bulk_create, one transaction per batch. Invalid rows are reported and skipped. A goal's
+    `category` refers to a category row of the same file by its `id`, or to an existing category
+    of the board.
+    """
+    batch_size = 1000
+    max_errors = 100
+
+    def __init__(self, board: Board, request=None, user=None, batch_size: int | None = None):
+        self.board = board
+        # the serializers read the user and the role map from the request
+        self.request = request or SimpleNamespace(user=user)
+        self.batch_size = batch_size or self.batch_size
+        self.categories = GoalCategory.objects.filter(board=board, is_deleted=False).in_bulk()
+        self.category_ids: dict[str, int] = {}
+        self.pending: dict[str, list[tuple[int, dict]]] = {'category': [], 'goal': []}
+        self.report = {'created': {'categories': 0, 'goals': 0}, 'failed': 0, 'skipped': 0, 'errors': []}
+
+    def run(self, rows: Iterator[tuple[int, dict | None]]) -> dict:
+        if not has_board_role(self.request, self.board.id, WRITE_ROLES):
+            raise PermissionDenied
+
+        for line, row in rows:
+            if row is None:
+                self.error(line, {'non_field_errors': ['Malformed row']})
+                continue
+            kind = row.get('type', 'goal')
+            if kind not in self.pending:
+                self.report['skipped'] += 1
+                continue
+            if kind == 'goal' and self.pending['category']:
+                self.flush_categories()
+            self.pending[kind].append((line, row))
+            if len(self.pending[kind]) >= self.batch_size:
+                if kind == 'category':
+                    self.flush_categories()
+                else:
+                    self.flush_goals()
+
+        self.flush_categories()
+        self.flush_goals()
+        return self.report
+
+    def flush_categories(self) -> None:
+        batch, self.pending['category'] = self.pending['category'], []
+        if not batch:
+            return
+        items = [{**row, 'board': self.board.id} for _, row in batch]
+        created = self.save(
+            batch, BulkGoalCategorySerializer, GoalCategory, items, {Board: {self.board.id: self.board}}
+        )
+        if any(category is not None for category in created):
+            # categories are not created through BoardScopedQuerySet, whose bulk_create bumps it for goals
+            bump_board_version(self.board.id)
+        for (_, row), category in zip(batch, created):
+            if category is None:
+                continue
+            self.categories[category.id] = category
+            if 'id' in row:
+                self.category_ids[str(row['id'])] = category.id
+        self.report['created']['categories'] += sum(category is not None for category in created)
+
+    def flush_goals(self) -> None:
+        batch, self.pending['goal'] = self.pending['goal'], []
+        if not batch:
+            return
+        items = []
+        for _, row in batch:
+            category = row.get('category')
+            items.append({**row, 'category': self.category_ids.get(str(category), category)})
+        created = self.save(batch, BulkGoalSerializer, Goal, items, {GoalCategory: self.categories})
+        self.report['created']['goals'] += sum(goal is not None for goal in created)
+
+    def save(self, batch: list, serializer_class, model, items: list[dict], preloaded: dict) -> list:
+        """Validates a batch and inserts its valid rows; returns the created objects by position."""
+        serializer = serializer_class(
+            data=items, many=True, context={'request': self.request, 'preloaded': preloaded}
+        )
+        serializer.is_valid()
+        objects = []
+        for (line, _), data, errors in zip(batch, serializer.validated_data, serializer.item_errors):
+            if errors:
+                self.error(line, errors)
+            objects.append(None if errors else model(**data))
+
+        valid = [obj for obj in objects if obj is not None]
+        with transaction.atomic():
+            model.objects.bulk_create(valid)
+            if valid:
+                publish(event('board', 'changed', self.board.id, self.board.id))
+        return objects
+
+    def error(self, line: int, errors: dict) -> None:
+        self.report['failed'] += 1
+        if len(self.report['errors']) < self.max_errors:
+            self.report['errors'].append({'line': line, 'errors': errors})
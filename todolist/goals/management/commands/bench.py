@@ -0,0 +1,25 @@
+from django.core.management import BaseCommand, CommandError
+from django.utils.module_loading import autodiscover_modules
+
+from goals.benchmarks import SCENARIOS
+
+
+class Command(BaseCommand):
+    help = 'Runs performance scenarios against the configured database, registered by each app in <app>.benchmarks'
+
+    def add_arguments(self, parser):
+        autodiscover_modules('benchmarks')
+        parser.add_argument('scenario', choices=sorted(SCENARIOS))
+        # unset sizes leave each scenario its own defaults
+        parser.add_argument('--goals', type=int)
+        parser.add_argument('--comments', type=int)
+        parser.add_argument('--limit', type=int)
+        parser.add_argument('--repeat', type=int)
+        parser.add_argument('--subscribers', type=int)
+
+    def handle(self, *args, **options):
+        bench = SCENARIOS[options.pop('scenario')]
+        try:
+            bench(self.stdout.write, **{name: value for name, value in options.items() if value is not None})
+        except KeyboardInterrupt:
+            raise CommandError('Interrupted')
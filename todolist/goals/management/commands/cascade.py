@@ -0,0 +1,35 @@
+from django.core.management import BaseCommand
+
+from goals.cascade import run_cascade
+from goals.models import SoftDeleteCascade
+
+
+class Command(BaseCommand):
+    help = 'Inspects or resumes the background archiving of goals of deleted boards and categories'
+
+    def add_arguments(self, parser):
+        parser.add_argument('action', choices=['list', 'resume'])
+        parser.add_argument('--id', type=int, dest='cascade_id', help='Only this cascade')
+        parser.add_argument('--all', action='store_true', help='List finished cascades too')
+        parser.add_argument('--chunk-size', type=int)
+
+    def handle(self, *args, **options):
+        cascades = SoftDeleteCascade.objects.order_by('id')
+        if options['cascade_id']:
+            cascades = cascades.filter(id=options['cascade_id'])
+        elif not (options['action'] == 'list' and options['all']):
+            cascades = cascades.filter(finished=None)
+
+        if options['action'] == 'list':
+            for cascade in cascades:
+                remaining = cascade.goals().filter(id__gt=cascade.last_goal_id).count()
+                if cascade.finished:
+                    state = f'finished {cascade.finished:%Y-%m-%d %H:%M:%S}'
+                else:
+                    state = f'{remaining} goals left'
+                self.stdout.write(f'{cascade}: {cascade.archived} archived, checkpoint {cascade.last_goal_id}, {state}')
+            return
+
+        for cascade_id in cascades.values_list('id', flat=True):
+            cascade = run_cascade(cascade_id, chunk_size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS(f'{cascade}: {cascade.archived} goals archived'))
@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.core.management import BaseCommand, CommandError
+
+from goals.importer import FORMATS, GoalImporter, guess_format, read_rows
+from goals.models import Board
+from rest_framework.exceptions import PermissionDenied
+
+
+class Command(BaseCommand):
+    help = 'Imports categories and goals from an NDJSON or CSV file into a board'
+
+    def add_arguments(self, parser):
+        parser.add_argument('board', type=int)
+        parser.add_argument('path')
+        parser.add_argument('--user', required=True, help='Username the rows are created by, needs write access')
+        parser.add_argument('--format', dest='file_format', choices=FORMATS, help='Guessed from the extension')
+        parser.add_argument('--batch-size', type=int)
+
+    def handle(self, *args, **options):
+        try:
+            board = Board.objects.get(pk=options['board'], is_deleted=False)
+            user = get_user_model().objects.get(username=options['user'])
+        except (Board.DoesNotExist, get_user_model().DoesNotExist) as exc:
+            raise CommandError(exc)
+
+        importer = GoalImporter(board, user=user, batch_size=options['batch_size'])
+        file_format = options['file_format'] or guess_format(options['path'])
+        with open(options['path'], 'rb') as file:
+            try:
+                report = importer.run(read_rows(file, file_format))
+            except PermissionDenied:
+                raise CommandError(f'{user} can not write to {board}')
+
+        for error in report['errors']:
+            self.stderr.write(f"line {error['line']}: {error['errors']}")
+        created = report['created']
+        self.stdout.write(self.style.SUCCESS(
+            f"{created['categories']} categories and {created['goals']} goals created, "
+            f"{report['failed']} rows failed, {report['skipped']} skipped"
+        ))
@@ -0,0 +1,16 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.utils import timezone
+
+from goals.models import ChangeLog
+
+
+class Command(BaseCommand):
+    help = 'Deletes change log entries older than SYNC_CHANGELOG_RETENTION_DAYS'
+
+    def handle(self, *args, **options):
+        border = timezone.now() - timedelta(days=settings.SYNC_CHANGELOG_RETENTION_DAYS)
+        deleted, _ = ChangeLog.objects.filter(created__lt=border).delete()
+        self.stdout.write(self.style.SUCCESS(f'{deleted} change log entries deleted'))
@@ -0,0 +1,17 @@
+from django.core.management import BaseCommand
+
+from goals.counters import reconcile_counters
+
+
+class Command(BaseCommand):
+    help = 'Recounts the goal and comment counters of boards, categories and goals and repairs any drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--board', type=int, action='append', dest='boards', help='Only this board, repeatable')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Only report drifted rows')
+
+    def handle(self, *args, **options):
+        fixed = reconcile_counters(options['boards'], chunk_size=options['chunk_size'], dry_run=options['dry_run'])
+        verb = 'drifted' if options['dry_run'] else 'repaired'
+        self.stdout.write(self.style.SUCCESS(', '.join(f'{count} {key} {verb}' for key, count in fixed.items())))
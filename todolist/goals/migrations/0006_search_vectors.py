@@ -0,0 +1,39 @@
+from django.db import migrations
+
+# SQLite keeps its FTS5 tables in sync through triggers created by goals.search.ensure_sqlite_fts
+# after every migrate, since table rebuilds in later migrations would drop them.
+SEARCH_VECTORS = {
+    'goals_goal': "setweight(to_tsvector('simple'::regconfig, title), 'A') || "
+                  "setweight(to_tsvector('simple'::regconfig, description), 'B')",
+    'goals_goalcomment': "to_tsvector('simple'::regconfig, text)",
+}
+
+
+def add_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for table, expression in SEARCH_VECTORS.items():
+        schema_editor.execute(
+            f'ALTER TABLE {table} ADD COLUMN search_vector tsvector GENERATED ALWAYS AS ({expression}) STORED'
+        )
+        schema_editor.execute(f'CREATE INDEX {table}_search ON {table} USING gin (search_vector)')
+
+
+def drop_search_vectors(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+
+    for table in SEARCH_VECTORS:
+        schema_editor.execute(f'ALTER TABLE {table} DROP COLUMN search_vector')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0005_list_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_vectors, drop_search_vectors),
+    ]
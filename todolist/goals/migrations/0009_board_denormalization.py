@@ -0,0 +1,90 @@
+# Generated by Django 4.1.7 on 2026-10-18 17:40
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+import django.db.models.deletion
+
+BATCH_SIZE = 10_000
+
+
+def backfill(model, parent_model, parent_field):
+    """
+    Copies the parent's board_id in primary key ranges, one short transaction per batch.
+
+    Rows the running code inserts meanwhile, past the range read up front, are swept up afterwards
+    until none is left, since the NOT NULL that follows would fail on them. Those of parents that have no
+    board_id yet themselves are left to fail there rather than looping forever.
+    """
+    def run(apps, schema_editor):
+        Model = apps.get_model('goals', model)
+        Parent = apps.get_model('goals', parent_model)
+        board_id = Subquery(Parent.objects.filter(id=OuterRef(f'{parent_field}_id')).values('board_id')[:1])
+        last_id = Model.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        for start in range(0, last_id + 1, BATCH_SIZE):
+            Model.objects.filter(id__gte=start, id__lt=start + BATCH_SIZE, board=None).update(board_id=board_id)
+        missing = Model.objects.filter(board=None).exclude(**{f'{parent_field}__board': None})
+        while ids := list(missing.values_list('id', flat=True)[:BATCH_SIZE]):
+            Model.objects.filter(id__in=ids).update(board_id=board_id)
+    return run
+
+
+class Migration(migrations.Migration):
+    # every backfill batch commits on its own instead of one transaction over both tables
+    atomic = False
+
+    dependencies = [
+        ('goals', '0008_sync_changelog'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='goal',
+            name='board',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='goals', to='goals.board'),
+        ),
+        migrations.AddField(
+            model_name='goalcomment',
+            name='board',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='comments', to='goals.board'),
+        ),
+        migrations.RunPython(backfill('Goal', 'GoalCategory', 'category'), migrations.RunPython.noop, elidable=True),
+        migrations.RunPython(backfill('GoalComment', 'Goal', 'goal'), migrations.RunPython.noop, elidable=True),
+        migrations.AlterField(
+            model_name='goal',
+            name='board',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='goals', to='goals.board'),
+        ),
+        migrations.AlterField(
+            model_name='goalcomment',
+            name='board',
+            field=models.ForeignKey(editable=False, on_delete=django.db.models.deletion.PROTECT, related_name='comments', to='goals.board'),
+        ),
+        migrations.RemoveIndex(
+            model_name='goal',
+            name='goals_goal_category_active',
+        ),
+        migrations.RemoveIndex(
+            model_name='goal',
+            name='goals_goal_updated',
+        ),
+        migrations.RemoveIndex(
+            model_name='goalcomment',
+            name='goals_comment_updated',
+        ),
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(condition=models.Q(('status', 4), _negated=True), fields=['board', 'status'], name='goals_goal_board_active'),
+        ),
+        migrations.AddIndex(
+            model_name='goal',
+            index=models.Index(fields=['board', 'updated'], name='goals_goal_board_updated'),
+        ),
+        migrations.AddIndex(
+            model_name='goalcomment',
+            index=models.Index(fields=['board', 'created'], name='goals_comment_board_created'),
+        ),
+        migrations.AddIndex(
+            model_name='goalcomment',
+            index=models.Index(fields=['board', 'updated'], name='goals_comment_board_updated'),
+        ),
+    ]
@@ -0,0 +1,81 @@
+# Generated by Django 4.1.7 on 2026-10-18 17:44
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+STATUS_COUNTERS = {1: 'goals_to_do', 2: 'goals_in_progress', 3: 'goals_done', 4: 'goals_archived'}
+
+
+def count_existing(apps, schema_editor):
+    """Initial counter values; goals.counters keeps them up to date from here on."""
+    Board = apps.get_model('goals', 'Board')
+    GoalCategory = apps.get_model('goals', 'GoalCategory')
+    Goal = apps.get_model('goals', 'Goal')
+    GoalComment = apps.get_model('goals', 'GoalComment')
+
+    def count(model, field, **filters):
+        counts = model.objects.filter(**{field: OuterRef('id')}, **filters).values(field).annotate(n=Count('id'))
+        return Coalesce(Subquery(counts.values('n')), Value(0))
+
+    for model, field in ((Board, 'board_id'), (GoalCategory, 'category_id')):
+        model.objects.update(**{
+            counter: count(Goal, field, status=status) for status, counter in STATUS_COUNTERS.items()
+        })
+    Goal.objects.update(comments_count=count(GoalComment, 'goal_id'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('goals', '0009_board_denormalization'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='board',
+            name='goals_archived',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='board',
+            name='goals_done',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='board',
+            name='goals_in_progress',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='board',
+            name='goals_to_do',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='goal',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='goalcategory',
+            name='goals_archived',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='goalcategory',
+            name='goals_done',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='goalcategory',
+            name='goals_in_progress',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='goalcategory',
+            name='goals_to_do',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(count_existing, migrations.RunPython.noop, elidable=True),
+    ]
@@ -1,7 +1,10 @@
+from collections import Counter
+
 from django.db import models
 from django.utils import timezone
 
 from core.models import User
+from goals.versioning import bump_board_version
 from todolist.models import BaseModel
 
 
@@ -12,14 +15,56 @@ from todolist.models import BaseModel
 #     return super().save(*args, **kwargs)
 
 
-class Board(BaseModel):
+def without_counters(instance: models.Model, counter_fields: tuple[str, ...], kwargs: dict) -> dict:
+    """
+    save() kwargs that leave the counter columns alone on updates: they are only ever changed
+    with F() expressions, a full save would write back whatever value was loaded.
+    """
+    if not instance._state.adding and kwargs.get("update_fields") is None and not kwargs.get("force_insert"):
+        kwargs["update_fields"] = [
+            field.name for field in instance._meta.concrete_fields
+            if not field.primary_key and field.name not in counter_fields
+        ]
+    return kwargs
+
+
+class GoalCounters(models.Model):
+    """Goals per status, maintained incrementally by goals.counters and repaired by reconcile_counters."""
+    goals_to_do = models.PositiveIntegerField(default=0, editable=False)
+    goals_in_progress = models.PositiveIntegerField(default=0, editable=False)
+    goals_done = models.PositiveIntegerField(default=0, editable=False)
+    goals_archived = models.PositiveIntegerField(default=0, editable=False)
+
+    counter_fields = ("goals_to_do", "goals_in_progress", "goals_done", "goals_archived")
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **without_counters(self, self.counter_fields, kwargs))
+
+
+class Board(BaseModel, GoalCounters):
+    class Meta:
+        indexes = [
+            models.Index(fields=["updated"], name="goals_board_updated"),
+        ]
+
     title = models.CharField(verbose_name="Название", max_length=255)
     is_deleted = models.BooleanField(verbose_name="Удалена", default=False)
+    # bumped in the transaction of every write to the board, see goals.versioning
+    version = models.PositiveBigIntegerField(default=0, editable=False)
+
+    counter_fields = GoalCounters.counter_fields + ("version",)
 
 
 class BoardParticipant(BaseModel):
     class Meta:
         unique_together = ("board", "user")
+        indexes = [
+            models.Index(fields=["user", "board", "role"], name="goals_participant_user_role"),
+            models.Index(fields=["board", "updated"], name="goals_participant_updated"),
+        ]
 
     class Role(models.IntegerChoices):
         owner = 1, "Владелец"
@@ -45,7 +90,30 @@ class BoardParticipant(BaseModel):
     editable_roles: list[tuple[int, str]] = Role.choices[1:]
 
 
-class GoalCategory(BaseModel):
+class BoardScopedQuerySet(models.QuerySet):
+    """
+    Fills the denormalized `board` from the parent row, updates the counters and bumps the board
+    versions on bulk_create, which bypasses save() and its signals.
+    """
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            if obj.board_id is None:
+                obj.board_id = obj.get_parent_board_id()
+        created = super().bulk_create(objs, *args, **kwargs)
+        self.model.count_created(created)
+        bump_board_version(*{obj.board_id for obj in created})
+        return created
+
+
+class GoalCategory(BaseModel, GoalCounters):
+    class Meta:
+        indexes = [
+            models.Index(fields=["board"], condition=models.Q(is_deleted=False), name="goals_category_board_alive"),
+            models.Index(fields=["board", "updated"], name="goals_category_updated"),
+        ]
+
     title = models.CharField(verbose_name="Название", max_length=255)
     user = models.ForeignKey(User, verbose_name="Автор", on_delete=models.PROTECT)
     is_deleted = models.BooleanField(verbose_name="Удалена", default=False)
@@ -53,16 +121,54 @@ class GoalCategory(BaseModel):
         Board, verbose_name="Доска", on_delete=models.PROTECT, related_name="categories"
     )
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_board_id = instance.__dict__.get("board_id")
+        return instance
+
+    def save(self, *args, **kwargs):
+        previous = getattr(self, "_loaded_board_id", None)
+        super().save(*args, **kwargs)
+        self._loaded_board_id = self.board_id
+        if previous is not None and previous != self.board_id:
+            # goals and comments carry the board too, see Goal.board
+            now = timezone.now()
+            goals = Goal.objects.filter(category=self)
+            comments = GoalComment.objects.filter(goal__category=self)
+            log_moved(previous, ChangeLog.Kind.category, [self.id])
+            log_moved(previous, ChangeLog.Kind.goal, goals.values_list("id", flat=True))
+            log_moved(previous, ChangeLog.Kind.comment, comments.values_list("id", flat=True))
+            goals.update(board_id=self.board_id, updated=now)
+            comments.update(board_id=self.board_id, updated=now)
+            from goals.counters import move_category_counters
+
+            move_category_counters(self.id, previous, self.board_id)
+            bump_board_version(previous)
+
     def __str__(self):
         return self.title
 
 
+class GoalStatus(models.IntegerChoices):
+    to_do = 1, "К выполнению"
+    in_progress = 2, "В процессе"
+    done = 3, "Выполнено"
+    archived = 4, "Архив"
+
+
 class Goal(BaseModel):
-    class Status(models.IntegerChoices):
-        to_do = 1, "К выполнению"
-        in_progress = 2, "В процессе"
-        done = 3, "Выполнено"
-        archived = 4, "Архив"
+    class Meta:
+        indexes = [
+            # Goal.Status is out of reach of a nested class, hence GoalStatus
+            models.Index(
+                fields=["board", "status"], condition=~models.Q(status=GoalStatus.archived),
+                name="goals_goal_board_active",
+            ),
+            models.Index(fields=["board", "updated"], name="goals_goal_board_updated"),
+        ]
+
+    Status = GoalStatus
 
     class Priority(models.IntegerChoices):
         low = 1, "Низкий"
@@ -74,18 +180,136 @@ class Goal(BaseModel):
     description = models.TextField(blank=True)
     due_date = models.DateField(null=True, blank=True)
     category = models.ForeignKey(to=GoalCategory, on_delete=models.PROTECT)
+    # the category's board, stored here so rows are scoped to a user without joining through categories
+    board = models.ForeignKey(Board, on_delete=models.PROTECT, related_name="goals", editable=False)
     user = models.ForeignKey(to=User, on_delete=models.PROTECT)
     status = models.PositiveSmallIntegerField(choices=Status.choices, default=Status.to_do)
     priority = models.PositiveSmallIntegerField(choices=Priority.choices, default=Priority.medium)
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = BoardScopedQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_category_id = instance.__dict__.get("category_id")
+        instance._counted = instance.get_counted_state()
+        return instance
+
+    @classmethod
+    def count_created(cls, goals: list["Goal"]) -> None:
+        from goals.counters import count_goal_changes
+
+        count_goal_changes([(None, goal.get_counted_state()) for goal in goals])
+        for goal in goals:
+            goal._counted = goal.get_counted_state()
+
+    def get_counted_state(self) -> tuple[int, int, int] | None:
+        """The (category_id, board_id, status) cell this goal is counted in, None while not fully loaded."""
+        state = tuple(self.__dict__.get(field) for field in ("category_id", "board_id", "status"))
+        return None if None in state else state
+
+    def get_parent_board_id(self) -> int:
+        return self.category.board_id
+
+    def save(self, *args, **kwargs):
+        previous = self.board_id
+        if previous is None or self.category_id != getattr(self, "_loaded_category_id", None):
+            self.board_id = self.get_parent_board_id()
+            if kwargs.get("update_fields") is not None:
+                kwargs["update_fields"] = {*kwargs["update_fields"], "board"}
+        super().save(*args, **without_counters(self, ("comments_count",), kwargs))
+        self._loaded_category_id = self.category_id
+        self._counted = self.get_counted_state()
+        if previous is not None and previous != self.board_id:
+            comments = GoalComment.objects.filter(goal=self)
+            log_moved(previous, ChangeLog.Kind.goal, [self.id])
+            log_moved(previous, ChangeLog.Kind.comment, comments.values_list("id", flat=True))
+            comments.update(board_id=self.board_id, updated=timezone.now())
+            bump_board_version(previous)
 
     def __str__(self):
         return self.title
 
 
 class GoalComment(BaseModel):
+    class Meta:
+        indexes = [
+            models.Index(fields=["goal", "created"], name="goals_comment_goal_created"),
+            models.Index(fields=["board", "created"], name="goals_comment_board_created"),
+            models.Index(fields=["board", "updated"], name="goals_comment_board_updated"),
+        ]
+
     user = models.ForeignKey(User, on_delete=models.PROTECT)
     goal = models.ForeignKey(Goal, on_delete=models.CASCADE)
+    # the goal's board, see Goal.board
+    board = models.ForeignKey(Board, on_delete=models.PROTECT, related_name="comments", editable=False)
     text = models.TextField()
 
+    objects = BoardScopedQuerySet.as_manager()
+
+    @classmethod
+    def count_created(cls, comments: list["GoalComment"]) -> None:
+        from goals.counters import count_comments
+
+        count_comments(Counter(comment.goal_id for comment in comments))
+
+    def get_parent_board_id(self) -> int:
+        return self.goal.board_id
+
+    def save(self, *args, **kwargs):
+        if self.board_id is None:
+            self.board_id = self.get_parent_board_id()
+        super().save(*args, **kwargs)
+
     def __str__(self):
-        return self.text
\ No newline at end of file
+        return self.text
+
+
+class SoftDeleteCascade(BaseModel):
+    """Checkpoint of archiving the goals of a deleted board or category in primary key order."""
+    board = models.ForeignKey(Board, on_delete=models.PROTECT, related_name="+")
+    category = models.ForeignKey(GoalCategory, null=True, blank=True, on_delete=models.PROTECT, related_name="+")
+    last_goal_id = models.BigIntegerField(default=0)
+    archived = models.PositiveIntegerField(default=0)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    def goals(self) -> models.QuerySet:
+        if self.category_id:
+            return Goal.objects.filter(category_id=self.category_id)
+        return Goal.objects.filter(board_id=self.board_id)
+
+    def __str__(self):
+        target = f"category {self.category_id}" if self.category_id else f"board {self.board_id}"
+        return f"{self.__class__.__name__} {self.id} ({target})"
+
+
+class ChangeLog(models.Model):
+    """Hard deletes, which leave no row behind for the sync endpoint to report."""
+    class Meta:
+        indexes = [
+            models.Index(fields=["board", "created"], name="goals_changelog_board"),
+            models.Index(fields=["user", "created"], name="goals_changelog_user"),
+        ]
+
+    class Kind(models.TextChoices):
+        board = "board", "Доска"
+        participant = "participant", "Участник"
+        category = "category", "Категория"
+        goal = "goal", "Цель"
+        comment = "comment", "Комментарий"
+
+    created = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    # outlives the board itself when a whole board is hard-deleted
+    board = models.ForeignKey(Board, on_delete=models.DO_NOTHING, related_name="+", db_constraint=False)
+    kind = models.CharField(max_length=20, choices=Kind.choices)
+    object_id = models.BigIntegerField()
+    # whose access went away, for removed participants
+    user = models.ForeignKey(User, null=True, blank=True, on_delete=models.CASCADE, related_name="+")
+
+
+def log_moved(board_id: int, kind: str, object_ids) -> None:
+    """Tombstones on the board rows moved away from, for the participants of only that board."""
+    ChangeLog.objects.bulk_create([
+        ChangeLog(board_id=board_id, kind=kind, object_id=object_id) for object_id in object_ids
+    ])
@@ -1,42 +1,36 @@
-from typing import Any
-
 from rest_framework.permissions import IsAuthenticated, SAFE_METHODS
 from rest_framework.generics import GenericAPIView
 from rest_framework.request import Request
 
+from goals.board_roles import WRITE_ROLES, has_board_role
 from goals.models import GoalCategory, Goal, GoalComment, Board, BoardParticipant
 
 
 class BoardPermission(IsAuthenticated):
     def has_object_permission(self, request: Request, view: GenericAPIView, obj: Board) -> bool:
-        _filters: dict[str, Any] = {'user': request.user, 'board': obj}
-        if request.method not in SAFE_METHODS:
-            _filters['role'] = BoardParticipant.Role.owner
-
-        return BoardParticipant.objects.filter(**_filters).exists()
+        if request.method in SAFE_METHODS:
+            return has_board_role(request, obj.id)
+        return has_board_role(request, obj.id, [BoardParticipant.Role.owner])
 
 
 class GoalCategoryPermission(IsAuthenticated):
     def has_object_permission(self, request: Request, view: GenericAPIView, obj: GoalCategory) -> bool:
-        _filters: dict[str, Any] = {'user': request.user, 'board': obj.board}
-        if request.method not in SAFE_METHODS:
-            _filters['role__in'] = [BoardParticipant.Role.owner, BoardParticipant.Role.writer]
-
-        return BoardParticipant.objects.filter(**_filters).exists()
+        if request.method in SAFE_METHODS:
+            return has_board_role(request, obj.board_id)
+        return has_board_role(request, obj.board_id, WRITE_ROLES)
 
 
 class GoalPermission(IsAuthenticated):
     def has_object_permission(self, request: Request, view: GenericAPIView, obj: Goal) -> bool:
-        _filters: dict[str, Any] = {'user': request.user, 'board': obj.category.board}
-        if request.method not in SAFE_METHODS:
-            _filters['role__in'] = [BoardParticipant.Role.owner, BoardParticipant.Role.writer]
-
-        return BoardParticipant.objects.filter(**_filters).exists()
+        if request.method in SAFE_METHODS:
+            return has_board_role(request, obj.board_id)
+        return has_board_role(request, obj.board_id, WRITE_ROLES)
 
 
 class GoalCommentPermission(IsAuthenticated):
     def has_object_permission(self, request: Request, view: GenericAPIView, obj: GoalComment) -> bool:
-        if request.method not in SAFE_METHODS:
+        if not has_board_role(request, obj.board_id):
+            return False
+        if request.method in SAFE_METHODS:
             return True
-        return obj.user == request.user
-
+        return obj.user_id == request.user.id
@@ -0,0 +1,208 @@
+import re
+from abc import ABC, abstractmethod
+from functools import reduce
+from html import escape
+from operator import and_
+
+from django.db import connection
+from django.db.backends.base.base import BaseDatabaseWrapper
+from django.db.models import Q
+
+from goals.models import Goal, GoalComment
+
+HIGHLIGHT_START, HIGHLIGHT_STOP = '<b>', '</b>'
+# what the database marks matches with: the text is HTML-escaped before they become the tags above
+MARK_START, MARK_STOP = '\x02', '\x03'
+
+# The maintained indexes themselves: a generated tsvector column with a GIN index on Postgres
+# (migration 0006), external-content FTS5 tables kept in sync by triggers on SQLite.
+SQLITE_FTS = {
+    'goals_goal_fts': ('goals_goal', ['title', 'description']),
+    'goals_goalcomment_fts': ('goals_goalcomment', ['text']),
+}
+
+
+class SearchBackend(ABC):
+    """Ranked full-text search over goals and comments of the boards a user participates in."""
+
+    @abstractmethod
+    def search(self, user_id: int, query: str, limit: int) -> list[dict]:
+        ...
+
+    def fetch(self, sql: str, params: list) -> list[dict]:
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            columns = [col[0] for col in cursor.description]
+            hits = [dict(zip(columns, row)) for row in cursor.fetchall()]
+        for hit in hits:
+            hit['highlight'] = self.render_highlight(hit['highlight'])
+        return hits
+
+    @staticmethod
+    def render_highlight(marked: str) -> str:
+        """User text is escaped, so the highlight tags are the only markup in it."""
+        return escape(marked).replace(MARK_START, HIGHLIGHT_START).replace(MARK_STOP, HIGHLIGHT_STOP)
+
+
+class PostgresSearchBackend(SearchBackend):
+    config = 'simple'
+
+    def search(self, user_id: int, query: str, limit: int) -> list[dict]:
+        # rank inside the index-driven subqueries, build headlines for the final page only
+        sql = f'''
+            WITH q AS (SELECT websearch_to_tsquery('{self.config}', %s) AS query),
+            hits AS (
+                (SELECT 'goal' AS type, g.id, g.id AS goal_id, g.board_id, ts_rank(g.search_vector, q.query) AS rank
+                 FROM goals_goal g
+                 JOIN goals_goalcategory c ON c.id = g.category_id
+                 JOIN goals_boardparticipant p ON p.board_id = g.board_id AND p.user_id = %s
+                 CROSS JOIN q
+                 WHERE g.search_vector @@ q.query AND g.status <> %s AND NOT c.is_deleted
+                 ORDER BY rank DESC LIMIT %s)
+                UNION ALL
+                (SELECT 'comment', m.id, m.goal_id, m.board_id, ts_rank(m.search_vector, q.query)
+                 FROM goals_goalcomment m
+                 JOIN goals_goal mg ON mg.id = m.goal_id
+                 JOIN goals_goalcategory mc ON mc.id = mg.category_id
+                 JOIN goals_boardparticipant p ON p.board_id = m.board_id AND p.user_id = %s
+                 CROSS JOIN q
+                 WHERE m.search_vector @@ q.query AND mg.status <> %s AND NOT mc.is_deleted
+                 ORDER BY 5 DESC LIMIT %s)
+            ),
+            top AS (SELECT * FROM hits ORDER BY rank DESC, id LIMIT %s)
+            SELECT top.type, top.id, top.goal_id AS goal, top.board_id AS board, top.rank,
+                   ts_headline(
+                       '{self.config}',
+                       CASE WHEN top.type = 'goal' THEN g.title || ' ' || g.description ELSE m.text END,
+                       q.query,
+                       %s
+                   ) AS highlight
+            FROM top
+            CROSS JOIN q
+            LEFT JOIN goals_goal g ON top.type = 'goal' AND g.id = top.id
+            LEFT JOIN goals_goalcomment m ON top.type = 'comment' AND m.id = top.id
+            ORDER BY top.rank DESC, top.id
+        '''
+        options = f'StartSel={MARK_START}, StopSel={MARK_STOP}, MaxFragments=2'
+        archived = Goal.Status.archived
+        return self.fetch(sql, [query, user_id, archived, limit, user_id, archived, limit, limit, options])
+
+
+class SqliteSearchBackend(SearchBackend):
+    def search(self, user_id: int, query: str, limit: int) -> list[dict]:
+        match = self.to_match(query)
+        if not match:
+            return []
+
+        highlight = f"'{MARK_START}', '{MARK_STOP}', '…', 16"
+        sql = f'''
+            SELECT * FROM (
+                SELECT * FROM (
+                    SELECT 'goal' AS type, g.id, g.id AS goal, g.board_id AS board,
+                           -bm25(goals_goal_fts) AS rank, snippet(goals_goal_fts, -1, {highlight}) AS highlight
+                    FROM goals_goal_fts
+                    JOIN goals_goal g ON g.id = goals_goal_fts.rowid
+                    JOIN goals_goalcategory c ON c.id = g.category_id
+                    JOIN goals_boardparticipant p ON p.board_id = g.board_id AND p.user_id = %s
+                    WHERE goals_goal_fts MATCH %s AND g.status <> %s AND NOT c.is_deleted
+                    ORDER BY rank DESC LIMIT %s
+                )
+                UNION ALL
+                SELECT * FROM (
+                    SELECT 'comment', m.id, m.goal_id, m.board_id,
+                           -bm25(goals_goalcomment_fts), snippet(goals_goalcomment_fts, -1, {highlight})
+                    FROM goals_goalcomment_fts
+                    JOIN goals_goalcomment m ON m.id = goals_goalcomment_fts.rowid
+                    JOIN goals_goal mg ON mg.id = m.goal_id
+                    JOIN goals_goalcategory mc ON mc.id = mg.category_id
+                    JOIN goals_boardparticipant p ON p.board_id = m.board_id AND p.user_id = %s
+                    WHERE goals_goalcomment_fts MATCH %s AND mg.status <> %s AND NOT mc.is_deleted
+                    ORDER BY 5 DESC LIMIT %s
+                )
+            )
+            ORDER BY rank DESC, id LIMIT %s
+        '''
+        archived = Goal.Status.archived
+        return self.fetch(sql, [user_id, match, archived, limit, user_id, match, archived, limit, limit])
+
+    @staticmethod
+    def to_match(query: str) -> str:
+        """Every word as a quoted FTS5 string, so user input never reaches the query syntax."""
+        return ' '.join(f'"{word}"' for word in re.findall(r'\w+', query))
+
+
+class ContainsSearchBackend(SearchBackend):
+    """Databases without a full-text index: rows containing every word, newest first, all ranked 0."""
+
+    def search(self, user_id: int, query: str, limit: int) -> list[dict]:
+        words = re.findall(r'\w+', query)
+        if not words:
+            return []
+
+        archived = Goal.Status.archived
+        goals = Goal.objects.filter(
+            reduce(and_, (Q(title__icontains=word) | Q(description__icontains=word) for word in words)),
+            board__participants__user_id=user_id, category__is_deleted=False,
+        ).exclude(status=archived).order_by('-updated')
+        goals = goals.values_list('id', 'board_id', 'title', 'description', 'updated')
+        comments = GoalComment.objects.filter(
+            reduce(and_, (Q(text__icontains=word) for word in words)),
+            board__participants__user_id=user_id, goal__category__is_deleted=False,
+        ).exclude(goal__status=archived).order_by('-updated')
+        comments = comments.values_list('id', 'goal_id', 'board_id', 'text', 'updated')
+
+        hits = [
+            ('goal', goal_id, goal_id, board_id, f'{title} {description}', updated)
+            for goal_id, board_id, title, description, updated in goals[:limit]
+        ] + [('comment', *row) for row in comments[:limit]]
+        hits.sort(key=lambda hit: hit[-1], reverse=True)
+        pattern = re.compile('|'.join(map(re.escape, words)), re.IGNORECASE)
+        return [
+            {'type': kind, 'id': id_, 'goal': goal, 'board': board, 'rank': 0.0,
+             'highlight': self.render_highlight(pattern.sub(lambda match: MARK_START + match[0] + MARK_STOP, text))}
+            for kind, id_, goal, board, text, _ in hits[:limit]
+        ]
+
+
+def get_search_backend() -> SearchBackend:
+    if connection.vendor == 'postgresql':
+        return PostgresSearchBackend()
+    if connection.vendor == 'sqlite':
+        return SqliteSearchBackend()
+    return ContainsSearchBackend()
+
+
+def ensure_sqlite_fts(using: str = 'default', **kwargs) -> None:
+    """
+    post_migrate hook: SQLite drops triggers whenever a migration rebuilds a table,
+    so the FTS5 tables and their triggers are (re)created after every migrate.
+    """
+    from django.db import connections
+
+    db: BaseDatabaseWrapper = connections[using]
+    if db.vendor != 'sqlite':
+        return
+
+    with db.cursor() as cursor:
+        for fts, (table, columns) in SQLITE_FTS.items():
+            cursor.execute(
+                "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND tbl_name = %s AND name LIKE %s",
+                [table, f'{fts}_%'],
+            )
+            if cursor.fetchone()[0] == 3:
+                continue
+
+            cols = ', '.join(columns)
+            new = ', '.join(f'new.{col}' for col in columns)
+            old = ', '.join(f'old.{col}' for col in columns)
+            delete = f"INSERT INTO {fts}({fts}, rowid, {cols}) VALUES ('delete', old.id, {old});"
+            insert = f"INSERT INTO {fts}(rowid, {cols}) VALUES (new.id, {new});"
+            cursor.execute(
+                f"CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5({cols}, content='{table}', content_rowid='id')"
+            )
+            cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_ai AFTER INSERT ON {table} BEGIN {insert} END")
+            cursor.execute(f"CREATE TRIGGER IF NOT EXISTS {fts}_ad AFTER DELETE ON {table} BEGIN {delete} END")
+            cursor.execute(
+                f"CREATE TRIGGER IF NOT EXISTS {fts}_au AFTER UPDATE OF {cols} ON {table} BEGIN {delete} {insert} END"
+            )
+            cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
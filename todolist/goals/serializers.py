@@ -1,9 +1,15 @@
 from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
+from django.utils.encoding import smart_str
 from rest_framework import serializers
 from rest_framework.request import Request
 
 from core.models import User
+from goals.board_roles import WRITE_ROLES, has_board_role, invalidate_board_roles
+from goals.events import event, publish
 from goals.models import GoalCategory, Goal, GoalComment, Board, BoardParticipant
+from goals.versioning import bump_board_version
 
 from core.serializers import UserSerializer
 from rest_framework.exceptions import ValidationError, PermissionDenied
@@ -16,9 +22,37 @@ class BoardSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
+class PreloadedSlugRelatedField(serializers.SlugRelatedField):
+    """Resolves slugs from context['preloaded'][Model], keyed by slug, instead of one query per value."""
+
+    def to_internal_value(self, data):
+        preloaded = self.context.get('preloaded', {}).get(self.get_queryset().model)
+        if preloaded is None:
+            return super().to_internal_value(data)
+        try:
+            return preloaded[str(data)]
+        except KeyError:
+            self.fail('does_not_exist', slug_name=self.slug_field, value=smart_str(data))
+
+
+class BoardParticipantListSerializer(serializers.ListSerializer):
+    """Loads every referenced user with one IN query before the items are validated."""
+
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            field = self.child.fields['user']
+            slugs = {str(item[field.field_name]) for item in data
+                     if isinstance(item, dict) and item.get(field.field_name) is not None}
+            users = field.get_queryset().filter(**{f'{field.slug_field}__in': slugs})
+            self.context.setdefault('preloaded', {})[User] = {
+                str(getattr(user, field.slug_field)): user for user in users
+            }
+        return super().to_internal_value(data)
+
+
 class BoardParticipantSerializer(serializers.ModelSerializer):
     role = serializers.ChoiceField(required=True, choices=BoardParticipant.editable_roles)
-    user = serializers.SlugRelatedField(slug_field='username', queryset=User.objects.all())
+    user = PreloadedSlugRelatedField(slug_field='username', queryset=User.objects.all())
 
     def validate_user(self, user: User) -> User:
         if self.context['request'].user == user:
@@ -29,23 +63,61 @@ class BoardParticipantSerializer(serializers.ModelSerializer):
         model = BoardParticipant
         fields = '__all__'
         read_only_fields = ('id', 'created', 'updated', 'board')
+        list_serializer_class = BoardParticipantListSerializer
 
 
 class BoardSerializerWithParticipant(BoardSerializer):
     participants = BoardParticipantSerializer(many=True)
 
+    def to_representation(self, instance: Board) -> dict:
+        # UpdateModelMixin drops the view's prefetch after saving, users would be loaded one by one
+        if 'participants' not in getattr(instance, '_prefetched_objects_cache', {}):
+            prefetch_related_objects([instance], 'participants__user')
+        return super().to_representation(instance)
+
     def update(self, instance: Board, validated_data: dict) -> Board:
         requests: Request = self.context['request']
 
         with transaction.atomic():
-            BoardParticipant.objects.filter(board=instance).exclude(user=requests.user).delete()
-            BoardParticipant.objects.bulk_create(
-                [
-                    BoardParticipant(user=participant['user'], role=participant['role'], board=instance)
-                    for participant in validated_data.get('participants', [])
-                ],
-                ignore_conflicts=True,
-            )
+            # the requester's own row is never touched; prefetched rows are reused when the view loaded them
+            existing = {
+                participant.user_id: participant for participant in instance.participants.all()
+                if participant.user_id != requests.user.id
+            }
+            wanted = {
+                participant['user'].id: participant['role']
+                for participant in validated_data.get('participants', [])
+            }
+
+            now = timezone.now()
+            removed = [participant for user_id, participant in existing.items() if user_id not in wanted]
+            changed = []
+            for user_id, participant in existing.items():
+                if user_id in wanted and participant.role != wanted[user_id]:
+                    participant.role, participant.updated = wanted[user_id], now
+                    changed.append(participant)
+            added = [
+                BoardParticipant(user_id=user_id, role=role, board=instance)
+                for user_id, role in wanted.items() if user_id not in existing
+            ]
+
+            if removed:
+                BoardParticipant.objects.filter(id__in=[participant.id for participant in removed]).delete()
+            if changed:
+                BoardParticipant.objects.bulk_update(changed, ['role', 'updated'])
+            if added:
+                BoardParticipant.objects.bulk_create(added, ignore_conflicts=True)
+
+            affected_users = set(existing.keys() - wanted.keys())
+            affected_users.update(participant.user_id for participant in changed + added)
+            invalidate_board_roles(*affected_users)
+            bump_board_version(instance.id)
+            # rows skipped by ignore_conflicts come back without an id
+            publish(*(
+                event('participant', action, instance.id, participant.id, user=participant.user_id)
+                for action, participants in (('deleted', removed), ('updated', changed), ('created', added))
+                for participant in participants
+            ))
 
             if title := validated_data.get('title'):
                 instance.title = title
@@ -60,11 +132,7 @@ class GoalCategorySerializer(serializers.ModelSerializer):
         if board.is_deleted:
             raise ValidationError("Board is deleted")
 
-        if not BoardParticipant.objects.filter(
-            board_id=board.id,
-            role__in=[BoardParticipant.Role.owner, BoardParticipant.Role.writer],
-            user_id=self.context['request'].user
-        ).exists():
+        if not has_board_role(self.context['request'], board.id, WRITE_ROLES):
             raise PermissionDenied
         return board
 
@@ -89,11 +157,7 @@ class GoalSerializer(serializers.ModelSerializer):
     def validate_category(self, value: GoalCategory) -> GoalCategory:
         if value.is_deleted:
             raise ValidationError('Category not found')
-        if not BoardParticipant.objects.filter(
-                board_id=value.board.id,
-                role__in=[BoardParticipant.Role.owner, BoardParticipant.Role.writer],
-                user_id=self.context['request'].user
-        ).exists():
+        if not has_board_role(self.context['request'], value.board_id, WRITE_ROLES):
             raise PermissionDenied
         return value
 
@@ -102,8 +166,84 @@ class GoalSerializerWithUser(GoalSerializer):
     user = UserSerializer(read_only=True)
 
 
+def as_pk(value) -> int | None:
+    """The integer primary key in raw input, None for anything else, booleans included."""
+    if isinstance(value, bool) or not isinstance(value, (int, str)):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return None
+
+
+class PreloadedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Resolves pks from context['preloaded'][Model] instead of one query per value."""
+
+    def to_internal_value(self, data):
+        preloaded = self.context.get('preloaded', {}).get(self.get_queryset().model)
+        if preloaded is None:
+            return super().to_internal_value(data)
+        if (pk := as_pk(data)) is None:
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return preloaded[pk]
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+
+class PartialListSerializer(serializers.ListSerializer):
+    """Validates every item and keeps the valid ones: invalid positions become None, see item_errors."""
+
+    def to_internal_value(self, data: list) -> list:
+        if not isinstance(data, list):
+            return super().to_internal_value(data)
+
+        values, self.item_errors = [], []
+        for item in data:
+            try:
+                values.append(self.child.run_validation(item))
+                self.item_errors.append({})
+            except ValidationError as exc:
+                values.append(None)
+                self.item_errors.append(exc.detail)
+            except PermissionDenied as exc:
+                values.append(None)
+                self.item_errors.append({'detail': exc.detail})
+        return values
+
+
+class BulkGoalSerializer(GoalSerializer):
+    category = PreloadedPrimaryKeyRelatedField(queryset=GoalCategory.objects.all())
+
+    class Meta(GoalSerializer.Meta):
+        list_serializer_class = PartialListSerializer
+
+
+class BulkGoalCategorySerializer(GoalCategorySerializer):
+    board = PreloadedPrimaryKeyRelatedField(queryset=Board.objects.all())
+
+    class Meta(GoalCategorySerializer.Meta):
+        list_serializer_class = PartialListSerializer
+
+
+class GoalBulkRequestSerializer(serializers.Serializer):
+    create = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    update = serializers.ListField(child=serializers.DictField(), required=False, default=list)
+    archive = serializers.ListField(child=serializers.IntegerField(), required=False, default=list)
+
+    def validate(self, attrs: dict) -> dict:
+        total = sum(len(items) for items in attrs.values())
+        if total > self.context['max_operations']:
+            raise ValidationError(f"At most {self.context['max_operations']} operations per request")
+        for item in attrs['update']:
+            if not isinstance(item.get('id'), int) or isinstance(item['id'], bool):
+                raise ValidationError({'update': 'Every update needs an integer id'})
+        return attrs
+
+
 class GoalCommentSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
+    goal = serializers.PrimaryKeyRelatedField(queryset=Goal.objects.select_related('category'))
 
     class Meta:
         model = GoalComment
@@ -111,17 +251,27 @@ class GoalCommentSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', 'created', 'updated', 'user')
 
     def validate_goal(self, value: Goal) -> Goal:
-        if value.status == Goal.Status.archived:
+        if value.status == Goal.Status.archived or value.category.is_deleted:
             raise ValidationError('Goal not found')
-        if not BoardParticipant.objects.filter(
-                board_id=value.category.board.id,
-                role__in=[BoardParticipant.Role.owner, BoardParticipant.Role.writer],
-                user_id=self.context['request'].user
-        ).exists():
+        if not has_board_role(self.context['request'], value.board_id, WRITE_ROLES):
             raise PermissionDenied
         return value
 
 
-class GoalCommentSerializerWithUser(GoalSerializer):
+class GoalCommentSerializerWithUser(GoalCommentSerializer):
     user = UserSerializer(read_only=True)
     goal = serializers.PrimaryKeyRelatedField(read_only=True)
+
+
+class SearchQuerySerializer(serializers.Serializer):
+    q = serializers.CharField(max_length=255)
+    limit = serializers.IntegerField(min_value=1, max_value=100, default=20)
+
+
+class SearchHitSerializer(serializers.Serializer):
+    type = serializers.ChoiceField(choices=['goal', 'comment'])
+    id = serializers.IntegerField()
+    goal = serializers.IntegerField()
+    board = serializers.IntegerField()
+    rank = serializers.FloatField()
+    highlight = serializers.CharField()
@@ -0,0 +1,157 @@
+from collections import Counter
+
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from goals.counters import count_goal_changes, count_comments
+from goals.events import event, goal_events, publish
+from goals.models import Board, BoardParticipant, GoalCategory, Goal, GoalComment, ChangeLog
+from core.models import User
+from core.serializers import UserSerializer
+from goals.versioning import bump_board_version, bump_user_board_versions
+
+
+@receiver([post_save, post_delete], sender=Board)
+def board_changed(sender, instance: Board, **kwargs) -> None:
+    bump_board_version(instance.id)
+
+
+@receiver([post_save, post_delete], sender=BoardParticipant)
+@receiver([post_save, post_delete], sender=GoalCategory)
+def board_child_changed(sender, instance: BoardParticipant | GoalCategory, **kwargs) -> None:
+    bump_board_version(instance.board_id)
+
+
+@receiver([post_save, post_delete], sender=Goal)
+def goal_changed(sender, instance: Goal, **kwargs) -> None:
+    bump_board_version(instance.board_id)
+
+
+@receiver([post_save, post_delete], sender=GoalComment)
+def comment_changed(sender, instance: GoalComment, **kwargs) -> None:
+    bump_board_version(instance.board_id)
+
+
+@receiver(post_save, sender=User)
+def user_changed(sender, instance: User, created: bool, update_fields: frozenset | None, **kwargs) -> None:
+    # lists embed users through UserSerializer; logins and password changes leave them as they are
+    if created or update_fields is not None and not update_fields & set(UserSerializer.Meta.fields):
+        return
+    bump_user_board_versions(instance.id)
+
+
+@receiver(post_save, sender=Goal)
+def count_goal_saved(sender, instance: Goal, created: bool, **kwargs) -> None:
+    before = None if created else getattr(instance, '_counted', None)
+    if created or before is not None:
+        count_goal_changes([(before, instance.get_counted_state())])
+
+
+@receiver(post_delete, sender=Goal)
+def count_goal_deleted(sender, instance: Goal, **kwargs) -> None:
+    count_goal_changes([(getattr(instance, '_counted', None) or instance.get_counted_state(), None)])
+
+
+@receiver(post_save, sender=GoalComment)
+def count_comment_saved(sender, instance: GoalComment, created: bool, **kwargs) -> None:
+    if created:
+        count_comments(Counter({instance.goal_id: 1}))
+
+
+@receiver(post_delete, sender=GoalComment)
+def count_comment_deleted(sender, instance: GoalComment, **kwargs) -> None:
+    count_comments(Counter({instance.goal_id: -1}))
+
+
+@receiver(post_delete, sender=Board)
+def log_board_deleted(sender, instance: Board, **kwargs) -> None:
+    ChangeLog.objects.create(board_id=instance.id, kind=ChangeLog.Kind.board, object_id=instance.id)
+
+
+@receiver(post_delete, sender=BoardParticipant)
+def log_participant_deleted(sender, instance: BoardParticipant, **kwargs) -> None:
+    ChangeLog.objects.create(
+        board_id=instance.board_id, kind=ChangeLog.Kind.participant, object_id=instance.id, user_id=instance.user_id
+    )
+
+
+@receiver(post_delete, sender=GoalCategory)
+def log_category_deleted(sender, instance: GoalCategory, **kwargs) -> None:
+    ChangeLog.objects.create(board_id=instance.board_id, kind=ChangeLog.Kind.category, object_id=instance.id)
+
+
+@receiver(post_delete, sender=Goal)
+def log_goal_deleted(sender, instance: Goal, **kwargs) -> None:
+    ChangeLog.objects.create(board_id=instance.board_id, kind=ChangeLog.Kind.goal, object_id=instance.id)
+
+
+@receiver(post_delete, sender=GoalComment)
+def log_comment_deleted(sender, instance: GoalComment, **kwargs) -> None:
+    ChangeLog.objects.create(
+        board_id=instance.board_id, kind=ChangeLog.Kind.comment, object_id=instance.id
+    )
+
+
+@receiver(post_save, sender=Board)
+def publish_board_saved(sender, instance: Board, created: bool, **kwargs) -> None:
+    action = 'created' if created else 'deleted' if instance.is_deleted else 'updated'
+    publish(event('board', action, instance.id, instance.id))
+
+
+@receiver(post_save, sender=BoardParticipant)
+def publish_participant_saved(sender, instance: BoardParticipant, created: bool, **kwargs) -> None:
+    publish(event('participant', 'created' if created else 'updated', instance.board_id, instance.id,
+                  user=instance.user_id))
+
+
+@receiver(post_save, sender=GoalCategory)
+def publish_category_saved(sender, instance: GoalCategory, created: bool, **kwargs) -> None:
+    # GoalCategory.save() moves _loaded_board_id only after the signal
+    previous = None if created else getattr(instance, '_loaded_board_id', None)
+    if previous is not None and previous != instance.board_id:
+        publish(
+            event('category', 'deleted', previous, instance.id),
+            event('board', 'changed', previous, previous),
+            event('category', 'updated', instance.board_id, instance.id),
+            event('board', 'changed', instance.board_id, instance.board_id),
+        )
+        return
+    action = 'created' if created else 'deleted' if instance.is_deleted else 'updated'
+    publish(event('category', action, instance.board_id, instance.id))
+
+
+@receiver(post_save, sender=Goal)
+def publish_goal_saved(sender, instance: Goal, created: bool, **kwargs) -> None:
+    # the state the goal was loaded in, Goal.save() refreshes _counted after the signal
+    before = None if created else getattr(instance, '_counted', None)
+    publish(*goal_events(instance, before, created))
+
+
+@receiver(post_save, sender=GoalComment)
+def publish_comment_saved(sender, instance: GoalComment, created: bool, **kwargs) -> None:
+    publish(event('comment', 'created' if created else 'updated', instance.board_id, instance.id))
+
+
+@receiver(post_delete, sender=Board)
+def publish_board_deleted(sender, instance: Board, **kwargs) -> None:
+    publish(event('board', 'deleted', instance.id, instance.id))
+
+
+@receiver(post_delete, sender=BoardParticipant)
+def publish_participant_deleted(sender, instance: BoardParticipant, **kwargs) -> None:
+    publish(event('participant', 'deleted', instance.board_id, instance.id, user=instance.user_id))
+
+
+@receiver(post_delete, sender=GoalCategory)
+def publish_category_deleted(sender, instance: GoalCategory, **kwargs) -> None:
+    publish(event('category', 'deleted', instance.board_id, instance.id))
+
+
+@receiver(post_delete, sender=Goal)
+def publish_goal_deleted(sender, instance: Goal, **kwargs) -> None:
+    publish(event('goal', 'deleted', instance.board_id, instance.id))
+
+
+@receiver(post_delete, sender=GoalComment)
+def publish_comment_deleted(sender, instance: GoalComment, **kwargs) -> None:
+    publish(event('comment', 'deleted', instance.board_id, instance.id))
@@ -0,0 +1,167 @@
+import asyncio
+import io
+import json
+import re
+from importlib import import_module
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.handlers.asgi import ASGIHandler, ASGIRequest
+from django.utils.functional import SimpleLazyObject
+from rest_framework.exceptions import APIException
+from rest_framework.request import Request
+from rest_framework.settings import api_settings
+
+from goals.events import get_broker
+from goals.models import Board
+from goals.permissions import BoardPermission
+
+STREAM_PATH = re.compile(r'^/goals/board/(?P<pk>\d+)/events$')
+
+
+class BoardEventRouter:
+    """
+    ASGI application serving board event streams itself and everything else through Django.
+
+    Django 4.1 streams responses from sync iterators only, which would hold a thread per idle
+    subscriber, so the Server-Sent Events endpoint is a plain ASGI coroutine instead of a view.
+    """
+
+    def __init__(self, django_application):
+        self.django_application = django_application
+
+    async def __call__(self, scope: dict, receive, send) -> None:
+        if scope['type'] == 'http' and (match := STREAM_PATH.match(scope['path'])):
+            await board_event_stream(scope, receive, send, int(match['pk']))
+        else:
+            await self.django_application(scope, receive, send)
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """
+    ASGIHandler reading streaming responses part by part through sync_to_async.
+
+    Django 4.1 iterates them in the event loop, where a generator doing database work, like the board
+    export, raises SynchronousOnlyOperation. Parts are read in the request's sync thread, the one its
+    view ran in, so a transaction the iterator holds open stays on one connection.
+    """
+
+    async def send_response(self, response, send) -> None:
+        if not response.streaming:
+            return await super().send_response(response, send)
+
+        headers = [
+            (header.encode('ascii') if isinstance(header, str) else header,
+             value.encode('latin1') if isinstance(value, str) else value)
+            for header, value in response.items()
+        ]
+        headers += [(b'Set-Cookie', cookie.output(header='').encode('ascii').strip())
+                    for cookie in response.cookies.values()]
+        parts = iter(response)
+        read = sync_to_async(next, thread_sensitive=True)
+        try:
+            await send({'type': 'http.response.start', 'status': response.status_code, 'headers': headers})
+            while (part := await read(parts, None)) is not None:
+                for chunk, _ in self.chunk_bytes(part):
+                    await send(body(chunk))
+            await send(body(b'', more_body=False))
+        finally:
+            await sync_to_async(response.close, thread_sensitive=True)()
+
+
+def authorize(scope: dict, board_id: int) -> tuple[int, int | None]:
+    """(HTTP status, user id) of a subscription, decided like a GET of the board through BoardPermission."""
+    request = ASGIRequest(scope, io.BytesIO())
+    engine = import_module(settings.SESSION_ENGINE)
+    request.session = engine.SessionStore(request.COOKIES.get(settings.SESSION_COOKIE_NAME))
+    request.user = SimpleLazyObject(lambda: get_user(request))
+    drf_request = Request(request, authenticators=[auth() for auth in api_settings.DEFAULT_AUTHENTICATION_CLASSES])
+
+    permission = BoardPermission()
+    try:
+        if not permission.has_permission(drf_request, None):
+            return 403, None
+    except APIException as exc:
+        return exc.status_code, None
+
+    board = Board.objects.filter(pk=board_id, is_deleted=False).first()
+    if board is None:
+        return 404, None
+    if not permission.has_object_permission(drf_request, None, board):
+        return 403, None
+    return 200, drf_request.user.id
+
+
+def encode(item: dict) -> bytes:
+    return f'event: {item["type"]}\ndata: {json.dumps(item, separators=(",", ":"))}\n\n'.encode()
+
+
+def ends_stream(item: dict, user_id: int) -> bool:
+    """Whether the subscriber lost access with this event, or has to resync after falling behind."""
+    return (
+        item['type'] in ('reset', 'board.deleted')
+        or item['type'] == 'participant.deleted' and item.get('user') == user_id
+    )
+
+
+async def board_event_stream(scope: dict, receive, send, board_id: int) -> None:
+    """
+    text/event-stream of a board's events as they commit, see goals.events.
+
+    Starts with a `ready` event, after which the client fetches what it missed through sync. Comment
+    lines keep idle connections alive. The stream ends when the client disconnects, loses access to
+    the board, or falls too far behind (`reset`); clients reconnect and resync in the last two cases.
+    """
+    if scope['method'] != 'GET':
+        return await send_error(send, 405, 'Method not allowed.')
+    code, user_id = await sync_to_async(authorize)(scope, board_id)
+    if code != 200:
+        return await send_error(send, code, 'Not found.' if code == 404 else 'Access denied.')
+
+    subscription = get_broker().subscribe(board_id)
+    try:
+        await send({
+            'type': 'http.response.start',
+            'status': 200,
+            'headers': [
+                (b'content-type', b'text/event-stream'),
+                (b'cache-control', b'no-cache'),
+                (b'x-accel-buffering', b'no'),
+            ],
+        })
+        await send(body(b'retry: 3000\n\n' + encode({'type': 'ready', 'board': board_id})))
+
+        async def pump() -> None:
+            while True:
+                try:
+                    item = await asyncio.wait_for(subscription.get(), settings.EVENT_STREAM_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    await send(body(b': ping\n\n'))
+                    continue
+                await send(body(encode(item)))
+                if ends_stream(item, user_id):
+                    return
+
+        async def disconnected() -> None:
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        pumping, listening = asyncio.ensure_future(pump()), asyncio.ensure_future(disconnected())
+        done, pending = await asyncio.wait({pumping, listening}, return_when=asyncio.FIRST_COMPLETED)
+        for task in pending:
+            task.cancel()
+        if pumping in done:
+            pumping.result()
+            await send(body(b'', more_body=False))
+    finally:
+        subscription.close()
+
+
+def body(data: bytes, more_body: bool = True) -> dict:
+    return {'type': 'http.response.body', 'body': data, 'more_body': more_body}
+
+
+async def send_error(send, code: int, detail: str) -> None:
+    await send({'type': 'http.response.start', 'status': code, 'headers': [(b'content-type', b'application/json')]})
+    await send(body(json.dumps({'detail': detail}).encode(), more_body=False))
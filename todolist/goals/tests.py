@@ -1,3 +1,1387 @@
-from django.test import TestCase
+import asyncio
+import csv
+import json
+import re
+import time
+from io import BytesIO, StringIO
+from tempfile import NamedTemporaryFile
+from urllib.parse import parse_qs, urlparse
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import async_to_sync, sync_to_async
+from django.contrib.auth import get_user_model
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import override_settings, skipUnlessDBFeature
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.parsers import JSONParser
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APITestCase, APITransactionTestCase, APIRequestFactory, force_authenticate
+
+from goals.board_roles import load_board_roles
+from goals.caching import list_response_cache
+from goals.events import Broker, InProcessBroker, get_broker
+from goals.models import Board, BoardParticipant, GoalCategory, Goal, GoalComment, SoftDeleteCascade
+from goals.search import ContainsSearchBackend, SearchBackend
+from goals.streams import BoardEventRouter
+from goals.views.async_list import AsyncListView, list_view
+from goals.views.boards import BoardListView
+from goals.views.goal_category import GoalCategoryListView
+from goals.views.goal_comment import GoalCommentListView
+from goals.views.goals import GoalListView
+from goals.views.sync import encode_cursor
+from todolist.parsers import ORJSONParser
+from todolist.renderers import ORJSONRenderer
+from todolist.testing import QueryBudgetMixin
+
+User = get_user_model()
+
+
+class GoalsTestCase(APITestCase):
+    def setUp(self):
+        # ids are reused between tests, so are the board versions and whatever is cached under them
+        for alias in settings.CACHES:
+            caches[alias].clear()
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.board = Board.objects.create(title='Board')
+        BoardParticipant.objects.create(user=self.user, board=self.board, role=BoardParticipant.Role.owner)
+        self.category = GoalCategory.objects.create(title='Category', user=self.user, board=self.board)
+        self.client.force_authenticate(user=self.user)
+
+    def create_goals(self, count: int, title: str | None = None) -> list[Goal]:
+        return Goal.objects.bulk_create([
+            Goal(title=title or f'Goal {i:05}', category=self.category, user=self.user) for i in range(count)
+        ])
+
+
+class KeysetPaginationTestCase(GoalsTestCase):
+    def walk(self, url: str, **params) -> list[dict]:
+        rows = []
+        response = self.client.get(url, data={'cursor': '', **params})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            rows.extend(response.data['results'])
+            if not response.data['next']:
+                return rows
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_over_foreign_key(self):
+        goals = self.create_goals(3)
+        comments = GoalComment.objects.bulk_create([
+            GoalComment(goal=goal, user=self.user, text=f'{goal.id}.{i}') for goal in reversed(goals) for i in range(2)
+        ])
+        expected = [comment.id for comment in sorted(comments, key=lambda comment: (comment.goal_id, comment.id))]
+
+        for fast in (False, True):
+            with self.subTest(fast=fast), override_settings(FAST_LIST_SERIALIZATION=fast):
+                rows = self.walk(reverse('list_goal_comment'), limit=1, ordering='goal')
+                self.assertEqual([row['id'] for row in rows], expected)
+
+    def test_undeclared_ordering_is_ignored(self):
+        self.create_goals(2)
+        response = self.client.get(reverse('list_goal_comment'), data={'cursor': '', 'ordering': 'user__password'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_cursor_walks_every_goal_once(self):
+        goals = self.create_goals(7, title='Same title') + self.create_goals(5)
+        rows = self.walk(reverse('list_goal'), limit=3)
+
+        self.assertEqual(sorted(row['id'] for row in rows), sorted(goal.id for goal in goals))
+        self.assertEqual([row['title'] for row in rows], sorted(row['title'] for row in rows))
+
+    def test_cursor_respects_descending_ordering(self):
+        self.create_goals(6)
+        rows = self.walk(reverse('list_goal'), limit=4, ordering='-created')
+
+        self.assertEqual(len(rows), 6)
+        self.assertEqual([row['created'] for row in rows], sorted((row['created'] for row in rows), reverse=True))
+
+    def test_cursor_previous_link(self):
+        self.create_goals(5)
+        first = self.client.get(reverse('list_goal'), data={'cursor': '', 'limit': 2})
+        second = self.client.get(first.data['next'])
+        back = self.client.get(second.data['previous'])
+
+        self.assertIsNone(first.data['previous'])
+        self.assertEqual(back.data['results'], first.data['results'])
+
+    def test_cursor_is_stable_under_inserts(self):
+        self.create_goals(4)
+        first = self.client.get(reverse('list_goal'), data={'cursor': '', 'limit': 2})
+        Goal.objects.create(title='Goal 00000', category=self.category, user=self.user)
+        second = self.client.get(first.data['next'])
+
+        seen = {row['id'] for row in first.data['results']}
+        self.assertFalse(seen & {row['id'] for row in second.data['results']})
+        self.assertEqual(second.data['results'][0]['title'], 'Goal 00002')
+
+    def test_cursor_skips_count_query(self):
+        self.create_goals(3)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse('list_goal'), data={'cursor': '', 'limit': 2})
+
+        self.assertFalse([query for query in queries if 'COUNT(' in query['sql'].upper()])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('list_goal'), data={'cursor': 'broken'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_offset_pagination_still_available(self):
+        self.create_goals(5)
+        response = self.client.get(reverse('list_goal'), data={'limit': 2, 'offset': 2})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual([row['title'] for row in response.data['results']], ['Goal 00002', 'Goal 00003'])
+
+    def test_cursor_on_comments_and_boards(self):
+        goal = self.create_goals(1)[0]
+        GoalComment.objects.bulk_create([GoalComment(goal=goal, user=self.user, text=str(i)) for i in range(5)])
+        Board.objects.bulk_create([Board(title=f'Board {i}') for i in range(3)])
+        for board in Board.objects.exclude(id=self.board.id):
+            BoardParticipant.objects.create(user=self.user, board=board)
+
+        self.assertEqual(len(self.walk(reverse('list_goal_comment'), limit=2)), 5)
+        self.assertEqual(len(self.walk(reverse('list_board'), limit=2)), 4)
+        self.assertEqual(len(self.walk(reverse('list_category'), limit=2)), 1)
+
+
+class ListQueryPlanTestCase(GoalsTestCase):
+    """Fails when a participant-scoped list query falls back to a full table scan."""
+    list_views = [GoalListView, GoalCategoryListView, GoalCommentListView, BoardListView]
+
+    def setUp(self):
+        super().setUp()
+        for i in range(20):
+            user = User.objects.create_user(username=f'user{i}')
+            board = Board.objects.create(title=f'Board {i}')
+            BoardParticipant.objects.create(user=user, board=board)
+            BoardParticipant.objects.create(user=self.user, board=board, role=BoardParticipant.Role.reader)
+            category = GoalCategory.objects.create(title=f'Category {i}', user=user, board=board, is_deleted=i % 2)
+            goals = Goal.objects.bulk_create([
+                Goal(title=f'Goal {j}', category=category, user=user, status=j % 4 + 1) for j in range(10)
+            ])
+            GoalComment.objects.bulk_create([GoalComment(goal=goal, user=user, text='text') for goal in goals])
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def get_list_queryset(self, view_class):
+        request = APIRequestFactory().get('/')
+        view = view_class()
+        view.setup(request)
+        view.request = Request(request)
+        view.request.user = self.user
+        view.format_kwarg = None
+        return view.filter_queryset(view.get_queryset())
+
+    def explain(self, queryset) -> str:
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                # with seq scans priced out, one only shows up when no index can serve the query
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def assert_no_full_scan(self, plan: str) -> None:
+        if connection.vendor == 'postgresql':
+            self.assertNotIn('Seq Scan', plan)
+        else:
+            self.assertIsNone(re.search(r'\bSCAN goals_', plan), plan)
+
+    def test_list_querysets_use_indexes(self):
+        for view_class in self.list_views:
+            with self.subTest(view=view_class.__name__):
+                self.assert_no_full_scan(self.explain(self.get_list_queryset(view_class)))
+
+
+class BoardRolesTestCase(GoalsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.reader = User.objects.create_user(username='reader')
+        BoardParticipant.objects.create(user=self.reader, board=self.board, role=BoardParticipant.Role.reader)
+        self.goal = Goal.objects.create(title='Goal', category=self.category, user=self.user)
+
+    def test_goal_update_resolves_roles_once(self):
+        url = reverse('detail_goal', args=[self.goal.id])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.patch(url, data={'category': self.category.id, 'title': 'New'})
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        participant_queries = [query for query in queries if 'goals_boardparticipant' in query['sql']]
+        self.assertEqual(len(participant_queries), 1)
+
+    def test_reader_cannot_write(self):
+        self.client.force_authenticate(user=self.reader)
+
+        self.assertEqual(self.client.get(reverse('detail_goal', args=[self.goal.id])).status_code, status.HTTP_200_OK)
+        response = self.client.patch(reverse('detail_goal', args=[self.goal.id]), data={'title': 'New'})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        response = self.client.post(reverse('create_goal'), data={'title': 'New', 'category': self.category.id})
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_comment_is_editable_by_author_only(self):
+        comment = GoalComment.objects.create(goal=self.goal, user=self.user, text='text')
+        url = reverse('detail_goal_comment', args=[comment.id])
+
+        self.client.force_authenticate(user=self.reader)
+        self.assertEqual(self.client.patch(url, data={'text': 'new'}).status_code, status.HTTP_403_FORBIDDEN)
+        self.client.force_authenticate(user=self.user)
+        self.assertEqual(self.client.patch(url, data={'text': 'new'}).status_code, status.HTTP_200_OK)
+
+    @override_settings(BOARD_ROLES_CACHE='default')
+    def test_shared_cache_is_invalidated_on_participant_change(self):
+        self.assertEqual(load_board_roles(self.reader.id), {self.board.id: BoardParticipant.Role.reader})
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                reverse('detail_board', args=[self.board.id]),
+                data={'title': 'Board', 'participants': []},
+                format='json',
+            )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(load_board_roles(self.reader.id), {})
+
+    @override_settings(BOARD_ROLES_CACHE='default')
+    def test_shared_cache_is_invalidated_on_board_create(self):
+        load_board_roles(self.user.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            board_id = self.client.post(reverse('create_board'), data={'title': 'New'}).data['id']
+
+        self.assertEqual(load_board_roles(self.user.id)[board_id], BoardParticipant.Role.owner)
+
+
+@override_settings(LIST_RESPONSE_CACHE=None)
+class QueryBudgetTestCase(QueryBudgetMixin, GoalsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.goal = Goal.objects.create(title='Goal', category=self.category, user=self.user)
+        self.comment = GoalComment.objects.create(goal=self.goal, user=self.user, text='text')
+
+    def new_users(self, count: int) -> list[User]:
+        start = User.objects.count()
+        return User.objects.bulk_create([User(username=f'user{i}') for i in range(start, start + count)])
+
+    def seed_goals(self, count: int) -> None:
+        Goal.objects.bulk_create([Goal(title='Goal', category=self.category, user=u) for u in self.new_users(count)])
+
+    def seed_categories(self, count: int) -> None:
+        GoalCategory.objects.bulk_create([
+            GoalCategory(title='Category', board=self.board, user=u) for u in self.new_users(count)
+        ])
+
+    def seed_comments(self, count: int) -> None:
+        GoalComment.objects.bulk_create([
+            GoalComment(goal=self.goal, user=u, text='text') for u in self.new_users(count)
+        ])
+
+    def seed_boards(self, count: int) -> None:
+        boards = Board.objects.bulk_create([Board(title='Board') for _ in range(count)])
+        BoardParticipant.objects.bulk_create([BoardParticipant(board=board, user=self.user) for board in boards])
+
+    def seed_participants(self, count: int) -> None:
+        BoardParticipant.objects.bulk_create([
+            BoardParticipant(board=self.board, user=u, role=BoardParticipant.Role.writer) for u in self.new_users(count)
+        ])
+
+    def test_list_endpoints(self):
+        for name, seed in [
+            ('list_goal', self.seed_goals),
+            ('list_category', self.seed_categories),
+            ('list_goal_comment', self.seed_comments),
+            ('list_board', self.seed_boards),
+        ]:
+            with self.subTest(endpoint=name):
+                # one for the board-role map, one for the board versions, then the page itself
+                self.assertQueryBudget(reverse(name), seed, max_queries=3)
+                self.assertQueryBudget(reverse(name), seed, data={'limit': 5}, max_queries=4)
+                self.assertQueryBudget(reverse(name), seed, data={'cursor': '', 'limit': 5}, max_queries=3)
+
+    def test_detail_endpoints(self):
+        for url, seed in [
+            (reverse('detail_goal', args=[self.goal.id]), self.seed_comments),
+            (reverse('detail_category', args=[self.category.id]), self.seed_goals),
+            (reverse('detail_goal_comment', args=[self.comment.id]), self.seed_comments),
+            (reverse('detail_board', args=[self.board.id]), self.seed_participants),
+        ]:
+            with self.subTest(url=url):
+                self.assertQueryBudget(url, seed, max_queries=4)
+
+
+class SearchTestCase(GoalsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.goal = Goal.objects.create(title='Buy milk', description='and some bread', category=self.category,
+                                        user=self.user)
+        self.comment = GoalComment.objects.create(goal=self.goal, user=self.user, text='Milk is in the fridge')
+
+        stranger = User.objects.create_user(username='stranger')
+        board = Board.objects.create(title='Foreign')
+        BoardParticipant.objects.create(user=stranger, board=board)
+        category = GoalCategory.objects.create(title='Foreign', user=stranger, board=board)
+        Goal.objects.create(title='Milk for strangers', category=category, user=stranger)
+
+    def search(self, q: str, **params) -> list[dict]:
+        response = self.client.get(reverse('search'), data={'q': q, **params})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data['results']
+
+    def test_search_goals_and_comments(self):
+        hits = self.search('milk')
+
+        self.assertEqual(
+            {(hit['type'], hit['id']) for hit in hits}, {('goal', self.goal.id), ('comment', self.comment.id)}
+        )
+        self.assertTrue(all('<b>' in hit['highlight'] for hit in hits))
+        self.assertTrue(all(hit['board'] == self.board.id for hit in hits))
+
+    def test_search_index_follows_updates(self):
+        self.goal.title = 'Buy cheese'
+        self.goal.save()
+        GoalComment.objects.filter(id=self.comment.id).delete()
+
+        self.assertEqual(self.search('milk'), [])
+        self.assertEqual([hit['id'] for hit in self.search('cheese')], [self.goal.id])
+
+    def test_search_hides_archived_goals(self):
+        Goal.objects.filter(id=self.goal.id).update(status=Goal.Status.archived)
+        self.assertEqual([hit['type'] for hit in self.search('bread')], [])
+        self.assertEqual([hit['type'] for hit in self.search('fridge')], [])
+
+    def test_search_hides_deleted_categories(self):
+        GoalCategory.objects.filter(id=self.category.id).update(is_deleted=True)
+        self.assertEqual(self.search('milk'), [])
+
+    def test_highlight_is_escaped(self):
+        self.goal.title = '<img src=x onerror=alert(1)> milk'
+        self.goal.save()
+
+        highlight = next(hit['highlight'] for hit in self.search('milk') if hit['type'] == 'goal')
+        self.assertNotIn('<img', highlight)
+        self.assertIn('&lt;img src=x onerror=alert(1)&gt; <b>milk</b>', highlight)
+
+    def test_search_query_is_not_syntax(self):
+        hits = self.search('"milk" OR NEAR(')
+        if connection.vendor == 'sqlite':
+            # every word is quoted, nothing reaches the FTS5 query syntax
+            self.assertEqual(hits, [])
+        else:
+            # websearch_to_tsquery reads quotes and OR as operators, and never fails on input
+            self.assertIn(self.goal.id, [hit['id'] for hit in hits])
+        self.assertEqual(len(self.search('milk', limit=1)), 1)
+
+    def test_contains_fallback(self):
+        with mock.patch('goals.views.search.get_search_backend', ContainsSearchBackend):
+            hits = self.search('MILK fridge')
+            self.assertEqual([(hit['type'], hit['id']) for hit in hits], [('comment', self.comment.id)])
+            self.assertEqual(hits[0]['highlight'], '<b>Milk</b> is in the <b>fridge</b>')
+
+            Goal.objects.filter(id=self.goal.id).update(status=Goal.Status.archived)
+            self.assertEqual(self.search('milk'), [])
+        with self.assertRaises(TypeError):
+            SearchBackend()
+
+    def test_search_requires_query(self):
+        self.assertEqual(self.client.get(reverse('search')).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_comment_list_search(self):
+        GoalComment.objects.create(goal=self.goal, user=self.user, text='Nothing here')
+        response = self.client.get(reverse('list_goal_comment'), data={'search': 'fridge'})
+
+        self.assertEqual([row['id'] for row in response.data], [self.comment.id])
+
+
+class BoardSummaryTestCase(GoalsTestCase):
+    def setUp(self):
+        super().setUp()
+        yesterday = timezone.localdate() - timedelta(days=1)
+        Goal.objects.bulk_create([
+            Goal(title='1', category=self.category, user=self.user, priority=Goal.Priority.high, due_date=yesterday),
+            Goal(title='2', category=self.category, user=self.user, priority=Goal.Priority.high),
+            Goal(title='3', category=self.category, user=self.user, status=Goal.Status.done, due_date=yesterday),
+            Goal(title='4', category=self.category, user=self.user, status=Goal.Status.archived),
+        ])
+        self.empty = GoalCategory.objects.create(title='Empty', user=self.user, board=self.board)
+        self.url = reverse('board_summary', args=[self.board.id])
+
+    def test_summary_counts(self):
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['total'], 3)
+        self.assertEqual(response.data['overdue'], 1)
+        self.assertEqual(response.data['by_status'], {Goal.Status.to_do: 2, Goal.Status.done: 1})
+        self.assertEqual(response.data['by_priority'], {Goal.Priority.high: 2, Goal.Priority.medium: 1})
+        category, empty = response.data['categories']
+        self.assertEqual((category['id'], category['total'], len(category['cells'])), (self.category.id, 3, 2))
+        self.assertEqual((empty['id'], empty['total'], empty['cells']), (self.empty.id, 0, []))
+
+    def test_summary_is_cached_until_next_write(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(self.url)
+        self.assertFalse([query for query in queries if 'goals_goal' in query['sql']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('create_goal'), data={'title': 'New', 'category': self.category.id})
+        self.assertEqual(self.client.get(self.url).data['total'], 4)
+
+    def test_summary_requires_participant(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='stranger'))
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class GoalBulkTestCase(GoalsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.goals = self.create_goals(3)
+        board = Board.objects.create(title='F')
+        self.foreign = GoalCategory.objects.create(title='Foreign', user=self.user, board=board)
+
+    def bulk(self, **data) -> dict:
+        response = self.client.post(reverse('bulk_goal'), data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK, response.data)
+        return response.data
+
+    def test_bulk_operations(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            result = self.bulk(
+                create=[
+                    {'title': 'New', 'category': self.category.id},
+                    {'title': 'New 2', 'category': self.category.id},
+                ],
+                update=[{'id': self.goals[0].id, 'status': Goal.Status.done, 'title': 'Done'}],
+                archive=[self.goals[1].id],
+            )
+
+        self.assertEqual([item['status'] for items in result.values() for item in items], ['ok'] * 4)
+        self.assertEqual(Goal.objects.get(id=result['create'][0]['id']).user, self.user)
+        self.goals[0].refresh_from_db()
+        self.assertEqual((self.goals[0].status, self.goals[0].title), (Goal.Status.done, 'Done'))
+        self.assertEqual(Goal.objects.get(id=self.goals[1].id).status, Goal.Status.archived)
+
+    def test_bulk_reports_item_errors(self):
+        result = self.bulk(
+            create=[
+                {'title': 'New', 'category': self.foreign.id},
+                {'category': self.category.id},
+                {'title': 'Ok', 'category': self.category.id},
+            ],
+            update=[{'id': 0, 'title': 'Missing'}, {'id': self.goals[0].id, 'priority': 42}],
+            archive=[self.goals[2].id],
+        )
+
+        self.assertEqual([item['status'] for item in result['create']], ['error', 'error', 'ok'])
+        self.assertIn('detail', result['create'][0]['errors'])
+        self.assertIn('title', result['create'][1]['errors'])
+        self.assertEqual([item['status'] for item in result['update']], ['error', 'error'])
+        self.assertEqual(result['archive'][0]['status'], 'ok')
+        self.assertEqual(Goal.objects.filter(title='Ok').count(), 1)
+
+    def test_bulk_reports_malformed_categories(self):
+        result = self.bulk(
+            create=[{'title': 'List', 'category': [1]}, {'title': 'Dict', 'category': {}},
+                    {'title': 'Text', 'category': 'abc'}, {'title': 'Flag', 'category': True}],
+            update=[{'id': self.goals[0].id, 'category': 'abc'}],
+        )
+
+        for item in result['create'] + result['update']:
+            self.assertIn('category', item['errors'])
+        self.assertFalse(Goal.objects.filter(title__in=['List', 'Dict', 'Text', 'Flag']).exists())
+
+    def test_bulk_rejects_boolean_ids(self):
+        response = self.client.post(reverse('bulk_goal'), data={'update': [{'id': True, 'title': 'x'}]}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_checks_board_role(self):
+        reader = User.objects.create_user(username='reader')
+        BoardParticipant.objects.create(user=reader, board=self.board, role=BoardParticipant.Role.reader)
+        self.client.force_authenticate(user=reader)
+        result = self.bulk(update=[{'id': self.goals[0].id, 'title': 'Hacked'}], archive=[self.goals[1].id])
+
+        self.assertEqual([item['status'] for items in result.values() for item in items], ['error', 'error'])
+        self.assertEqual(Goal.objects.filter(status=Goal.Status.archived).count(), 0)
+
+    def test_bulk_query_count_does_not_grow(self):
+        def run(count: int) -> int:
+            goals = self.create_goals(count)
+            with CaptureQueriesContext(connection) as queries:
+                self.bulk(
+                    create=[{'title': 'New', 'category': self.category.id}] * count,
+                    update=[{'id': goal.id, 'priority': Goal.Priority.high} for goal in goals],
+                    archive=[goal.id for goal in goals],
+                )
+            return len(queries)
+
+        self.assertEqual(run(3), run(30))
+
+    @skipUnlessDBFeature('has_select_for_update_of')
+    def test_bulk_locks_the_goals(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.bulk(update=[{'id': self.goals[0].id, 'title': 'Locked'}], archive=[self.goals[1].id])
+
+        locking = [query['sql'] for query in queries if 'FOR UPDATE' in query['sql']]
+        self.assertEqual(len(locking), 1)
+        self.assertIn('FROM "goals_goal"', locking[0])
+
+
+@override_settings(SOFT_DELETE_CASCADE_BACKGROUND=False, SOFT_DELETE_CASCADE_CHUNK_SIZE=2)
+class SoftDeleteCascadeTestCase(GoalsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.goals = self.create_goals(5)
+
+    def test_board_delete_archives_goals_in_chunks(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(reverse('detail_board', args=[self.board.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertTrue(GoalCategory.objects.get(id=self.category.id).is_deleted)
+        self.assertFalse(Goal.objects.exclude(status=Goal.Status.archived).exists())
+        cascade = SoftDeleteCascade.objects.get(board=self.board)
+        self.assertEqual((cascade.archived, cascade.last_goal_id), (5, self.goals[-1].id))
+        self.assertIsNotNone(cascade.finished)
+
+    def test_goals_are_hidden_before_cascade_runs(self):
+        response = self.client.delete(reverse('detail_category', args=[self.category.id]))
+
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(Goal.objects.exclude(status=Goal.Status.archived).count(), 5)
+        self.assertEqual(self.client.get(reverse('list_goal')).data, [])
+        response = self.client.get(reverse('detail_goal', args=[self.goals[0].id]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_resume_interrupted_cascade(self):
+        cascade = SoftDeleteCascade.objects.create(board=self.board, category=self.category,
+                                                   last_goal_id=self.goals[1].id)
+        out = StringIO()
+        call_command('cascade', 'list', stdout=out)
+        self.assertIn('3 goals left', out.getvalue())
+
+        call_command('cascade', 'resume', stdout=StringIO())
+        cascade.refresh_from_db()
+        self.assertIsNotNone(cascade.finished)
+        self.assertEqual(cascade.archived, 3)
+        self.assertEqual(Goal.objects.filter(status=Goal.Status.archived).count(), 3)
+
+
+class ConditionalGetTestCase(GoalsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.goal = self.create_goals(1)[0]
+
+    def test_list_not_modified(self):
+        url = reverse('list_goal')
+        etag = self.client.get(url)['ETag']
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse([query for query in queries if 'goals_goal' in query['sql']])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.patch(reverse('detail_goal', args=[self.goal.id]), data={'title': 'New'})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_200_OK)
+
+    def test_list_etag_depends_on_query(self):
+        url = reverse('list_goal')
+        self.assertNotEqual(self.client.get(url)['ETag'], self.client.get(url, data={'ordering': '-created'})['ETag'])
+
+    def test_detail_not_modified(self):
+        url = reverse('detail_goal', args=[self.goal.id])
+        response = self.client.get(url)
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code,
+                         status.HTTP_304_NOT_MODIFIED)
+
+    def test_detail_has_no_last_modified(self):
+        # a comment changes comments_count but not the goal's `updated`
+        url = reverse('detail_goal', args=[self.goal.id])
+        response = self.client.get(url)
+        GoalComment.objects.create(goal=self.goal, user=self.user, text='text')
+
+        self.assertFalse(response.has_header('Last-Modified'))
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=http_date(time.time() + 60))
+        self.assertEqual((response.status_code, response.data['comments_count']), (status.HTTP_200_OK, 1))
+
+    def test_detail_still_checks_permission(self):
+        etag = self.client.get(reverse('detail_board', args=[self.board.id]))['ETag']
+        self.client.force_authenticate(user=User.objects.create_user(username='stranger'))
+
+        response = self.client.get(reverse('detail_board', args=[self.board.id]), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class ListResponseCacheTestCase(GoalsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.create_goals(3)
+        self.url = reverse('list_goal')
+
+    def test_second_request_is_served_from_cache(self):
+        hits = list_response_cache.stats()['hits']
+        first = self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.url)
+
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(first.data, second.data)
+        self.assertFalse([query for query in queries if 'goals_goal' in query['sql']])
+        self.assertEqual(list_response_cache.stats()['hits'], hits + 1)
+
+    def test_write_invalidates_cached_page(self):
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('create_goal'), data={'title': 'New', 'category': self.category.id})
+
+        response = self.client.get(self.url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(len(response.data), 4)
+
+    def test_versions_are_shared_through_the_database(self):
+        etag = self.client.get(self.url)['ETag']
+        # like a write of runbot or another worker: nothing runs in this process after it commits
+        Goal.objects.create(title='Elsewhere', category=self.category, user=self.user)
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response['X-Cache']), (status.HTTP_200_OK, 'MISS'))
+        self.assertEqual(len(response.data), 4)
+
+    def test_profile_change_invalidates_cached_page(self):
+        etag = self.client.get(self.url)['ETag']
+        self.client.patch(reverse('profile'), data={'first_name': 'Renamed'})
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual((response.status_code, response['X-Cache']), (status.HTTP_200_OK, 'MISS'))
+        self.assertEqual(response.data[0]['user']['first_name'], 'Renamed')
+
+        # logging in saves last_login only
+        etag = response['ETag']
+        self.user.save(update_fields=['last_login'])
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_full_board_save_keeps_version(self):
+        board = Board.objects.get(id=self.board.id)
+        self.create_goals(1)
+        board.title = 'Renamed'
+        board.save()
+
+        self.assertGreater(Board.objects.get(id=self.board.id).version, board.version)
+
+    @override_settings(BOARD_ROLES_CACHE='default')
+    def test_revoked_member_never_gets_cached_page(self):
+        member = User.objects.create_user(username='member')
+        BoardParticipant.objects.create(user=member, board=self.board, role=BoardParticipant.Role.reader)
+        self.client.force_authenticate(user=member)
+        self.assertEqual(len(self.client.get(self.url).data), 3)
+
+        self.client.force_authenticate(user=self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(reverse('detail_board', args=[self.board.id]), data={'title': 'Board', 'participants': []},
+                            format='json')
+
+        self.client.force_authenticate(user=member)
+        self.assertEqual(self.client.get(self.url).data, [])
+
+    @override_settings(LIST_RESPONSE_CACHE=None)
+    def test_cache_can_be_disabled(self):
+        self.client.get(self.url)
+        self.assertEqual(self.client.get(self.url)['X-Cache'], 'MISS')
+
+
+class SyncTestCase(GoalsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.goals = self.create_goals(2)
+        self.comment = GoalComment.objects.create(goal=self.goals[0], user=self.user, text='text')
+
+    def sync(self, cursor: str | None = None) -> dict:
+        response = self.client.get(reverse('sync'), data={'since': cursor} if cursor else {})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.data
+
+    def age(self, seconds: int = 60) -> None:
+        past = timezone.now() - timedelta(seconds=seconds)
+        for model in (Board, BoardParticipant, GoalCategory, Goal, GoalComment):
+            model.objects.update(created=past, updated=past)
+
+    def test_full_snapshot(self):
+        data = self.sync()
+
+        self.assertTrue(data['reset'])
+        self.assertEqual([row['id'] for row in data['boards']], [self.board.id])
+        self.assertEqual(len(data['goals']), 2)
+        self.assertEqual([row['id'] for row in data['comments']], [self.comment.id])
+
+    @override_settings(SYNC_OVERLAP_SECONDS=0)
+    def test_delta_with_tombstones(self):
+        self.age()
+        cursor = encode_cursor(timezone.now() - timedelta(seconds=30))
+        self.assertEqual(sum(map(len, self.sync(cursor)['deleted'].values())), 0)
+
+        self.client.patch(reverse('detail_goal', args=[self.goals[0].id]), data={'title': 'Changed'})
+        self.client.delete(reverse('detail_goal', args=[self.goals[1].id]))
+        self.client.delete(reverse('detail_goal_comment', args=[self.comment.id]))
+        data = self.sync(cursor)
+
+        self.assertFalse(data['reset'])
+        self.assertEqual(data['boards'], [])
+        self.assertEqual([row['title'] for row in data['goals']], ['Changed'])
+        self.assertEqual(data['deleted']['goals'], [self.goals[1].id])
+        self.assertEqual(data['deleted']['comments'], [self.comment.id])
+
+    @override_settings(SYNC_OVERLAP_SECONDS=0)
+    def test_removed_membership_and_new_board(self):
+        owner = User.objects.create_user(username='owner')
+        other = Board.objects.create(title='Other')
+        BoardParticipant.objects.create(user=owner, board=other)
+        BoardParticipant.objects.create(user=self.user, board=other, role=BoardParticipant.Role.reader)
+        self.age()
+        cursor = encode_cursor(timezone.now() - timedelta(seconds=30))
+
+        self.client.force_authenticate(user=owner)
+        self.client.put(reverse('detail_board', args=[other.id]), data={'title': 'Other', 'participants': []},
+                        format='json')
+        self.client.force_authenticate(user=self.user)
+        new = self.client.post(reverse('create_board'), data={'title': 'New'}).data['id']
+        data = self.sync(cursor)
+
+        self.assertEqual(data['deleted']['boards'], [other.id])
+        self.assertEqual([row['id'] for row in data['boards']], [new])
+
+    @override_settings(SYNC_OVERLAP_SECONDS=0)
+    def test_moved_goals_are_tombstoned_on_the_old_board(self):
+        member = User.objects.create_user(username='member')
+        BoardParticipant.objects.create(user=member, board=self.board, role=BoardParticipant.Role.reader)
+        other = Board.objects.create(title='Other')
+        BoardParticipant.objects.create(user=self.user, board=other)
+        target = GoalCategory.objects.create(title='Target', user=self.user, board=other)
+        moving = GoalCategory.objects.create(title='Moving', user=self.user, board=self.board)
+        moved_with_category = Goal.objects.create(title='Along', category=moving, user=self.user)
+        self.age()
+        cursor = encode_cursor(timezone.now() - timedelta(seconds=30))
+
+        goal = Goal.objects.get(id=self.goals[0].id)
+        goal.category = target
+        goal.save()
+        moving = GoalCategory.objects.get(id=moving.id)
+        moving.board = other
+        moving.save()
+
+        self.client.force_authenticate(user=member)
+        deleted = self.sync(cursor)['deleted']
+        self.assertEqual(deleted['goals'], sorted([goal.id, moved_with_category.id]))
+        self.assertEqual(deleted['comments'], [self.comment.id])
+        self.assertEqual(deleted['categories'], [moving.id])
+
+        # a member of both boards gets the rows with their new board and no tombstones
+        self.client.force_authenticate(user=self.user)
+        data = self.sync(cursor)
+        self.assertEqual(sum(map(len, data['deleted'].values())), 0)
+        self.assertEqual({row['id'] for row in data['goals']}, {goal.id, moved_with_category.id})
+
+    @override_settings(SYNC_OVERLAP_SECONDS=0)
+    def test_bulk_moved_goals_are_tombstoned_on_the_old_board(self):
+        member = User.objects.create_user(username='member')
+        BoardParticipant.objects.create(user=member, board=self.board, role=BoardParticipant.Role.reader)
+        other = Board.objects.create(title='Other')
+        BoardParticipant.objects.create(user=self.user, board=other)
+        target = GoalCategory.objects.create(title='Target', user=self.user, board=other)
+        self.age()
+        cursor = encode_cursor(timezone.now() - timedelta(seconds=30))
+
+        response = self.client.post(reverse('bulk_goal'), format='json', data={
+            'update': [{'id': self.goals[0].id, 'category': target.id}],
+        })
+        self.assertEqual(response.data['update'][0]['status'], 'ok')
+
+        self.client.force_authenticate(user=member)
+        deleted = self.sync(cursor)['deleted']
+        self.assertEqual(deleted['goals'], [self.goals[0].id])
+        self.assertEqual(deleted['comments'], [self.comment.id])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(reverse('sync'), data={'since': 'x'}).status_code,
+                         status.HTTP_400_BAD_REQUEST)
+
+
+class BoardExportTestCase(GoalsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.goals = self.create_goals(3)
+        self.comment = GoalComment.objects.create(goal=self.goals[0], user=self.user, text='a, "quoted"\nline')
+        Goal.objects.filter(id=self.goals[2].id).update(status=Goal.Status.archived)
+        self.url = reverse('board_export', args=[self.board.id])
+
+    def export(self, **params) -> tuple[str, str]:
+        response = self.client.get(self.url, data=params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.streaming)
+        return response['Content-Type'], b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        content_type, body = self.export()
+        rows = [json.loads(line) for line in body.splitlines()]
+
+        self.assertTrue(content_type.startswith('application/x-ndjson'))
+        self.assertEqual([(row['type'], row['id']) for row in rows], [
+            ('category', self.category.id), ('goal', self.goals[0].id), ('goal', self.goals[1].id),
+            ('comment', self.comment.id),
+        ])
+        self.assertEqual(rows[1]['user'], 'testuser')
+        self.assertEqual(rows[3]['text'], self.comment.text)
+
+    def test_csv(self):
+        content_type, body = self.export(format='csv')
+        rows = list(csv.DictReader(body.splitlines(keepends=True)))
+
+        self.assertTrue(content_type.startswith('text/csv'))
+        self.assertEqual([row['type'] for row in rows], ['category', 'goal', 'goal', 'comment'])
+        self.assertEqual(rows[3]['text'], self.comment.text)
+        self.assertEqual(rows[1]['category'], str(self.category.id))
+
+    def test_not_a_participant(self):
+        self.client.force_authenticate(user=User.objects.create_user(username='stranger'))
+        self.assertEqual(self.client.get(self.url).status_code, status.HTTP_403_FORBIDDEN)
+
+
+class BoardExportASGITestCase(APITransactionTestCase):
+    """The export served by todolist.asgi, whose rows are read in the request's thread, not the event loop."""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='testuser', password='testpassword')
+        self.board = Board.objects.create(title='Board')
+        BoardParticipant.objects.create(user=self.user, board=self.board, role=BoardParticipant.Role.owner)
+        category = GoalCategory.objects.create(title='Category', user=self.user, board=self.board)
+        self.goals = Goal.objects.bulk_create([
+            Goal(title=f'Goal {i}', category=category, user=self.user) for i in range(3)
+        ])
+        self.client.force_login(self.user)
+
+    async def get(self, path: str) -> tuple[dict, bytes]:
+        from todolist.asgi import application
+
+        scope = {
+            'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+            'path': path, 'raw_path': path.encode(), 'query_string': b'', 'root_path': '',
+            'headers': [(b'cookie', f'{settings.SESSION_COOKIE_NAME}={self.client.session.session_key}'.encode())],
+            'server': ('testserver', 80),
+        }
+        messages = []
+
+        async def receive() -> dict:
+            return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+        async def send(message: dict) -> None:
+            messages.append(message)
+
+        await application(scope, receive, send)
+        return messages[0], b''.join(message.get('body', b'') for message in messages[1:])
+
+    def test_streams_under_asgi(self):
+        start, content = async_to_sync(self.get)(reverse('board_export', args=[self.board.id]))
+        rows = [json.loads(line) for line in content.splitlines()]
+
+        self.assertEqual(start['status'], status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in rows if row['type'] == 'goal'], [goal.id for goal in self.goals])
+
+
+class BoardImportTestCase(GoalsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = reverse('board_import', args=[self.board.id])
+
+    def upload(self, name: str, content: str, **data):
+        return self.client.post(self.url, data={'file': SimpleUploadedFile(name, content.encode()), **data},
+                                format='multipart')
+
+    def test_ndjson(self):
+        rows = [
+            {'type': 'category', 'id': 900, 'title': 'Imported'},
+            {'type': 'goal', 'category': 900, 'title': 'New', 'priority': Goal.Priority.high},
+            {'type': 'goal', 'category': self.category.id, 'title': 'Existing', 'due_date': '2030-01-01'},
+            {'type': 'goal', 'category': 900},
+            {'type': 'comment', 'goal': 1, 'text': 'skipped'},
+        ]
+        content = '\n'.join(map(json.dumps, rows)) + '\nnot json\n'
+        response = self.upload('goals.ndjson', content)
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['created'], {'categories': 1, 'goals': 2})
+        self.assertEqual((response.data['failed'], response.data['skipped']), (2, 1))
+        errors = sorted(response.data['errors'], key=lambda error: error['line'])
+        self.assertEqual([error['line'] for error in errors], [4, 6])
+        self.assertIn('title', errors[0]['errors'])
+        imported = GoalCategory.objects.get(title='Imported')
+        self.assertEqual(imported.board, self.board)
+        self.assertEqual(Goal.objects.get(title='New').category, imported)
+        self.assertEqual(Goal.objects.get(title='Existing').user, self.user)
+
+    def test_round_trip_csv(self):
+        self.create_goals(3)
+        export = b''.join(self.client.get(reverse('board_export', args=[self.board.id]),
+                                          data={'format': 'csv'}).streaming_content).decode()
+        target = Board.objects.create(title='Target')
+        BoardParticipant.objects.create(user=self.user, board=target, role=BoardParticipant.Role.writer)
+
+        with self.assertNumQueries(13):
+            response = self.client.post(reverse('board_import', args=[target.id]), format='multipart',
+                                        data={'file': SimpleUploadedFile('board.csv', export.encode())})
+
+        self.assertEqual(response.data['created'], {'categories': 1, 'goals': 3})
+        self.assertEqual(Goal.objects.filter(category__board=target).count(), 3)
+
+    def test_categories_only_import_invalidates_cached_list(self):
+        url = reverse('list_category')
+        self.assertEqual(len(self.client.get(url).data), 1)
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+        self.upload('categories.ndjson', json.dumps({'type': 'category', 'title': 'Imported'}))
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual({row['title'] for row in response.data}, {'Category', 'Imported'})
+
+    def test_foreign_category_and_permission(self):
+        foreign = GoalCategory.objects.create(title='Foreign', user=self.user, board=Board.objects.create(title='F'))
+        response = self.upload('goals.ndjson', json.dumps({'category': foreign.id, 'title': 'x'}))
+        self.assertEqual(response.data['failed'], 1)
+
+        BoardParticipant.objects.filter(user=self.user).update(role=BoardParticipant.Role.reader)
+        self.assertEqual(self.upload('goals.ndjson', '').status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_command(self):
+        out = StringIO()
+        with NamedTemporaryFile('w', suffix='.ndjson') as file:
+            file.write(json.dumps({'category': self.category.id, 'title': 'From command'}))
+            file.flush()
+            call_command('import_goals', self.board.id, file.name, user='testuser', batch_size=10, stdout=out)
+        self.assertIn('1 goals created', out.getvalue())
+        self.assertTrue(Goal.objects.filter(title='From command').exists())
+
+
+class BoardDenormalizationTestCase(GoalsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.goal = self.create_goals(1)[0]
+        self.comment = GoalComment.objects.create(goal=self.goal, user=self.user, text='text')
+        self.other = Board.objects.create(title='Other')
+        BoardParticipant.objects.create(user=self.user, board=self.other, role=BoardParticipant.Role.owner)
+        self.other_category = GoalCategory.objects.create(title='Other', user=self.user, board=self.other)
+
+    def assertBoard(self, board: Board) -> None:
+        self.assertEqual(Goal.objects.get(id=self.goal.id).board_id, board.id)
+        self.assertEqual(GoalComment.objects.get(id=self.comment.id).board_id, board.id)
+
+    def test_created_rows_carry_board(self):
+        self.assertBoard(self.board)
+        response = self.client.post(reverse('create_goal_comment'), data={'goal': self.goal.id, 'text': 'new'})
+        self.assertEqual(response.data['board'], self.board.id)
+
+    def test_goal_moved_to_another_board(self):
+        response = self.client.patch(reverse('detail_goal', args=[self.goal.id]),
+                                     data={'category': self.other_category.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertBoard(self.other)
+
+    def test_category_moved_to_another_board(self):
+        response = self.client.patch(reverse('detail_category', args=[self.category.id]), data={'board': self.other.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertBoard(self.other)
+
+    def test_bulk_move(self):
+        response = self.client.post(reverse('bulk_goal'), format='json', data={
+            'update': [{'id': self.goal.id, 'category': self.other_category.id}],
+        })
+        self.assertEqual(response.data['update'][0]['status'], 'ok')
+        self.assertBoard(self.other)
+
+
+class CountersTestCase(GoalsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.goals = self.create_goals(3)
+
+    def assertCounters(self, obj, to_do=0, in_progress=0, done=0, archived=0) -> None:
+        obj.refresh_from_db()
+        self.assertEqual(
+            (obj.goals_to_do, obj.goals_in_progress, obj.goals_done, obj.goals_archived),
+            (to_do, in_progress, done, archived),
+        )
+
+    def test_goal_writes(self):
+        self.assertCounters(self.category, to_do=3)
+        self.client.post(reverse('create_goal'), data={'title': 'New', 'category': self.category.id,
+                                                       'status': Goal.Status.done})
+        self.client.patch(reverse('detail_goal', args=[self.goals[0].id]), data={'status': Goal.Status.in_progress})
+        self.client.delete(reverse('detail_goal', args=[self.goals[1].id]))
+
+        for obj in (self.category, self.board):
+            self.assertCounters(obj, to_do=1, in_progress=1, done=1, archived=1)
+
+    def test_bulk_and_move(self):
+        other = GoalCategory.objects.create(title='Other', user=self.user, board=self.board)
+        self.client.post(reverse('bulk_goal'), format='json', data={
+            'create': [{'title': 'New', 'category': other.id}],
+            'update': [{'id': self.goals[0].id, 'category': other.id, 'status': Goal.Status.done}],
+            'archive': [self.goals[1].id],
+        })
+
+        self.assertCounters(self.category, to_do=1, archived=1)
+        self.assertCounters(other, to_do=1, done=1)
+        self.assertCounters(self.board, to_do=2, done=1, archived=1)
+
+        board = Board.objects.create(title='Other')
+        BoardParticipant.objects.create(user=self.user, board=board, role=BoardParticipant.Role.owner)
+        self.client.patch(reverse('detail_category', args=[other.id]), data={'board': board.id})
+        self.assertCounters(self.board, to_do=1, archived=1)
+        self.assertCounters(board, to_do=1, done=1)
+
+    @override_settings(SOFT_DELETE_CASCADE_BACKGROUND=False)
+    def test_cascade(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('detail_category', args=[self.category.id]))
+        self.assertCounters(self.category, archived=3)
+        self.assertCounters(self.board, archived=3)
+
+    def test_comments(self):
+        url = reverse('create_goal_comment')
+        comment = self.client.post(url, data={'goal': self.goals[0].id, 'text': 'one'}).data
+        self.client.post(url, data={'goal': self.goals[0].id, 'text': 'two'})
+        self.client.delete(reverse('detail_goal_comment', args=[comment['id']]))
+
+        response = self.client.get(reverse('detail_goal', args=[self.goals[0].id]))
+        self.assertEqual(response.data['comments_count'], 1)
+        self.assertEqual(self.client.get(reverse('detail_board', args=[self.board.id])).data['goals_to_do'], 3)
+
+    def test_full_save_keeps_concurrent_counts(self):
+        stale = GoalCategory.objects.get(id=self.category.id)
+        goal = Goal.objects.get(id=self.goals[0].id)
+        self.client.post(reverse('create_goal'), data={'title': 'New', 'category': self.category.id})
+        GoalComment.objects.create(goal=self.goals[0], user=self.user, text='text')
+
+        stale.title = 'Renamed'
+        stale.save()
+        goal.title = 'Renamed'
+        goal.save()
+        self.assertCounters(self.category, to_do=4)
+        self.assertEqual(Goal.objects.get(id=goal.id).comments_count, 1)
+
+    def test_counters_are_read_only(self):
+        self.client.patch(reverse('detail_category', args=[self.category.id]), data={'goals_to_do': 100})
+        self.assertCounters(self.category, to_do=3)
+
+    def test_reconcile(self):
+        Goal.objects.filter(id=self.goals[0].id).update(status=Goal.Status.done)
+        GoalComment.objects.bulk_create([GoalComment(goal=self.goals[1], user=self.user, text='text')])
+        Goal.objects.filter(id=self.goals[1].id).update(comments_count=5)
+
+        out = StringIO()
+        call_command('reconcile_counters', stdout=out)
+        self.assertIn('1 boards repaired, 1 categories repaired, 1 goals repaired', out.getvalue())
+        self.assertCounters(self.category, to_do=2, done=1)
+        self.assertEqual(Goal.objects.get(id=self.goals[1].id).comments_count, 1)
+
+
+@override_settings(LIST_RESPONSE_CACHE=None)
+class FastListTestCase(GoalsTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user.first_name = 'Юзер \u2028'
+        self.user.save()
+        goals = self.create_goals(5, title='Цель "quoted" \u2029')
+        goals[0].due_date = timezone.localdate()
+        goals[0].description = 'line\nbreak'
+        goals[0].save()
+        GoalComment.objects.bulk_create([GoalComment(goal=goal, user=self.user, text='😀') for goal in goals])
+
+    def get_both(self, url: str, **params) -> tuple[bytes, bytes]:
+        with override_settings(FAST_LIST_SERIALIZATION=False):
+            slow = self.client.get(url, data=params)
+        with override_settings(FAST_LIST_SERIALIZATION=True):
+            fast = self.client.get(url, data=params)
+        self.assertEqual(slow.status_code, status.HTTP_200_OK)
+        return slow.content, fast.content
+
+    def test_byte_parity(self):
+        for name in ('list_goal', 'list_category', 'list_goal_comment', 'list_board'):
+            for params in ({}, {'limit': 2, 'offset': 1}, {'cursor': '', 'limit': 2}, {'ordering': '-created'}):
+                with self.subTest(url=name, params=params):
+                    slow, fast = self.get_both(reverse(name), **params)
+                    self.assertEqual(slow, fast)
+
+    def test_keyset_pages_match(self):
+        slow, fast = self.get_both(reverse('list_goal'), cursor='', limit=2)
+        cursor = json.loads(fast)['next'].split('cursor=')[1].split('&')[0]
+        self.assertEqual(*self.get_both(reverse('list_goal'), cursor=cursor, limit=2))
+
+    def test_orjson_renderer_and_parser(self):
+        data = {
+            'results': json.loads(self.client.get(reverse('list_goal')).content),
+            'extra': {1: timezone.now(), 'date': timezone.localdate(), 'text': '\u2028 ü', 'none': None},
+        }
+
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            ORJSONRenderer().render(data, 'application/json; indent=4'),
+            JSONRenderer().render(data, 'application/json; indent=4'),
+        )
+        body = JSONRenderer().render({'a': [1, 2.5, 'ю']})
+        self.assertEqual(ORJSONParser().parse(BytesIO(body)), JSONParser().parse(BytesIO(body)))
+
+
+class ParticipantSyncTestCase(GoalsTestCase):
+    def setUp(self):
+        super().setUp()
+        users = User.objects.bulk_create([User(username=f'member{i:03}') for i in range(200)])
+        BoardParticipant.objects.bulk_create([
+            BoardParticipant(user=user, board=self.board, role=BoardParticipant.Role.reader) for user in users
+        ])
+        self.newcomer = User.objects.create_user(username='newcomer')
+        self.url = reverse('detail_board', args=[self.board.id])
+
+    def participants(self) -> dict[str, tuple[int, int]]:
+        return {
+            username: (participant_id, role) for participant_id, username, role in
+            BoardParticipant.objects.filter(board=self.board).exclude(user=self.user)
+            .values_list('id', 'user__username', 'role')
+        }
+
+    def test_minimal_changes_in_few_queries(self):
+        before = self.participants()
+        payload = [
+            {'user': username, 'role': BoardParticipant.Role.reader} for username in before if username != 'member000'
+        ]
+        payload[0]['role'] = BoardParticipant.Role.writer
+        payload.append({'user': 'newcomer', 'role': BoardParticipant.Role.writer})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.put(self.url, data={'title': 'Board', 'participants': payload}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertLessEqual(len([q for q in queries if not q['sql'].startswith(('SAVEPOINT', 'RELEASE'))]), 16)
+        # the view's prefetch, the username lookup and the response's prefetch
+        self.assertEqual(len([q for q in queries if q['sql'].startswith('SELECT "core_user"')]), 3)
+
+        after = self.participants()
+        self.assertNotIn('member000', after)
+        self.assertEqual(after['member001'], (before['member001'][0], BoardParticipant.Role.writer))
+        self.assertEqual(after['member199'], before['member199'])
+        self.assertEqual(after['newcomer'][1], BoardParticipant.Role.writer)
+
+    def test_unknown_username(self):
+        response = self.client.put(self.url, format='json', data={
+            'title': 'Board', 'participants': [{'user': 'nobody', 'role': BoardParticipant.Role.reader}],
+        })
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(len(self.participants()), 200)
+
+
+class AsyncListTestCase(GoalsTestCase):
+    views = (GoalListView, GoalCategoryListView, GoalCommentListView, BoardListView)
+
+    def setUp(self):
+        super().setUp()
+        goals = self.create_goals(5)
+        GoalComment.objects.bulk_create([GoalComment(goal=goal, user=self.user, text='text') for goal in goals])
+        self.factory = APIRequestFactory()
+
+    def get(self, view, data: dict | None = None, user=None, **extra):
+        request = self.factory.get('/list', data=data, **extra)
+        force_authenticate(request, user=user or self.user)
+        response = async_to_sync(view)(request) if asyncio.iscoroutinefunction(view) else view(request)
+        return response.render() if hasattr(response, 'render') else response
+
+    @override_settings(LIST_RESPONSE_CACHE=None)
+    def test_same_output_as_sync_view(self):
+        for view_class in self.views:
+            async_view = AsyncListView.as_view(view_class=view_class)
+            for params in ({}, {'limit': 2, 'offset': 1}, {'cursor': '', 'limit': 2}, {'ordering': '-created'}):
+                with self.subTest(view=view_class.__name__, params=params):
+                    expected = self.get(view_class.as_view(), params)
+                    response = self.get(async_view, params)
+                    self.assertEqual(response.status_code, status.HTTP_200_OK)
+                    self.assertEqual(response.content, expected.content)
+                    self.assertEqual(response['ETag'], expected['ETag'])
+
+    def test_keyset_next_page(self):
+        view = AsyncListView.as_view(view_class=GoalListView)
+        first = json.loads(self.get(view, {'cursor': '', 'limit': 2}).content)
+        cursor = parse_qs(urlparse(first['next']).query)['cursor'][0]
+
+        second = json.loads(self.get(view, {'cursor': cursor, 'limit': 2}).content)
+        self.assertEqual([goal['title'] for goal in second['results']], ['Goal 00002', 'Goal 00003'])
+        self.assertEqual(self.get(view, {'cursor': 'broken'}).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_conditional_and_cached(self):
+        view = AsyncListView.as_view(view_class=GoalListView)
+        first = self.get(view)
+        second = self.get(view)
+        self.assertEqual((first['X-Cache'], second['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(first.content, second.content)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(view, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertFalse([query for query in queries if 'goals_goal' in query['sql']])
+
+    def test_scoped_to_participant(self):
+        view = AsyncListView.as_view(view_class=GoalListView)
+        stranger = User.objects.create_user(username='stranger')
+        self.assertEqual(json.loads(self.get(view, user=stranger).content), [])
+
+        response = async_to_sync(view)(self.factory.get('/list')).render()
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_switch(self):
+        with override_settings(ASYNC_LIST_VIEWS=True):
+            self.assertTrue(asyncio.iscoroutinefunction(list_view(GoalListView)))
+        with override_settings(ASYNC_LIST_VIEWS=False):
+            self.assertFalse(asyncio.iscoroutinefunction(list_view(GoalListView)))
+
+
+class RecordingBroker(InProcessBroker):
+    def __init__(self) -> None:
+        super().__init__()
+        self.published = []
+
+    def publish(self, events: list[dict]) -> None:
+        self.published.extend(events)
+        super().publish(events)
+
+
+@override_settings(EVENT_BROKER='goals.tests.RecordingBroker')
+class BoardEventsTestCase(GoalsTestCase):
+    def setUp(self):
+        super().setUp()
+        get_broker().published.clear()
+        self.router = BoardEventRouter(None)
+
+    def scope(self, user=None, board_id: int | None = None, method: str = 'GET') -> dict:
+        headers = []
+        if user is not None:
+            self.client.force_login(user)
+            headers.append((b'cookie', f'{settings.SESSION_COOKIE_NAME}={self.client.session.session_key}'.encode()))
+        path = f'/goals/board/{board_id or self.board.id}/events'
+        return {
+            'type': 'http', 'method': method, 'path': path, 'raw_path': path.encode(), 'query_string': b'',
+            'root_path': '', 'scheme': 'http', 'headers': headers, 'server': ('testserver', 80),
+        }
+
+    async def open(self, scope: dict) -> tuple[asyncio.Task, asyncio.Queue, asyncio.Queue, dict]:
+        inbox, outbox = asyncio.Queue(), asyncio.Queue()
+        task = asyncio.ensure_future(self.router(scope, inbox.get, outbox.put))
+        return task, inbox, outbox, await asyncio.wait_for(outbox.get(), 5)
+
+    @staticmethod
+    async def next_event(outbox: asyncio.Queue) -> dict:
+        message = await asyncio.wait_for(outbox.get(), 5)
+        data = message['body'].decode().rsplit('data: ', 1)[1]
+        return json.loads(data)
+
+    def committed(self, method: str, url: str, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return getattr(self.client, method)(url, format='json', **kwargs)
+
+    async def test_pushes_committed_changes(self):
+        task, inbox, outbox, start = await self.open(await sync_to_async(self.scope)(self.user))
+        self.assertEqual(start['status'], 200)
+        self.assertIn((b'content-type', b'text/event-stream'), start['headers'])
+        self.assertEqual((await self.next_event(outbox))['type'], 'ready')
+
+        response = await sync_to_async(self.committed)(
+            'post', reverse('create_goal'), data={'title': 'New', 'category': self.category.id}
+        )
+        self.assertEqual(
+            await self.next_event(outbox), {'type': 'goal.created', 'board': self.board.id, 'id': response.data['id']}
+        )
+        await sync_to_async(self.committed)('delete', reverse('detail_goal', args=[response.data['id']]))
+        self.assertEqual((await self.next_event(outbox))['type'], 'goal.archived')
+
+        await inbox.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(task, 5)
+        self.assertEqual(get_broker().subscriber_count(), 0)
+
+    @override_settings(EVENT_STREAM_HEARTBEAT_SECONDS=0.01)
+    async def test_heartbeat(self):
+        task, inbox, outbox, _ = await self.open(await sync_to_async(self.scope)(self.user))
+        await outbox.get()
+        self.assertEqual((await asyncio.wait_for(outbox.get(), 5))['body'], b': ping\n\n')
+        await inbox.put({'type': 'http.disconnect'})
+        await asyncio.wait_for(task, 5)
+
+    async def test_subscription_is_authorized(self):
+        stranger = await sync_to_async(User.objects.create_user)(username='stranger')
+        cases = [
+            (self.scope(), 403),
+            (await sync_to_async(self.scope)(stranger), 403),
+            (await sync_to_async(self.scope)(self.user, board_id=self.board.id + 100), 404),
+            (await sync_to_async(self.scope)(self.user, method='POST'), 405),
+        ]
+        for scope, code in cases:
+            task, _, outbox, start = await self.open(scope)
+            self.assertEqual(start['status'], code)
+            await asyncio.wait_for(task, 5)
+
+    async def test_removed_participant_is_disconnected(self):
+        member = await sync_to_async(User.objects.create_user)(username='member')
+        await sync_to_async(BoardParticipant.objects.create)(
+            user=member, board=self.board, role=BoardParticipant.Role.reader
+        )
+        task, _, outbox, _ = await self.open(await sync_to_async(self.scope)(member))
+        await self.next_event(outbox)
+
+        await sync_to_async(self.client.force_login)(self.user)
+        await sync_to_async(self.committed)(
+            'put', reverse('detail_board', args=[self.board.id]), data={'title': 'Board', 'participants': []}
+        )
+        self.assertEqual((await self.next_event(outbox))['user'], member.id)
+        self.assertEqual((await asyncio.wait_for(outbox.get(), 5))['more_body'], False)
+        await asyncio.wait_for(task, 5)
+
+    @override_settings(EVENT_STREAM_QUEUE_SIZE=2)
+    async def test_slow_subscriber_is_reset(self):
+        task, _, outbox, _ = await self.open(await sync_to_async(self.scope)(self.user))
+        await self.next_event(outbox)
+
+        get_broker().publish([{'type': 'goal.updated', 'board': self.board.id, 'id': i} for i in range(5)])
+        self.assertEqual((await self.next_event(outbox))['type'], 'reset')
+        await asyncio.wait_for(task, 5)
+
+    async def test_other_requests_reach_django(self):
+        seen = []
+
+        async def django_application(scope, receive, send):
+            seen.append(scope['path'])
+
+        await BoardEventRouter(django_application)({'type': 'http', 'path': '/goals/goal/list'}, None, None)
+        self.assertEqual(seen, ['/goals/goal/list'])
+
+    def test_bulk_writes_publish_events(self):
+        goals = self.create_goals(2)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(reverse('bulk_goal'), format='json', data={
+                'create': [{'title': 'New', 'category': self.category.id}],
+                'update': [{'id': goals[0].id, 'title': 'Renamed'}],
+                'archive': [goals[1].id],
+            })
+        self.assertEqual(
+            [(item['type'], item['id']) for item in get_broker().published],
+            [('goal.created', response.data['create'][0]['id']), ('goal.updated', goals[0].id),
+             ('goal.archived', goals[1].id)],
+        )
+
+    def test_incomplete_broker_fails_on_creation(self):
+        class PublishOnly(Broker):
+            def publish(self, events: list[dict]) -> None:
+                pass
+
+        with self.assertRaises(TypeError):
+            PublishOnly()
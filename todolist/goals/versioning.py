@@ -0,0 +1,36 @@
+from typing import Iterable
+
+from django.db.models import F, Q
+
+
+def get_board_versions(board_ids: Iterable[int]) -> dict[int, int]:
+    """{board_id: version}; a version changes with every committed write to the board."""
+    from goals.models import Board
+
+    return dict(Board.objects.filter(id__in=list(board_ids)).values_list("id", "version"))
+
+
+def get_board_version(board_id: int) -> int:
+    return get_board_versions([board_id]).get(board_id, 0)
+
+
+def bump_board_version(*board_ids: int | None) -> None:
+    """
+    Moves the boards to a new version in the current transaction, so every process sees the
+    new version together with the write that caused it.
+    """
+    from goals.models import Board
+
+    ids = {board_id for board_id in board_ids if board_id is not None}
+    if ids:
+        Board.objects.filter(id__in=ids).update(version=F("version") + 1)
+
+
+def bump_user_board_versions(user_id: int) -> None:
+    """Moves every board that shows the user nested in its rows, as participant or author, to a new version."""
+    from goals.models import Board, BoardParticipant, Goal, GoalCategory, GoalComment
+
+    boards = Q()
+    for model in (BoardParticipant, GoalCategory, Goal, GoalComment):
+        boards |= Q(id__in=model.objects.filter(user_id=user_id).values('board_id'))
+    Board.objects.filter(boards).update(version=F("version") + 1)
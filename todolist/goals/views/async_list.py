@@ -0,0 +1,63 @@
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import QuerySet
+from django.http import HttpRequest, HttpResponseBase
+from django.views import View
+from rest_framework.generics import ListAPIView
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from goals.views.mixins import ConditionalListMixin, ValuesListMixin
+
+
+class AsyncListView(View):
+    """
+    Async twin of a ConditionalListMixin + ValuesListMixin list view, configured by that view class.
+
+    Authentication, permissions, throttles, the ETag and the list cache lookup rely on sync-only APIs
+    (sessions, auth backends, cache clients) and run in a single sync_to_async() call. The page is counted
+    and fetched with the async ORM and always serialized from values() rows, so no lazy relation is
+    ever loaded inside the event loop.
+    """
+    view_class: type[ListAPIView] = None
+
+    async def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponseBase:
+        view = self.view_class()
+        view.args, view.kwargs = args, kwargs
+        drf_request = view.initialize_request(request, *args, **kwargs)
+        view.request, view.headers = drf_request, view.default_response_headers
+
+        try:
+            etag, response, queryset = await sync_to_async(self.prepare)(view, drf_request)
+            if response is None:
+                response = await self.get_page(view, drf_request, queryset)
+                await sync_to_async(view.cache_list)(etag, response)
+            response['ETag'] = etag
+        except Exception as exc:
+            response = view.handle_exception(exc)
+        return view.finalize_response(drf_request, response, *args, **kwargs)
+
+    @staticmethod
+    def prepare(view: ConditionalListMixin, request: Request) -> tuple[str, HttpResponseBase | None, QuerySet | None]:
+        view.initial(request)
+        etag, response = view.get_cached_list(request)
+        if response is not None:
+            return etag, response, None
+        # filter backends may validate query params against the database
+        queryset = view.filter_queryset(view.get_queryset())
+        return etag, None, queryset.values(*view.get_values_plan().lookups)
+
+    @staticmethod
+    async def get_page(view: ValuesListMixin, request: Request, queryset: QuerySet) -> Response:
+        plan, paginator = view.get_values_plan(), view.paginator
+        page = None if paginator is None else await paginator.apaginate_queryset(queryset, request, view=view)
+        if page is None:
+            return Response(plan.to_representation([row async for row in queryset]))
+        return paginator.get_paginated_response(plan.to_representation(page))
+
+
+def list_view(view_class: type[ListAPIView]):
+    """URL view of a list endpoint: its AsyncListView when ASYNC_LIST_VIEWS is on."""
+    if settings.ASYNC_LIST_VIEWS:
+        return AsyncListView.as_view(view_class=view_class)
+    return view_class.as_view()
@@ -1,10 +1,26 @@
+from django.conf import settings
+from django.core.cache import caches
 from django.db import transaction
-from django.db.models import QuerySet
+from django.db.models import Count, Q
+from django.http import StreamingHttpResponse
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
 from rest_framework import generics, permissions, filters
+from rest_framework.exceptions import ValidationError
+from rest_framework.parsers import MultiPartParser
+from rest_framework.request import Request
+from rest_framework.response import Response
 
-from goals.models import BoardParticipant, Board, Goal
+from goals.board_roles import invalidate_board_roles
+from goals.cascade import start_cascade
+from goals.events import event, publish
+from goals.export import NDJSONRenderer, CSVRenderer, iter_board_rows, to_ndjson, to_csv
+from goals.importer import FORMATS, GoalImporter, guess_format, read_rows
+from goals.models import BoardParticipant, Board, Goal, GoalCategory
 from goals.permissions import BoardPermission
-from goals.serializers import BoardSerializer, BoardParticipantSerializer, BoardSerializerWithParticipant
+from goals.serializers import BoardSerializer, BoardSerializerWithParticipant
+from goals.versioning import bump_board_version
+from goals.views.mixins import ConditionalListMixin, ConditionalRetrieveMixin, ValuesListMixin
 
 
 class BoardCreateView(generics.CreateAPIView):
@@ -15,25 +31,120 @@ class BoardCreateView(generics.CreateAPIView):
         with transaction.atomic():
             board = serializer.save()
             BoardParticipant.objects.create(user=self.request.user, board=board, role=BoardParticipant.Role.owner)
+            invalidate_board_roles(self.request.user.id)
 
 
-class BoardListView(generics.ListAPIView):
+class BoardListView(ConditionalListMixin, ValuesListMixin, generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = BoardSerializer
     filter_backends = [filters.OrderingFilter]
     ordering = ['title']
+    ordering_fields = ['title', 'created']
 
     def get_queryset(self):
         return Board.objects.filter(participants__user=self.request.user).exclude(is_deleted=True)
 
 
-class BoardDetailView(generics.RetrieveUpdateDestroyAPIView):
+class BoardDetailView(ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [BoardPermission]
+    board_id_attr = 'id'
+    board_version_attr = 'version'
     serializer_class = BoardSerializerWithParticipant
     queryset = Board.objects.prefetch_related("participants__user").exclude(is_deleted=True)
 
     def perform_destroy(self, instance: Board) -> None:
+        # goals are archived in the background, see goals.cascade
         with transaction.atomic():
-            Board.objects.filter(id=instance.id).update(is_deleted=True)
-            instance.categories.update(is_deleted=True)
-            Goal.objects.filter(category__board=instance).update(status=Goal.Status.archived)
+            now = timezone.now()
+            Board.objects.filter(id=instance.id).update(is_deleted=True, updated=now)
+            instance.categories.update(is_deleted=True, updated=now)
+            start_cascade(board=instance)
+            bump_board_version(instance.id)
+            publish(event('board', 'deleted', instance.id, instance.id))
+
+
+class BoardSummaryView(generics.RetrieveAPIView):
+    permission_classes = [BoardPermission]
+    queryset = Board.objects.exclude(is_deleted=True)
+
+    def retrieve(self, request: Request, *args, **kwargs) -> Response:
+        board = self.get_object()
+        today = timezone.localdate()
+        # overdue counts depend on the date, everything else only changes with the board version
+        key = f'board-summary:{board.id}:{board.version}:{today.isoformat()}'
+        cache = caches[settings.BOARD_SUMMARY_CACHE]
+
+        summary = cache.get(key)
+        if summary is None:
+            summary = self.get_summary(board, today)
+            cache.set(key, summary, settings.BOARD_SUMMARY_CACHE_TIMEOUT)
+        return Response(summary)
+
+    @staticmethod
+    def get_summary(board: Board, today) -> dict:
+        active = ~Q(goal__status=Goal.Status.archived)
+        overdue = active & ~Q(goal__status=Goal.Status.done) & Q(goal__due_date__lt=today)
+        rows = (
+            GoalCategory.objects.filter(board=board, is_deleted=False)
+            .values('id', 'title', 'goal__status', 'goal__priority')
+            .annotate(count=Count('goal', filter=active), overdue=Count('goal', filter=overdue))
+            .order_by('title', 'id')
+        )
+
+        summary = {'board': board.id, 'total': 0, 'overdue': 0, 'by_status': {}, 'by_priority': {}, 'categories': []}
+        categories = {}
+        for row in rows:
+            if row['id'] not in categories:
+                categories[row['id']] = {
+                    'id': row['id'], 'title': row['title'], 'total': 0, 'overdue': 0,
+                    'by_status': {}, 'by_priority': {}, 'cells': [],
+                }
+                summary['categories'].append(categories[row['id']])
+            if not row['count']:
+                continue
+
+            category = categories[row['id']]
+            goal_status, priority = row['goal__status'], row['goal__priority']
+            category['cells'].append(
+                {'status': goal_status, 'priority': priority, 'count': row['count'], 'overdue': row['overdue']}
+            )
+            for totals in (summary, category):
+                totals['total'] += row['count']
+                totals['overdue'] += row['overdue']
+                totals['by_status'][goal_status] = totals['by_status'].get(goal_status, 0) + row['count']
+                totals['by_priority'][priority] = totals['by_priority'].get(priority, 0) + row['count']
+        return summary
+
+
+class BoardExportView(generics.GenericAPIView):
+    """Streams a board as NDJSON (default) or CSV, chosen with ?format= or the Accept header."""
+    permission_classes = [BoardPermission]
+    queryset = Board.objects.exclude(is_deleted=True)
+    renderer_classes = [NDJSONRenderer, CSVRenderer]
+
+    def get(self, request: Request, *args, **kwargs) -> StreamingHttpResponse:
+        board = self.get_object()
+        renderer = request.accepted_renderer
+        encode = to_csv if renderer.format == 'csv' else to_ndjson
+
+        response = StreamingHttpResponse(encode(iter_board_rows(board.id)), content_type=renderer.media_type)
+        response['Content-Disposition'] = f'attachment; filename="board-{board.id}.{renderer.format}"'
+        return response
+
+
+class BoardImportView(generics.GenericAPIView):
+    """Imports categories and goals from an uploaded NDJSON or CSV `file`, see GoalImporter."""
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [MultiPartParser]
+
+    def post(self, request: Request, pk: int, *args, **kwargs) -> Response:
+        board = get_object_or_404(Board, pk=pk, is_deleted=False)
+        upload = request.data.get('file')
+        if upload is None:
+            raise ValidationError({'file': ['No file was submitted.']})
+        file_format = request.data.get('format') or guess_format(upload.name)
+        if file_format not in FORMATS:
+            raise ValidationError({'format': [f'One of: {", ".join(FORMATS)}']})
+
+        report = GoalImporter(board, request=request).run(read_rows(upload, file_format))
+        return Response(report)
@@ -1,11 +1,13 @@
 from django.db import transaction
 from rest_framework import generics, permissions, filters
 
-from goals.models import GoalCategory, Goal
+from goals.cascade import start_cascade
+from goals.models import GoalCategory
 
 from goals.serializers import GoalCategorySerializer, GoalCategorySerializerWithUser
 
 from goals.permissions import GoalCategoryPermission
+from goals.views.mixins import ConditionalListMixin, ConditionalRetrieveMixin, ValuesListMixin
 
 
 class GoalCategoryCreateView(generics.CreateAPIView):
@@ -13,7 +15,7 @@ class GoalCategoryCreateView(generics.CreateAPIView):
     serializer_class = GoalCategorySerializer
 
 
-class GoalCategoryListView(generics.ListAPIView):
+class GoalCategoryListView(ConditionalListMixin, ValuesListMixin, generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = GoalCategorySerializerWithUser
     filter_backends = [filters.OrderingFilter, filters.SearchFilter]
@@ -22,16 +24,19 @@ class GoalCategoryListView(generics.ListAPIView):
     search_fields = ['title']
 
     def get_queryset(self):
-        return GoalCategory.objects.filter(board__participants__user=self.request.user).exclude(is_deleted=True)
+        return GoalCategory.objects.select_related('user').filter(
+            board__participants__user=self.request.user, is_deleted=False
+        )
 
 
-class GoalCategoryDetailView(generics.RetrieveUpdateDestroyAPIView):
+class GoalCategoryDetailView(ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [GoalCategoryPermission]
     serializer_class = GoalCategorySerializerWithUser
-    queryset = GoalCategory.objects.exclude(is_deleted=True)
+    queryset = GoalCategory.objects.select_related('user').exclude(is_deleted=True)
 
     def perform_destroy(self, instance: GoalCategory) -> None:
+        # goals are archived in the background, see goals.cascade
         with transaction.atomic():
             instance.is_deleted = True
-            instance.save(update_fields=['is_deleted'])
-            instance.goal_set.update(status=Goal.Status.archived)
+            instance.save(update_fields=['is_deleted', 'updated'])
+            start_cascade(board=instance.board, category=instance)
@@ -7,6 +7,7 @@ from goals.models import GoalCategory, Goal, GoalComment
 from goals.serializers import GoalCommentSerializer, GoalCommentSerializerWithUser
 
 from goals.permissions import GoalCommentPermission
+from goals.views.mixins import ConditionalListMixin, ConditionalRetrieveMixin, ValuesListMixin
 
 
 class GoalCommentCreateView(generics.CreateAPIView):
@@ -14,23 +15,23 @@ class GoalCommentCreateView(generics.CreateAPIView):
     serializer_class = GoalCommentSerializer
 
 
-class GoalCommentListView(generics.ListAPIView):
+class GoalCommentListView(ConditionalListMixin, ValuesListMixin, generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = GoalCommentSerializer
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
     filterset_fields = ['goal']
     ordering = ['-created']
+    ordering_fields = ['created', 'updated', 'goal']
+    search_fields = ['text']
 
     def get_queryset(self):
-        return GoalComment.objects.filter(goal__category__board__participants__user=self.request.user)
+        return GoalComment.objects.filter(board__participants__user=self.request.user)
 
 
-class GoalCommentDetailView(generics.RetrieveUpdateDestroyAPIView):
+class GoalCommentDetailView(ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [GoalCommentPermission]
     serializer_class = GoalCommentSerializerWithUser
 
     def get_queryset(self):
-        return GoalComment.objects.select_related('user').filter(
-            goal__category__board__participants__user=self.request.user
-        )
+        return GoalComment.objects.select_related('user').filter(board__participants__user=self.request.user)
 
@@ -1,11 +1,22 @@
+from django.db import transaction
+from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import generics, permissions, filters
+from rest_framework.request import Request
+from rest_framework.response import Response
 
-from goals.models import Goal
+from goals.board_roles import WRITE_ROLES, get_board_roles
+from goals.counters import count_goal_changes
+from goals.events import goal_events, publish
+from goals.versioning import bump_board_version
+from goals.models import ChangeLog, Goal, GoalCategory, GoalComment, log_moved
 
-from goals.serializers import GoalSerializer, GoalSerializerWithUser
+from goals.serializers import (
+    GoalSerializer, GoalSerializerWithUser, BulkGoalSerializer, GoalBulkRequestSerializer, as_pk,
+)
 
 from goals.permissions import GoalPermission
+from goals.views.mixins import ConditionalListMixin, ConditionalRetrieveMixin, ValuesListMixin
 
 from goals.filters import GoalDateFilter
 
@@ -15,7 +26,7 @@ class GoalCreateView(generics.CreateAPIView):
     serializer_class = GoalSerializer
 
 
-class GoalListView(generics.ListAPIView):
+class GoalListView(ConditionalListMixin, ValuesListMixin, generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = GoalSerializerWithUser
     filter_backends = [DjangoFilterBackend, filters.OrderingFilter, filters.SearchFilter]
@@ -25,16 +36,139 @@ class GoalListView(generics.ListAPIView):
     search_fields = ['title', 'description']
 
     def get_queryset(self):
-        return Goal.objects.filter(
-            category__board__participants__user=self.request.user,
+        return Goal.objects.select_related('user').filter(
+            board__participants__user=self.request.user,
+            category__is_deleted=False,
         ).exclude(status=Goal.Status.archived)
 
 
-class GoalDetailView(generics.RetrieveUpdateDestroyAPIView):
+class GoalDetailView(ConditionalRetrieveMixin, generics.RetrieveUpdateDestroyAPIView):
     permission_classes = [GoalPermission]
     serializer_class = GoalSerializerWithUser
-    queryset = Goal.objects.exclude(status=Goal.Status.archived)
+    queryset = Goal.objects.select_related('user').filter(
+        category__is_deleted=False
+    ).exclude(status=Goal.Status.archived)
 
     def perform_destroy(self, instance: Goal) -> None:
         instance.status = Goal.Status.archived
-        instance.save(update_fields=['status'])
+        instance.save(update_fields=['status', 'updated'])
+
+
+class GoalBulkView(generics.GenericAPIView):
+    """
+    Applies a batch of goal creates, partial updates and archives in one transaction.
+
+    Every operation is validated on its own and reported back by position; invalid ones are skipped.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = BulkGoalSerializer
+    max_operations = 5000
+
+    @transaction.atomic
+    def post(self, request: Request, *args, **kwargs) -> Response:
+        batch = GoalBulkRequestSerializer(data=request.data, context={'max_operations': self.max_operations})
+        batch.is_valid(raise_exception=True)
+        creates, updates, archives = (batch.validated_data[op] for op in ('create', 'update', 'archive'))
+
+        goal_ids = {item['id'] for item in updates} | set(archives)
+        # raw input: whatever is not a pk is left to the item's serializer to report
+        category_ids = {pk for item in creates + updates if (pk := as_pk(item.get('category'))) is not None}
+        # locked until the batch commits, in id order so that overlapping batches do not deadlock:
+        # bulk_update writes the union of the changed fields to every goal, which would otherwise
+        # overwrite concurrent edits of the other fields with the values read here
+        goals = {goal.id: goal for goal in Goal.objects.filter(id__in=goal_ids, category__is_deleted=False).exclude(
+            status=Goal.Status.archived
+        ).select_for_update(of=('self',)).order_by('id')}
+        context = self.get_serializer_context()
+        context['preloaded'] = {GoalCategory: GoalCategory.objects.in_bulk(category_ids)}
+        roles = get_board_roles(request)
+
+        results = {
+            'create': self.validate_items(creates, context),
+            'update': self.validate_items(updates, context, partial=True),
+            'archive': [{} for _ in archives],
+        }
+        for op, items in (('update', [item['id'] for item in updates]), ('archive', archives)):
+            for result, goal_id in zip(results[op], items):
+                goal = goals.get(goal_id)
+                if goal is None:
+                    result.setdefault('errors', {'id': ['Goal not found']})
+                elif roles.get(goal.board_id) not in WRITE_ROLES:
+                    result.setdefault('errors', {'id': ['You do not have permission to change this goal']})
+
+        self.apply(results, updates, archives, goals)
+        for items in results.values():
+            for result in items:
+                result['status'] = 'error' if 'errors' in result else 'ok'
+        return Response(results)
+
+    def validate_items(self, items: list[dict], context: dict, partial: bool = False) -> list[dict]:
+        serializer = self.get_serializer_class()(data=items, many=True, partial=partial, context=context)
+        serializer.is_valid(raise_exception=True)
+        return [
+            {'errors': errors} if errors else {'data': data}
+            for data, errors in zip(serializer.validated_data, serializer.item_errors)
+        ]
+
+    @staticmethod
+    def apply(results: dict, updates: list[dict], archives: list[int], goals: dict[int, Goal]) -> None:
+        now = timezone.now()
+        boards, changed, moved, left, fields = set(), {}, {}, {}, {'updated'}
+
+        new_goals = [Goal(**result['data']) for result in results['create'] if 'errors' not in result]
+        for goal in new_goals:
+            goal.board_id = goal.category.board_id
+            boards.add(goal.board_id)
+
+        for result, item in zip(results['update'], updates):
+            if 'errors' in result:
+                continue
+            goal = goals[item['id']]
+            boards.add(goal.board_id)
+            data = result.pop('data')
+            for field, value in data.items():
+                setattr(goal, field, value)
+                fields.add(field)
+            if 'category' in data and data['category'].board_id != goal.board_id:
+                left.setdefault(goal.board_id, []).append(goal.id)
+                goal.board_id = data['category'].board_id
+                moved.setdefault(goal.board_id, []).append(goal.id)
+                fields.add('board')
+            changed[goal.id] = goal
+            result['id'] = goal.id
+
+        for result, goal_id in zip(results['archive'], archives):
+            if 'errors' in result:
+                continue
+            goal = goals[goal_id]
+            boards.add(goal.board_id)
+            goal.status = Goal.Status.archived
+            fields.add('status')
+            changed[goal.id] = goal
+            result['id'] = goal.id
+
+        for goal in changed.values():
+            goal.updated = now
+            boards.add(goal.board_id)
+
+        Goal.objects.bulk_create(new_goals, batch_size=1000)
+        if changed:
+            Goal.objects.bulk_update(changed.values(), sorted(fields), batch_size=1000)
+            count_goal_changes([(goal._counted, goal.get_counted_state()) for goal in changed.values()])
+        for board_id, goal_ids in left.items():
+            log_moved(board_id, ChangeLog.Kind.goal, goal_ids)
+            comment_ids = GoalComment.objects.filter(goal_id__in=goal_ids).values_list('id', flat=True)
+            log_moved(board_id, ChangeLog.Kind.comment, comment_ids)
+        for board_id, goal_ids in moved.items():
+            GoalComment.objects.filter(goal_id__in=goal_ids).update(board_id=board_id, updated=now)
+        bump_board_version(*boards)
+        publish(
+            *(item for goal in new_goals for item in goal_events(goal, None, created=True)),
+            *(item for goal in changed.values() for item in goal_events(goal, goal._counted)),
+        )
+
+        created = iter(new_goals)
+        for result in results['create']:
+            if 'errors' not in result:
+                result.pop('data')
+                result['id'] = next(created).id
@@ -0,0 +1,125 @@
+import hashlib
+from operator import attrgetter
+
+from django.conf import settings
+from django.http import HttpResponseBase
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from goals.board_roles import get_board_roles
+from goals.caching import list_response_cache
+from goals.versioning import get_board_versions
+from todolist.values import ValuesPlan
+
+
+def make_etag(*parts) -> str:
+    return quote_etag(hashlib.sha1(':'.join(map(str, parts)).encode()).hexdigest())
+
+
+class ConditionalListMixin:
+    """
+    ETag for list views from the versions of every board the user participates in.
+
+    A matching If-None-Match is answered with 304 before the queryset is touched, otherwise
+    the serialized page is served from the list response cache under the same fingerprint.
+    """
+
+    def get_list_etag(self, request: Request) -> str:
+        roles = get_board_roles(request)
+        versions = get_board_versions(roles)
+        return make_etag(
+            type(self).__name__,
+            request.user.id,
+            sorted(roles.items()),
+            sorted(versions.items()),
+            request.get_full_path(),
+            request.META.get('HTTP_ACCEPT', ''),
+        )
+
+    def get_cached_list(self, request: Request) -> tuple[str, HttpResponseBase | None]:
+        """The list ETag, with a 304 or a list cache hit when the page does not need to be built."""
+        etag = self.get_list_etag(request)
+        if (not_modified := get_conditional_response(request._request, etag=etag)) is not None:
+            return etag, not_modified
+
+        if (data := list_response_cache.get(etag)) is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return etag, response
+        return etag, None
+
+    @staticmethod
+    def cache_list(etag: str, response: Response) -> None:
+        if response.status_code == 200:
+            list_response_cache.set(etag, response.data)
+        response['X-Cache'] = 'MISS'
+
+    def list(self, request: Request, *args, **kwargs) -> HttpResponseBase:
+        etag, response = self.get_cached_list(request)
+        if response is None:
+            response = super().list(request, *args, **kwargs)
+            self.cache_list(etag, response)
+        response['ETag'] = etag
+        return response
+
+
+class ConditionalRetrieveMixin:
+    """
+    ETag from the object's board version for detail views.
+
+    The object is loaded and permission-checked first, serialization is skipped on a match. There is
+    no Last-Modified: counters and embedded users change the body without touching `updated`.
+    """
+    board_id_attr = 'board_id'
+    # read from the object itself when it carries its board's version, saving a query
+    board_version_attr: str | None = None
+
+    def retrieve(self, request: Request, *args, **kwargs) -> HttpResponseBase:
+        instance = self.get_object()
+        board_id = attrgetter(self.board_id_attr)(instance)
+        if self.board_version_attr is not None:
+            version = attrgetter(self.board_version_attr)(instance)
+        else:
+            version = get_board_versions([board_id]).get(board_id, 0)
+        etag = make_etag(
+            type(self).__name__,
+            instance.pk,
+            version,
+            instance.updated.isoformat(),
+            request.META.get('HTTP_ACCEPT', ''),
+        )
+        not_modified = get_conditional_response(request._request, etag=etag)
+        if not_modified is not None:
+            not_modified['ETag'] = etag
+            return not_modified
+
+        response = Response(self.get_serializer(instance).data)
+        response['ETag'] = etag
+        return response
+
+
+class ValuesListMixin:
+    """
+    Serves list pages from QuerySet.values() through a ValuesPlan of the serializer class when
+    FAST_LIST_SERIALIZATION is on; the output is the same as the serializer's.
+    """
+    _values_plans: dict[type, ValuesPlan] = {}
+
+    def get_values_plan(self) -> ValuesPlan:
+        serializer_class = self.get_serializer_class()
+        if serializer_class not in self._values_plans:
+            self._values_plans[serializer_class] = ValuesPlan(serializer_class)
+        return self._values_plans[serializer_class]
+
+    def list(self, request: Request, *args, **kwargs) -> Response:
+        if not settings.FAST_LIST_SERIALIZATION:
+            return super().list(request, *args, **kwargs)
+
+        plan = self.get_values_plan()
+        queryset = self.filter_queryset(self.get_queryset()).values(*plan.lookups)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(plan.to_representation(page))
+        return Response(plan.to_representation(queryset))
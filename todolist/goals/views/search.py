@@ -0,0 +1,20 @@
+from rest_framework import generics, permissions
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from goals.search import get_search_backend
+from goals.serializers import SearchQuerySerializer, SearchHitSerializer
+
+
+class SearchView(generics.GenericAPIView):
+    permission_classes = [permissions.IsAuthenticated]
+    serializer_class = SearchHitSerializer
+
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        params = SearchQuerySerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+
+        hits = get_search_backend().search(
+            user_id=request.user.id, query=params.validated_data['q'], limit=params.validated_data['limit']
+        )
+        return Response({'results': self.get_serializer(hits, many=True).data})
@@ -0,0 +1,136 @@
+import base64
+import json
+from datetime import datetime, timedelta
+
+from django.conf import settings
+from django.db.models import Q, QuerySet
+from django.utils import timezone
+from rest_framework import generics, permissions
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.response import Response
+
+from goals.board_roles import get_board_roles
+from goals.models import Board, BoardParticipant, GoalCategory, Goal, GoalComment, ChangeLog
+from goals.serializers import (
+    BoardSerializer,
+    BoardParticipantSerializer,
+    GoalCategorySerializerWithUser,
+    GoalSerializerWithUser,
+    GoalCommentSerializer,
+)
+
+
+def encode_cursor(moment: datetime) -> str:
+    return base64.urlsafe_b64encode(json.dumps({'t': moment.isoformat()}).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> datetime:
+    try:
+        moment = datetime.fromisoformat(json.loads(base64.urlsafe_b64decode(cursor.encode()))['t'])
+    except (TypeError, ValueError, KeyError):
+        raise ValidationError({'since': 'Invalid cursor'})
+    if timezone.is_naive(moment):
+        raise ValidationError({'since': 'Invalid cursor'})
+    return moment
+
+
+class SyncView(generics.GenericAPIView):
+    """
+    Everything that changed on the user's boards since `since`, plus tombstones, plus the next cursor.
+
+    Without a cursor, or with one older than the change log retention, the response is a full
+    snapshot with `reset: true`. The window overlaps the previous one by SYNC_OVERLAP_SECONDS so
+    rows committed late with an earlier `updated` are not missed; clients apply rows as upserts.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request: Request, *args, **kwargs) -> Response:
+        now = timezone.now()
+        since = decode_cursor(request.query_params['since']) if request.query_params.get('since') else None
+        reset = since is None or since < now - timedelta(days=settings.SYNC_CHANGELOG_RETENTION_DAYS)
+        window = None if reset else since - timedelta(seconds=settings.SYNC_OVERLAP_SECONDS)
+
+        boards = set(get_board_roles(request))
+        if window is None:
+            fresh = boards
+        else:
+            # boards the user joined within the window are sent in full
+            fresh = set(BoardParticipant.objects.filter(
+                user=request.user, created__gt=window
+            ).values_list('board_id', flat=True)) & boards
+
+        def changed(queryset: QuerySet, board_field: str) -> QuerySet:
+            condition = Q(**{f'{board_field}__in': fresh})
+            if window is not None:
+                condition |= Q(**{f'{board_field}__in': boards, 'updated__gt': window})
+            return queryset.filter(condition)
+
+        context = self.get_serializer_context()
+        data = {
+            'reset': reset,
+            'boards': BoardSerializer(
+                changed(Board.objects.filter(is_deleted=False), 'id'), many=True
+            ).data,
+            'participants': BoardParticipantSerializer(
+                changed(BoardParticipant.objects.select_related('user').filter(board__is_deleted=False), 'board_id'),
+                many=True, context=context,
+            ).data,
+            'categories': GoalCategorySerializerWithUser(
+                changed(GoalCategory.objects.select_related('user').filter(is_deleted=False), 'board_id'), many=True
+            ).data,
+            'goals': GoalSerializerWithUser(
+                changed(
+                    Goal.objects.select_related('user').filter(category__is_deleted=False).exclude(
+                        status=Goal.Status.archived
+                    ),
+                    'board_id',
+                ),
+                many=True,
+            ).data,
+            'comments': GoalCommentSerializer(
+                changed(GoalComment.objects.filter(goal__category__is_deleted=False), 'board_id'),
+                many=True,
+            ).data,
+            'deleted': self.get_tombstones(request, boards, window),
+            'cursor': encode_cursor(now),
+        }
+        # rows moved to another board of the user come with their new board instead
+        for kind in ('categories', 'goals', 'comments'):
+            sent = {row['id'] for row in data[kind]}
+            data['deleted'][kind] = [object_id for object_id in data['deleted'][kind] if object_id not in sent]
+        return Response(data)
+
+    @staticmethod
+    def get_tombstones(request: Request, boards: set[int], window: datetime | None) -> dict[str, list[int]]:
+        deleted = {kind: set() for kind in ('boards', 'participants', 'categories', 'goals', 'comments')}
+        if window is None:
+            return {kind: [] for kind in deleted}
+
+        recent = Q(updated__gt=window)
+        deleted['boards'].update(Board.objects.filter(
+            recent, id__in=boards, is_deleted=True
+        ).values_list('id', flat=True))
+        deleted['categories'].update(GoalCategory.objects.filter(
+            recent, board_id__in=boards, is_deleted=True
+        ).values_list('id', flat=True))
+        deleted['goals'].update(Goal.objects.filter(
+            recent, board_id__in=boards, status=Goal.Status.archived
+        ).values_list('id', flat=True))
+
+        kinds = {
+            ChangeLog.Kind.board: 'boards',
+            ChangeLog.Kind.participant: 'participants',
+            ChangeLog.Kind.category: 'categories',
+            ChangeLog.Kind.goal: 'goals',
+            ChangeLog.Kind.comment: 'comments',
+        }
+        log = ChangeLog.objects.filter(
+            Q(board_id__in=boards) | Q(user=request.user), created__gt=window
+        ).values_list('kind', 'object_id', 'board_id', 'user_id')
+        for kind, object_id, board_id, user_id in log:
+            deleted[kinds[kind]].add(object_id)
+            if kind == ChangeLog.Kind.participant and user_id == request.user.id and board_id not in boards:
+                # the user's own membership was removed: the whole board is gone for them
+                deleted['boards'].add(board_id)
+        return {kind: sorted(ids) for kind, ids in deleted.items()}
@@ -9,8 +9,15 @@ https://docs.djangoproject.com/en/4.1/howto/deployment/asgi/
 
 import os
 
-from django.core.asgi import get_asgi_application
+import django
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'todolist.settings')
 
-application = get_asgi_application()
+django.setup(set_prefix=False)
+
+# imported once the apps are loaded
+from goals.streams import BoardEventRouter, StreamingASGIHandler  # noqa: E402
+
+django_application = StreamingASGIHandler()
+
+application = BoardEventRouter(django_application)
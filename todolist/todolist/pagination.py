@@ -0,0 +1,224 @@
+import base64
+import json
+from collections import OrderedDict
+from typing import Any
+
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Q, QuerySet
+from django.db.models.constants import LOOKUP_SEP
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, LimitOffsetPagination
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination over the queryset's own ordering with `id` as tie-breaker.
+
+    Unlike DRF CursorPagination every ordering field is part of the cursor, so pages
+    never degrade into an offset scan on duplicate titles and no COUNT(*) is issued.
+    """
+    cursor_query_param = 'cursor'
+    limit_query_param = 'limit'
+    default_limit = 50
+    max_limit = 1000
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view=None) -> list:
+        page_queryset = self.prepare(queryset, request)
+        return self.set_page(list(page_queryset[:self.limit + 1]))
+
+    async def apaginate_queryset(self, queryset: QuerySet, request: Request, view=None) -> list:
+        page_queryset = self.prepare(queryset, request)
+        return self.set_page([row async for row in page_queryset[:self.limit + 1]])
+
+    def prepare(self, queryset: QuerySet, request: Request) -> QuerySet:
+        self.request = request
+        self.limit = self.get_limit(request)
+        self.ordering = self.get_ordering(queryset)
+        self.position_keys = self.get_position_keys(queryset, self.ordering)
+        self.position, self.reverse = self.decode_cursor(request)
+        return self.get_page_queryset(queryset, self.ordering, self.position, self.reverse)
+
+    def set_page(self, rows: list) -> list:
+        has_more = len(rows) > self.limit
+        rows = rows[:self.limit]
+        if self.reverse:
+            rows.reverse()
+
+        self.page = rows
+        if self.reverse:
+            self.has_next, self.has_previous = self.position is not None, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.position is not None
+        return rows
+
+    def get_paginated_response(self, data) -> Response:
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema: dict) -> dict:
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_limit(self, request: Request) -> int:
+        try:
+            limit = int(request.query_params[self.limit_query_param])
+        except (KeyError, ValueError):
+            return self.default_limit
+        return min(max(limit, 1), self.max_limit)
+
+    @staticmethod
+    def get_ordering(queryset: QuerySet) -> list[str]:
+        ordering = [field for field in queryset.query.order_by if isinstance(field, str)]
+        if not ordering:
+            ordering = list(queryset.model._meta.ordering)
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering.append('id')
+        return [KeysetPagination.get_column(queryset, field) for field in ordering]
+
+    @staticmethod
+    def get_column(queryset: QuerySet, field: str) -> str:
+        """
+        The ordering field as a column of the queryset's own table: a foreign key orders by its id,
+        not by the related model's ordering, so the cursor holds the id too.
+        """
+        desc, name = field.startswith('-'), field.lstrip('-')
+        if name == 'pk':
+            name = 'id'
+        elif LOOKUP_SEP not in name:
+            try:
+                model_field = queryset.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                pass
+            else:
+                if model_field.many_to_one:
+                    name = model_field.attname
+        return f'-{name}' if desc else name
+
+    @staticmethod
+    def get_position_keys(queryset: QuerySet, ordering: list[str]) -> list[tuple[str, str]]:
+        """(instance attribute, values() key) per ordering field; values() drops the _id of foreign keys."""
+        keys = []
+        for field in ordering:
+            name = field.lstrip('-')
+            key = name
+            if name.endswith('_id'):
+                try:
+                    key = queryset.model._meta.get_field(name[:-3]).name
+                except FieldDoesNotExist:
+                    pass
+            keys.append((name, key))
+        return keys
+
+    @staticmethod
+    def get_page_queryset(
+        queryset: QuerySet, ordering: list[str], position: list | None, reverse: bool
+    ) -> QuerySet:
+        if reverse:
+            ordering = [field[1:] if field.startswith('-') else f'-{field}' for field in ordering]
+        queryset = queryset.order_by(*ordering)
+        if position is None:
+            return queryset
+
+        # (a, b, id) > (x, y, z)  <=>  a > x OR (a = x AND (b > y OR (b = y AND id > z)))
+        condition = Q()
+        for field, value in reversed(list(zip(ordering, position))):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            after = Q(**{f'{name}__{lookup}': value})
+            condition = after if not condition else after | (Q(**{name: value}) & condition)
+        return queryset.filter(condition)
+
+    def get_position(self, instance: Any) -> list:
+        position = []
+        for name, key in self.position_keys:
+            # rows of values() querysets are dicts
+            if isinstance(instance, dict):
+                value = instance[name] if name in instance else instance[key]
+            else:
+                value = getattr(instance, name)
+            position.append(value.isoformat() if hasattr(value, 'isoformat') else value)
+        return position
+
+    def encode_cursor(self, position: list, reverse: bool) -> str:
+        payload = json.dumps({'p': position, 'r': int(reverse)}, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def decode_cursor(self, request: Request) -> tuple[list | None, bool]:
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            position, reverse = payload['p'], bool(payload['r'])
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def get_next_link(self) -> str | None:
+        if not self.has_next or not self.page:
+            return None
+        cursor = self.encode_cursor(self.get_position(self.page[-1]), reverse=False)
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+    def get_previous_link(self) -> str | None:
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.request.build_absolute_uri(), self.cursor_query_param)
+        cursor = self.encode_cursor(self.get_position(self.page[0]), reverse=True)
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, cursor)
+
+
+class HybridPagination(LimitOffsetPagination):
+    """
+    Limit/offset by default for old clients, keyset pagination once `?cursor=` is passed.
+    """
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset: QuerySet, request: Request, view=None) -> list | None:
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+
+        self.keyset = None
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset: QuerySet, request: Request, view=None) -> list | None:
+        """paginate_queryset() through the async ORM."""
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return await self.keyset.apaginate_queryset(queryset, request, view)
+
+        self.keyset = None
+        self.limit = self.get_limit(request)
+        if self.limit is None:
+            return None
+
+        self.request = request
+        self.count = await queryset.acount()
+        self.offset = self.get_offset(request)
+        if self.count > self.limit and self.template is not None:
+            self.display_page_controls = True
+        if self.count == 0 or self.offset > self.count:
+            return []
+        return [row async for row in queryset[self.offset:self.offset + self.limit]]
+
+    def get_paginated_response(self, data) -> Response:
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -152,7 +152,102 @@ SOCIAL_AUTH_LOGIN_ERROR_URL = '/login-error/'
 SOCIAL_AUTH_USER_MODEL = 'core.User'
 
 REST_FRAMEWORK = {
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.LimitOffsetPagination'
+    'DEFAULT_PAGINATION_CLASS': 'todolist.pagination.HybridPagination'
 }
 
+# orjson based JSON renderer and parser, same output as DRF's own
+FAST_JSON = env.bool("FAST_JSON", default=False)
+if FAST_JSON:
+    REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = [
+        'todolist.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ]
+    REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = [
+        'todolist.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ]
+
+# goals list endpoints serialize QuerySet.values() rows instead of model instances, see todolist.values
+FAST_LIST_SERIALIZATION = env.bool("FAST_LIST_SERIALIZATION", default=False)
+
+# goal, category, comment and board lists as async views for todolist.asgi, see goals.views.async_list
+ASYNC_LIST_VIEWS = env.bool("ASYNC_LIST_VIEWS", default=False)
+
+# Caches
+# Local memory of each process by default; point CACHE_URL / RESPONSE_CACHE_URL at e.g. redis://redis:6379/0
+# (needs the redis package) to share them between workers.
+CACHES = {
+    "default": env.cache("CACHE_URL", default="locmemcache://default"),
+    "responses": env.cache("RESPONSE_CACHE_URL", default="locmemcache://responses"),
+}
+CACHES["responses"].setdefault("TIMEOUT", env.int("RESPONSE_CACHE_TIMEOUT", default=300))
+for _alias, _max_entries in (("default", 50_000), ("responses", env.int("RESPONSE_CACHE_MAX_ENTRIES", default=5_000))):
+    if CACHES[_alias]["BACKEND"].endswith("LocMemCache"):
+        CACHES[_alias].setdefault("OPTIONS", {"MAX_ENTRIES": _max_entries})
+
+# Serialized list pages keyed by user, query and board versions; None disables the cache
+LIST_RESPONSE_CACHE = "responses"
+
+# Cache alias shared between workers for the {board_id: role} maps, request-scoped only when unset
+BOARD_ROLES_CACHE = env("BOARD_ROLES_CACHE", default=None)
+BOARD_ROLES_CACHE_TIMEOUT = env.int("BOARD_ROLES_CACHE_TIMEOUT", default=300)
+
+BOARD_SUMMARY_CACHE = "default"
+BOARD_SUMMARY_CACHE_TIMEOUT = 60 * 60 * 24
+
+# Board event streams (goals.streams, ASGI only): the in-process broker reaches subscribers of the
+# writing process only, goals.events.PostgresBroker fans out to every process through LISTEN/NOTIFY
+EVENT_BROKER = env("EVENT_BROKER", default="goals.events.InProcessBroker")
+EVENT_STREAM_HEARTBEAT_SECONDS = env.int("EVENT_STREAM_HEARTBEAT_SECONDS", default=15)
+EVENT_STREAM_QUEUE_SIZE = env.int("EVENT_STREAM_QUEUE_SIZE", default=1000)
+
+# Goals of deleted boards and categories are archived in chunks outside the request
+SOFT_DELETE_CASCADE_BACKGROUND = env.bool("SOFT_DELETE_CASCADE_BACKGROUND", default=True)
+SOFT_DELETE_CASCADE_CHUNK_SIZE = env.int("SOFT_DELETE_CASCADE_CHUNK_SIZE", default=1000)
+
+# goals/sync: overlap between consecutive windows and how long hard deletes are remembered
+SYNC_OVERLAP_SECONDS = 5
+SYNC_CHANGELOG_RETENTION_DAYS = 30
+
 BOT_TOKEN = env("BOT_TOKEN")
+BOT_API_URL = env("BOT_API_URL", default="https://api.telegram.org")
+BOT_API_CONNECT_TIMEOUT = env.float("BOT_API_CONNECT_TIMEOUT", default=5.0)
+BOT_API_READ_TIMEOUT = env.float("BOT_API_READ_TIMEOUT", default=15.0)
+BOT_API_RETRIES = env.int("BOT_API_RETRIES", default=3)
+BOT_API_BACKOFF_SECONDS = 0.5
+BOT_API_BACKOFF_MAX_SECONDS = 30
+BOT_API_POOL_SIZE = env.int("BOT_API_POOL_SIZE", default=32)
+# sendMessage pacing after Telegram's limits, see bot.tg.ratelimit
+BOT_SEND_RATE = env.float("BOT_SEND_RATE", default=30)
+BOT_SEND_BURST = 30
+BOT_CHAT_SEND_RATE = 1
+BOT_CHAT_SEND_BURST = 3
+BOT_GROUP_SEND_RATE = 20 / 60
+
+# runbot: updates of different chats are handled in parallel, see bot.dispatcher
+BOT_WORKERS = env.int("BOT_WORKERS", default=8)
+BOT_WORKER_QUEUE_SIZE = env.int("BOT_WORKER_QUEUE_SIZE", default=100)
+# `runbot --shard i/n` processes handle updates stored by `manage.py pollbot`, see bot.inbox
+BOT_INBOX_BATCH_SIZE = 100
+BOT_INBOX_POLL_SECONDS = env.float("BOT_INBOX_POLL_SECONDS", default=1.0)
+
+# Telegram posts updates to /bot/webhook with this secret once `manage.py setwebhook` has registered it,
+# they go to the inbox like pollbot's; empty disables the endpoint
+BOT_WEBHOOK_SECRET = env("BOT_WEBHOOK_SECRET", default="")
+BOT_WEBHOOK_MAX_CONNECTIONS = env.int("BOT_WEBHOOK_MAX_CONNECTIONS", default=40)
+
+# state of multi-step bot commands, see bot.fsm
+BOT_FSM_STORE = env("BOT_FSM_STORE", default="bot.fsm.DatabaseFSMStore")
+BOT_FSM_TTL_SECONDS = env.int("BOT_FSM_TTL_SECONDS", default=60 * 60)
+
+# handled update ids are remembered longer than Telegram keeps unconfirmed updates (24 hours), see bot.checkpoint
+BOT_PROCESSED_UPDATES_TTL_SECONDS = 2 * 24 * 60 * 60
+
+# Telegram messages queued by API requests and sent by `manage.py runoutbox`, see bot.outbox
+BOT_OUTBOX_BATCH_SIZE = env.int("BOT_OUTBOX_BATCH_SIZE", default=100)
+BOT_OUTBOX_POLL_SECONDS = env.float("BOT_OUTBOX_POLL_SECONDS", default=1.0)
+BOT_OUTBOX_LEASE_SECONDS = 60
+BOT_OUTBOX_MAX_ATTEMPTS = env.int("BOT_OUTBOX_MAX_ATTEMPTS", default=10)
+BOT_OUTBOX_BACKOFF_SECONDS = 5
+BOT_OUTBOX_BACKOFF_MAX_SECONDS = 60 * 60
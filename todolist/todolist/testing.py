@@ -0,0 +1,35 @@
+from typing import Callable
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """
+    For APITestCase: checks that an endpoint runs the same number of queries for N and 10·N rows.
+    """
+    budget_rows = 3
+
+    def count_queries(self, method: str, url: str, data: dict | None = None) -> int:
+        with CaptureQueriesContext(connection) as queries:
+            response = getattr(self.client, method)(url, data=data, format='json')
+        self.assertLess(response.status_code, 400, getattr(response, 'data', None))
+        return len(queries)
+
+    def assertQueryBudget(
+        self,
+        url: str,
+        seed: Callable[[int], None],
+        method: str = 'get',
+        data: dict | None = None,
+        max_queries: int | None = None,
+    ) -> None:
+        seed(self.budget_rows)
+        small = self.count_queries(method, url, data)
+        seed(self.budget_rows * 9)
+        large = self.count_queries(method, url, data)
+
+        self.assertEqual(small, large, f'{url}: {small} queries for {self.budget_rows} rows, '
+                                       f'{large} for {self.budget_rows * 10}')
+        if max_queries is not None:
+            self.assertLessEqual(large, max_queries, url)
@@ -0,0 +1,76 @@
+from typing import Any, Iterable
+
+from django.core.exceptions import ImproperlyConfigured
+from rest_framework import serializers
+
+# fields whose to_representation() returns the values() result unchanged
+IDENTITY_FIELDS = (
+    serializers.IntegerField,
+    serializers.CharField,
+    serializers.BooleanField,
+    serializers.ChoiceField,
+    serializers.ReadOnlyField,
+    serializers.PrimaryKeyRelatedField,
+)
+
+
+class ValuesPlan:
+    """
+    A serializer's output compiled into flat (key, values() lookup, converter) steps.
+
+    Rows from `queryset.values(*plan.lookups)` are turned into the same dicts, in the same key
+    order, as `serializer_class(instances, many=True).data`, without building model instances
+    or walking the serializer's fields per row.
+    """
+
+    def __init__(self, serializer_class: type[serializers.Serializer]):
+        self.serializer_class = serializer_class
+        self.steps = self.compile(serializer_class(), prefix='')
+        self.lookups = list(self.iter_lookups(self.steps))
+
+    def compile(self, serializer: serializers.Serializer, prefix: str) -> list[tuple]:
+        steps = []
+        for field in serializer.fields.values():
+            if field.write_only:
+                continue
+            name = f'{type(serializer).__name__}.{field.field_name}'
+            if field.source == '*' or isinstance(field, serializers.SerializerMethodField):
+                raise ImproperlyConfigured(f'{name} can not be read from values()')
+            lookup = prefix + field.source.replace('.', '__')
+
+            if isinstance(field, serializers.BaseSerializer):
+                if getattr(field, 'many', False) or isinstance(field, serializers.ListSerializer):
+                    raise ImproperlyConfigured(f'{name} is a to-many field')
+                steps.append((field.field_name, lookup, None, self.compile(field, prefix=f'{lookup}__')))
+            elif isinstance(field, serializers.SlugRelatedField):
+                steps.append((field.field_name, f'{lookup}__{field.slug_field}', None, None))
+            elif (isinstance(field, serializers.RelatedField)
+                  and not isinstance(field, serializers.PrimaryKeyRelatedField)):
+                raise ImproperlyConfigured(f'{name} can not be read from values()')
+            else:
+                convert = None if isinstance(field, IDENTITY_FIELDS) else field.to_representation
+                steps.append((field.field_name, lookup, convert, None))
+        return steps
+
+    @classmethod
+    def iter_lookups(cls, steps: list[tuple]) -> Iterable[str]:
+        for _, lookup, _, nested in steps:
+            yield lookup
+            if nested is not None:
+                yield from cls.iter_lookups(nested)
+
+    @classmethod
+    def build(cls, steps: list[tuple], row: dict) -> dict:
+        data = {}
+        for key, lookup, convert, nested in steps:
+            value = row[lookup]
+            if nested is not None:
+                data[key] = None if value is None else cls.build(nested, row)
+            else:
+                # like Serializer.to_representation, None is never passed to a field
+                data[key] = value if convert is None or value is None else convert(value)
+        return data
+
+    def to_representation(self, rows: Iterable[dict]) -> list[dict[str, Any]]:
+        build, steps = self.build, self.steps
+        return [build(steps, row) for row in rows]